@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# ? Includes from built in Python
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ? Includes from external modules in Pipfile
+from PyQt5.QtCore import QObject, pyqtSignal
+
+# ? Includes from this project
+from presentiment import analysis_operations
+
+
+class Analysis_Worker(QObject):
+    #? Runs the session-end analysis of every sensor in parallel on a thread pool (NumPy releases the GIL)
+    #? Signals are emitted from the pool threads; Qt queues them so the slots run on the GUI thread
+    progress = pyqtSignal(int, int)  # stages done, total stages
+    finished = pyqtSignal(dict)  # sensor name -> results of analysis_operations.analyse_sensor
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.cancel_event = threading.Event()
+        self.running = False
+        # Run asked for while another one was running (session, sensors); it starts when that one stops
+        self.queued = None
+
+    def start(self, session, sensors):
+        # sensors: dict of sensor name -> (values, timestamps, samples per second selected for the sensor, options)
+        # options: dict with the keyword arguments of analyse_sensor for the sensor (value_range, filters)
+        # @returns True if the run started, False if a run was still going: that one is cancelled and this one is
+        #  queued (it starts as soon as the cancelled run emits its signal)
+        with self.lock:
+            if self.running:
+                self.cancel_event.set()
+                self.queued = (session, sensors)
+                return False
+            self.running = True
+            # A new event for every run, so a late cancel can't leak into the next one
+            self.cancel_event = threading.Event()
+            self.results = {}
+            self.errors = []
+            self.pending = len(sensors)
+            self.stages_done = 0
+            self.stages_total = len(sensors) * analysis_operations.ANALYSIS_STAGES
+        cancel_event = self.cancel_event
+        self.progress.emit(0, self.stages_total)
+        if not sensors:
+            self.finish_run(cancel_event)
+            return True
+        for name, (values, timestamps, samples_per_second, options) in sensors.items():
+            future = self.executor.submit(
+                analysis_operations.analyse_sensor, values, timestamps, samples_per_second, session, cancel_event,
+                self.on_stage, **options)
+            future.add_done_callback(
+                lambda future, name=name: self.on_sensor_done(name, future, cancel_event))
+        return True
+
+    def cancel(self):
+        with self.lock:
+            self.queued = None
+        self.cancel_event.set()
+
+    def is_running(self):
+        with self.lock:
+            return self.running
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
+
+    def on_stage(self):
+        with self.lock:
+            self.stages_done += 1
+            done, total = self.stages_done, self.stages_total
+        self.progress.emit(done, total)
+
+    def on_sensor_done(self, name, future, cancel_event):
+        with self.lock:
+            try:
+                result = future.result()
+                if result is not None:
+                    self.results[name] = result
+            except Exception as error:
+                self.errors.append(name + ": " + str(error))
+                cancel_event.set()
+            self.pending -= 1
+            last = self.pending == 0
+        if last:
+            self.finish_run(cancel_event)
+
+    def finish_run(self, cancel_event):
+        #? Emit the results of all sensors at once so the widgets are updated in one batch
+        with self.lock:
+            self.running = False
+            results, errors = self.results, self.errors
+            queued, self.queued = self.queued, None
+        if errors:
+            self.failed.emit("\n".join(errors))
+        elif cancel_event.is_set():
+            self.cancelled.emit()
+        else:
+            self.finished.emit(results)
+        if queued is not None:
+            self.start(*queued)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from built in Python
+import argparse
+import glob
+import os
+import time
+
+#? Includes from this project
+from presentiment import legacy_operations, pooled_operations, analysis_operations, Session_Container
+
+#? Import of the physiological exports of older sessions (Export Physiological Data to CSV), e.g.:
+#?  python src/Import_Legacy.py "archive/*.csv"
+#? and analysis of one of them again with the stimulus IDs of its session export:
+#?  python src/Import_Legacy.py archive/S12_phys.csv --session archive/S12.csv --presentiment-seconds 3
+#? --container converts every export to a session container (see Session_Container), which opens without parsing
+
+if __name__ == '__main__':
+        parser = argparse.ArgumentParser(description='Import of legacy physiological exports')
+        parser.add_argument('exports', nargs='+', help='Physiological exports (CSV files or glob patterns)')
+        parser.add_argument('--session', default=None, help='Session export with the stimulus IDs (only one export)')
+        parser.add_argument('--sensor', default='skin_conductance', choices=list(legacy_operations.SENSORS))
+        parser.add_argument('--presentiment-seconds', type=float, default=3)
+        parser.add_argument('--shuffles', type=int, default=0, help='Permutations of the null (0 for the closed form)')
+        parser.add_argument('--container', default=None, help='Directory of the session containers to write')
+        parser.add_argument('--chunk-rows', type=int, default=legacy_operations.IMPORT_CHUNK_ROWS)
+        arguments = parser.parse_args()
+        paths = sorted(set(path for pattern in arguments.exports for path in (glob.glob(pattern) or [pattern])))
+        if arguments.session is not None and len(paths) != 1:
+            parser.error('--session needs exactly one physiological export')
+        stimulus_ids = []
+        if arguments.session is not None:
+            stimulus_ids = pooled_operations.read_session_export(arguments.session)['stimulus_ids']
+        started = time.perf_counter()
+        size = 0
+        for path in paths:
+            phys = legacy_operations.read_phys_export(path, chunk_rows=arguments.chunk_rows)
+            size += os.path.getsize(path)
+            if arguments.container is not None:
+                container = Session_Container(
+                    os.path.join(arguments.container, os.path.splitext(phys['name'])[0] + '.session'),
+                    list(phys['sensors']), {'session_id': phys['session_id'], 'source': os.path.abspath(path),
+                                            'presentiment_seconds': arguments.presentiment_seconds})
+                for sensor, arrays in phys['sensors'].items():
+                    container.append(sensor, arrays['timestamps'], arrays['values'])
+                container.set_trials(phys['trial_ids'], stimulus_ids, phys['trial_start'], phys['trial_end'])
+                container.close()
+            print(phys['name'] + ": session " + str(phys['session_id']) + ", " + str(len(phys['trial_ids'])) + " trials, "
+                  + ", ".join([sensor + " " + str(len(arrays['values'])) + " samples"
+                               for sensor, arrays in phys['sensors'].items()]))
+        elapsed = time.perf_counter() - started
+        print(str(len(paths)) + " exports in " + str(round(elapsed, 2)) + " seconds ("
+              + str(round(size / max(elapsed, 1e-9) / 1e6, 1)) + " MB/s)")
+        if arguments.session is not None:
+            if arguments.sensor not in phys['sensors']:
+                parser.error('the export has no samples of ' + arguments.sensor)
+            session = legacy_operations.legacy_session(phys, stimulus_ids, arguments.presentiment_seconds,
+                                                       shuffles=arguments.shuffles)
+            samples = phys['sensors'][arguments.sensor]
+            result = analysis_operations.analyse_sensor(samples['values'], samples['timestamps'],
+                                                        session['samples_per_second'], session)
+            print(arguments.sensor + ": D " + str(round(result['D'], 4)) + ", ZD " + str(round(result['ZD'], 4)))
+            for line in result['quality']:
+                print(line)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from built in Python
+import argparse
+import glob
+import time
+
+#? Includes from external modules in Pipfile
+from dotenv import load_dotenv
+
+#? Includes from this project
+from presentiment import Session_Index
+
+#? Session index (SQLite) from the command line, e.g.:
+#?  python src/Index_Sessions.py import "sessions/*.csv"
+#?  python src/Index_Sessions.py query --sensor skin_conductance --samples-per-second 20 --min-trials 40
+
+if __name__ == '__main__':
+        load_dotenv()
+        parser = argparse.ArgumentParser(description='Index of the presentiment sessions')
+        parser.add_argument('--index', default=None, help='SQLite file (PRESENTIMENT_SESSION_INDEX by default)')
+        commands = parser.add_subparsers(dest='command', required=True)
+        importer = commands.add_parser('import', help='Index sessions exported with "Export CSV"')
+        importer.add_argument('exports', nargs='+', help='CSV files or glob patterns')
+        query = commands.add_parser('query', help='List the sessions that match all the conditions')
+        query.add_argument('--sensor', default=None)
+        query.add_argument('--samples-per-second', type=float, default=None)
+        query.add_argument('--min-trials', type=int, default=None)
+        query.add_argument('--sex', default=None)
+        arguments = parser.parse_args()
+        index = Session_Index(arguments.index)
+        started = time.perf_counter()
+        if arguments.command == 'import':
+            paths = sorted(set(path for pattern in arguments.exports for path in (glob.glob(pattern) or [pattern])))
+            for path in paths:
+                index.import_export(path)
+            print(str(len(paths)) + ' sessions indexed in ' + str(round(time.perf_counter() - started, 2)) + ' seconds')
+        else:
+            sessions = index.find_sessions(arguments.sensor, arguments.samples_per_second, arguments.min_trials,
+                                           arguments.sex)
+            for session in sessions:
+                print("\t".join(str(session[key]) for key in session))
+            print(str(len(sessions)) + ' sessions in ' + str(round((time.perf_counter() - started) * 1000, 1)) + ' ms')
+        index.close()
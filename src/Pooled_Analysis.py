@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from built in Python
+import argparse
+import glob
+import time
+
+#? Includes from external modules in Pipfile
+from dotenv import load_dotenv
+
+#? Includes from this project
+from presentiment import pooled_operations, Session_Index
+
+#? Pooled analysis of exported sessions, by group of a participant covariate, e.g.:
+#?  python src/Pooled_Analysis.py "sessions/*.csv" --sensor skin_conductance --permutations 10000 --seed 1
+#? or of the sessions of the session index, e.g. the ones recorded at 20 samples/s with 40 trials or more:
+#?  python src/Pooled_Analysis.py --index --samples-per-second 20 --min-trials 40
+
+if __name__ == '__main__':
+        load_dotenv()
+        parser = argparse.ArgumentParser(description='Pooled presentiment analysis of exported sessions')
+        parser.add_argument('exports', nargs='*', help='Session exports (CSV files or glob patterns)')
+        parser.add_argument('--index', nargs='?', const='', default=None,
+                            help='Take the sessions from the session index (PRESENTIMENT_SESSION_INDEX by default)')
+        parser.add_argument('--samples-per-second', type=float, default=None, help='Only sessions of the index at this rate')
+        parser.add_argument('--min-trials', type=int, default=None, help='Only sessions of the index with these trials')
+        parser.add_argument('--sensor', default='skin_conductance', choices=list(pooled_operations.FN_COLUMNS))
+        parser.add_argument('--covariate', default='sex', choices=list(pooled_operations.COVARIATE_COLUMNS))
+        parser.add_argument('--permutations', type=int, default=pooled_operations.POOLED_PERMUTATIONS)
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (all the CPUs by default)')
+        parser.add_argument('--seed', type=int, default=None)
+        arguments = parser.parse_args()
+        started = time.perf_counter()
+        if arguments.index is not None:
+            # Trial rows already parsed, straight from the index
+            index = Session_Index(arguments.index or None)
+            sessions = index.pooled_sessions(index.find_sessions(arguments.sensor, arguments.samples_per_second,
+                                                                 arguments.min_trials), arguments.sensor)
+            index.close()
+        else:
+            paths = sorted(set(path for pattern in arguments.exports for path in (glob.glob(pattern) or [pattern])))
+            sessions = [pooled_operations.read_session_export(path, arguments.sensor) for path in paths]
+        result = pooled_operations.pooled_analysis(sessions, arguments.covariate, arguments.permutations, arguments.seed,
+                                                   arguments.workers)
+        for line in pooled_operations.pooled_report(result, arguments.covariate):
+            print(line)
+        print(str(len(sessions)) + ' sessions in ' + str(round(time.perf_counter() - started, 1)) + ' seconds')
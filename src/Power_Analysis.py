@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from built in Python
+import argparse
+import csv
+import itertools
+import sys
+import time
+
+#? Includes from this project
+from presentiment import power_operations
+
+#? Power curves of session designs, by simulating sessions and running them through the session analysis
+#? Every combination of the values given is simulated, e.g.:
+#?  python src/Power_Analysis.py --trials 30 45 60 --effect 0 0.25 0.5 --sessions 2000 --csv power.csv
+
+if __name__ == '__main__':
+        defaults = power_operations.DEFAULT_SIMULATION
+        parser = argparse.ArgumentParser(description='Monte Carlo power analysis of presentiment session designs')
+        parser.add_argument('--trials', type=int, nargs='+', default=[defaults['trials']])
+        parser.add_argument('--samples-per-second', type=int, nargs='+', default=[defaults['samples_per_second']])
+        parser.add_argument('--pre-screen', type=int, nargs='+', default=[defaults['pre_screen']],
+                            help='Seconds of the presentiment timeframe')
+        parser.add_argument('--effect', type=float, nargs='+', default=[0.0, 0.25, 0.5, 1.0],
+                            help='Presentiment ramp of the excitatory trials, in units of the white noise sd')
+        parser.add_argument('--drift-sd', type=float, nargs='+', default=[defaults['drift_sd']],
+                            help='Random walk of the tonic level per second, in units of the white noise sd')
+        parser.add_argument('--response', type=float, default=defaults['response'],
+                            help='Response to the neutral stimuli (twice as large to the excitatory ones)')
+        parser.add_argument('--excitatory-fraction', type=float, default=defaults['excitatory_fraction'])
+        parser.add_argument('--sensor', default=defaults['sensor'], help='Kind of sensor, for its filters with --filters')
+        parser.add_argument('--filters', action='store_true',
+                            help='Filter the signal as the "Low-pass and detrend" option of the app (raw by default)')
+        parser.add_argument('--shuffles', type=int, default=defaults['shuffles'],
+                            help='Permutations of each ZD (0 for the closed-form null)')
+        parser.add_argument('--sessions', type=int, default=1000, help='Simulated sessions per design')
+        parser.add_argument('--alpha', type=float, default=0.05, help='One-sided significance level')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (all the CPUs by default)')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--csv', default=None, help='Save the power curves to this file')
+        arguments = parser.parse_args()
+        simulations = [{'trials': trials, 'samples_per_second': sps, 'pre_screen': pre_screen, 'effect': effect,
+                        'drift_sd': drift_sd, 'response': arguments.response, 'shuffles': arguments.shuffles,
+                        'excitatory_fraction': arguments.excitatory_fraction, 'sensor': arguments.sensor,
+                        'filters': arguments.filters}
+                       for trials, sps, pre_screen, drift_sd, effect in itertools.product(
+                           arguments.trials, arguments.samples_per_second, arguments.pre_screen, arguments.drift_sd,
+                           arguments.effect)]
+        started = time.perf_counter()
+        results = power_operations.power_analysis(simulations, arguments.sessions, arguments.alpha, arguments.workers,
+                                                  arguments.seed)
+        columns = ['trials', 'samples_per_second', 'pre_screen', 'drift_sd', 'effect', 'filters']
+        rows = [[result['simulation'][column] for column in columns]
+                + [round(result['power'], 4), round(result['mean_ZD'], 4), round(result['sd_ZD'], 4), result['sessions']]
+                for result in results]
+        header = columns + ['power', 'mean_ZD', 'sd_ZD', 'sessions']
+        writer = csv.writer(sys.stdout, delimiter='\t')
+        writer.writerow(header)
+        writer.writerows(rows)
+        print(str(len(simulations) * arguments.sessions) + ' sessions in ' + str(round(time.perf_counter() - started, 1))
+              + ' seconds')
+        if arguments.csv:
+            with open(arguments.csv, 'w', newline='') as file:
+                csv.writer(file).writerows([header] + rows)
@@ -49,7 +49,7 @@ from UI import Create_Window
 # TODO: Include FOR loop for each psyleron connected on "click_refresh_sources"
 # TODO: Add dimensions of analysis (ex. Fear[Dead-Danger, Animals-Injuries, etc.])
 #& Wishlist
-    #! Separación entre hombres y mujeres
+    #$ Separación entre hombres y mujeres (DONE)
     #! Seleccionar estímulos visuales
         #$ Images (DONE)
         #! Light flashes
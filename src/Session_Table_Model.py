@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# ? Includes from external modules in Pipfile
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtWidgets import QTableView, QHeaderView, QAbstractItemView
+import numpy
+
+# ? Includes from this project
+from presentiment import analysis_operations
+
+#? Kinds of column:
+#?  'text'  -> any Python value, shown with str()
+#?  'float' -> float64 array, NaN is shown empty
+#?  'time'  -> int64 epoch milliseconds, shown in local time as '%H:%M:%S.%f'[:-3]
+#?  'count' -> int64 array, values <= 0 are shown empty
+
+
+class Session_Table_Model(QAbstractTableModel):
+    #? Table model backed directly by the session arrays; the view only asks for the visible cells,
+    #? so showing a long session costs the same per repaint as showing a short one
+    def __init__(self, columns, parent=None):
+        # columns: list of (key, title, kind)
+        super().__init__(parent)
+        self.keys = [key for key, _, _ in columns]
+        self.titles = [title for _, title, _ in columns]
+        self.kinds = [kind for _, _, kind in columns]
+        self.index_of = {key: number for number, key in enumerate(self.keys)}
+        self.columns = [[] for _ in self.keys]
+        self.rows = 0
+
+    # & QAbstractTableModel
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.keys)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.titles[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        column = self.columns[index.column()]
+        if index.row() >= len(column):
+            return ""
+        return self.format_value(self.kinds[index.column()], column[index.row()])
+
+    def format_value(self, kind, value):
+        if kind == 'float':
+            return "" if numpy.isnan(value) else str(float(value))
+        if kind == 'time':
+            return analysis_operations.format_timestamps([value])[0]
+        if kind == 'count':
+            return str(int(value)) if value > 0 else ""
+        return str(value)
+
+    # & SESSION DATA
+    def column(self, key):
+        return self.columns[self.index_of[key]]
+
+    def set_columns(self, columns_by_key):
+        # Replace whole columns at once (lists or NumPy arrays), without copying them
+        self.beginResetModel()
+        for key, values in columns_by_key.items():
+            self.columns[self.index_of[key]] = values
+        self.rows = max([len(values) for values in self.columns] + [0])
+        self.endResetModel()
+
+    def append_value(self, key, value):
+        # Append one value at the end of a column made of a list (e.g. one trial)
+        number = self.index_of[key]
+        column = self.columns[number]
+        if not isinstance(column, list):
+            column = list(column)
+            self.columns[number] = column
+        row = len(column)
+        if row >= self.rows:
+            self.beginInsertRows(QModelIndex(), self.rows, row)
+            column.append(value)
+            self.rows = row + 1
+            self.endInsertRows()
+        else:
+            column.append(value)
+            cell = self.index(row, number)
+            self.dataChanged.emit(cell, cell)
+
+    def clear(self):
+        self.beginResetModel()
+        self.columns = [[] for _ in self.keys]
+        self.rows = 0
+        self.endResetModel()
+
+    def export_column(self, key):
+        #? Column ready to be exported with pandas; empty cells are NaN or empty strings
+        number = self.index_of[key]
+        kind = self.kinds[number]
+        column = self.columns[number]
+        if kind == 'float':
+            return numpy.asarray(column, dtype=numpy.float64)
+        if kind == 'time':
+            return analysis_operations.format_timestamps(column)
+        if kind == 'count':
+            column = numpy.asarray(column, dtype=numpy.int64)
+            return numpy.where(column > 0, column.astype(str), "")
+        return list(column)
+
+
+def create_table_view(model):
+    #? Table view with fixed row heights, so Qt never measures rows that are not visible
+    view = QTableView()
+    view.setModel(model)
+    view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    view.setWordWrap(False)
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    view.verticalHeader().setDefaultSectionSize(view.fontMetrics().height() + 6)
+    view.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+    view.horizontalHeader().setDefaultSectionSize(160)
+    return view
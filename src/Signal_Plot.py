@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# ? Includes from external modules in Pipfile
+from PyQt5 import QtGui
+from PyQt5.QtCore import Qt, QTimer, QLineF, QPointF
+from PyQt5.QtWidgets import QWidget
+import numpy
+
+# ? Includes from this project
+from presentiment import Min_Max_Index
+
+# Refresh period of the plots in milliseconds (30 fps)
+REFRESH_MS = 33
+
+
+class Signal_Plot(QWidget):
+    #? Live plot of one physiological channel; it draws one min/max line per pixel column from a Min_Max_Index,
+    #? so the cost of a repaint depends on the width of the widget and not on the length of the session
+    def __init__(self, title, color, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.color = QtGui.QColor(color)
+        self.index = Min_Max_Index()
+        self.painted_version = -1
+        # Text shown after the title (e.g. the samples flagged by the validation)
+        self.status = ""
+        self.setMinimumHeight(150)
+        # Repaint only when new samples arrived since the last frame
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_MS)
+
+    def append(self, values):
+        # Can be called from the acquisition thread; the index has its own lock
+        self.index.append(values)
+
+    def clear(self):
+        self.index.clear()
+        self.status = ""
+        self.update()
+
+    def set_status(self, status):
+        self.status = status
+        self.update()
+
+    def refresh(self):
+        if self.index.get_version() != self.painted_version:
+            self.update()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        painter.setPen(Qt.black)
+        painter.drawText(6, 16, self.title + " (" + str(len(self.index)) + " samples)" + self.status)
+        self.painted_version = self.index.get_version()
+        margin_top, margin = 24, 6
+        width = self.width() - 2 * margin
+        height = self.height() - margin_top - margin
+        if width <= 0 or height <= 0:
+            return
+        positions, mins, maxs = self.index.query(0, len(self.index), width)
+        if len(positions) == 0:
+            return
+        low, high = numpy.nanmin(mins), numpy.nanmax(maxs)
+        if not numpy.isfinite(low) or not numpy.isfinite(high):
+            return
+        span = (high - low) or 1.0
+        # Map samples to pixel columns and values to rows (higher values on top)
+        x = margin + positions * (width / max(len(self.index), 1))
+        y_min = margin_top + height - (mins - low) / span * height
+        y_max = margin_top + height - (maxs - low) / span * height
+        painter.setPen(QtGui.QPen(self.color, 1))
+        if len(positions) == len(self.index):
+            # Fewer samples than columns: draw the signal as a polyline
+            painter.drawPolyline(QtGui.QPolygonF([QPointF(px, py) for px, py in zip(x.tolist(), y_min.tolist())]))
+        else:
+            # One vertical line per column from its min to its max, joined with the next column
+            lines = [QLineF(px, top, px, bottom) for px, top, bottom in zip(x.tolist(), y_max.tolist(), y_min.tolist())]
+            lines += [QLineF(x0, y0, x1, y1) for x0, y0, x1, y1 in zip(
+                x[:-1].tolist(), y_min[:-1].tolist(), x[1:].tolist(), y_max[1:].tolist())]
+            painter.drawLines(lines)
+        painter.setPen(Qt.darkGray)
+        painter.drawText(self.width() - 120, 16, "%.3f - %.3f" % (low, high))
@@ -20,22 +20,47 @@ limitations under the License.
 
 # ? Includes from built in Python
 import time
-import threading
 from datetime import datetime, timedelta
 import glob
 import os
+import sqlite3
 
 # ? Includes from external modules in Pipfile
 from PyQt5 import QtGui
 from PyQt5.QtCore import Qt, QTimer, QEventLoop, QDir
 from PyQt5.QtWidgets import (QComboBox, QDialog, QGridLayout, QGroupBox, QLabel, QLineEdit,
                              QPushButton, QTextEdit, QVBoxLayout, QHBoxLayout, QWidget, QMessageBox, QSpinBox,
-                             QCheckBox, QFileDialog, QTabWidget)
+                             QCheckBox, QFileDialog, QTabWidget, QProgressBar)
 from PIL import Image  # Pillow
 import numpy
 
 # ? Includes from this project
-from presentiment import data_handling_operations, presentiment_operations, Neulog, Pseudo_RNG, PsyREG
+from presentiment import data_handling_operations, presentiment_operations, analysis_operations, quality_operations, sequential_operations, bootstrap_operations, Session_Index, Session_Container, PHYS_FILTERS, Pulse_Detector, Pseudo_RNG, OS_RNG, PsyREG, PsyREG_driver_loaded, PsyREG_Pool, RNG_Monitor, discover_sensor_backends
+from Analysis_Worker import Analysis_Worker
+from Session_Table_Model import Session_Table_Model, create_table_view
+from Signal_Plot import Signal_Plot
+
+# Milliseconds between two reads of the acquisition sample buffers for the live plots
+LIVE_REFRESH_MS = 100
+# Policy of the signal-quality validation for each option of the statistical analysis tab
+QUALITY_POLICIES = {
+    "Exclude trials with bad samples": quality_operations.POLICY_EXCLUDE,
+    "Interpolate bad samples": quality_operations.POLICY_INTERPOLATE,
+}
+# Options of the participant covariates of a session, exported for the pooled analysis (see pooled_operations)
+PARTICIPANT_SEXES = ["Not given", "Female", "Male"]
+# Baseline of the presentiment timeframe for each option of the statistical analysis tab
+BASELINES = {
+    "Mean / SD": analysis_operations.BASELINE_MEAN,
+    "Median / MAD": analysis_operations.BASELINE_MEDIAN,
+    "Trimmed mean / Winsorized SD": analysis_operations.BASELINE_TRIMMED,
+}
+# Filters of each kind of sensor for each option of the statistical analysis tab; the raw signal (the PAA method of
+# the earlier sessions) is the default, so D and ZD stay comparable with them
+PHYS_FILTER_OPTIONS = {
+    "Raw (no filters)": {},
+    "Low-pass and detrend (skin conductance)": PHYS_FILTERS,
+}
 
 
 class Create_Window(QDialog):
@@ -56,7 +81,60 @@ class Create_Window(QDialog):
         self.create_data_layout()
         self.create_phys_layout()
         self.create_stats_layout()
+        self.create_live_layout()
         self.create_buttons()
+        self.create_phys_widgets()
+        # Session-end analysis runs on a thread pool
+        self.analysis_worker = Analysis_Worker(parent=self)
+        self.analysis_worker.progress.connect(self.onAnalysisProgress)
+        self.analysis_worker.finished.connect(self.onAnalysisFinished)
+        self.analysis_worker.failed.connect(self.onAnalysisFailed)
+        self.analysis_worker.cancelled.connect(self.onAnalysisCancelled)
+        # Interim analyses of the sequential analysis run on their own worker, so the trials are not delayed
+        self.sequential_worker = Analysis_Worker(max_workers=1, parent=self)
+        self.sequential_worker.finished.connect(self.onSequentialFinished)
+        # Sensor backends found by the last refresh (name -> backend)
+        self.sensor_backends = {}
+        # Sensor acquisitions of the session (one per backend) and the sequence number each one was read up to;
+        # they record in their own process, the live plots read them every LIVE_REFRESH_MS
+        self.acquisitions = []
+        self.live_cursors = []
+        # Samples per second selected for each sensor of the session; the analysis grid uses the highest one
+        self.phys_rates = {}
+        self.analysis_rate = 1
+        # Valid values of each sensor and the state and flagged samples of its live validation
+        self.phys_value_ranges = {}
+        self.live_quality = {}
+        # Kinds recorded as a waveform and the beat detectors of their live plots (with the last heart rate)
+        self.phys_waveforms = []
+        self.live_pulse = {}
+        self.live_bpm = {}
+        # Filters and validation of the last analysis, one line each
+        self.phys_report = []
+        # D, ZD and Fn of every sensor of the last analysis, for the session index
+        self.phys_results = {}
+        # Container the samples of the session are appended to (only if PRESENTIMENT_SESSION_DIR is set)
+        self.session_container = None
+        # ZD boundaries of the sequential analysis of the session (None if it is off) and its decisions, one line each
+        self.sequential_boundaries = None
+        self.sequential_report = []
+        self.sequential_declined = False
+        # Sensor and trial of the interim analysis that is running, and the last boundary crossing not asked about yet
+        self.sequential_sensor = None
+        self.sequential_trial = 0
+        self.sequential_crossing = None
+        # Epoch ms at which the first trial started and the session finished
+        self.t_onset = 0
+        self.t_finish = 0
+        self.live_timer = QTimer(self)
+        self.live_timer.setInterval(LIVE_REFRESH_MS)
+        self.live_timer.timeout.connect(self.read_live_samples)
+        # All the connected Psylerons combined in one RNG, created when there are 2 or more
+        self.psyleron_pool = None
+        # Health tests of every bit the RNG gives during a session
+        self.rng_monitor = RNG_Monitor(on_alarm=self.onRNGAlarm)
+        # OS entropy RNG, kept for the whole app so its buffer is reused between trials
+        self.os_rng = OS_RNG()
         # Create list of stimuli:
         self.image_list_neutral = []
         self.image_list_neutral_filenames = []
@@ -71,6 +149,7 @@ class Create_Window(QDialog):
         Tab_Widget.addTab(self.gb_session_data, "Session Data")
         Tab_Widget.addTab(self.gb_phys_data, "Physiological Data")
         Tab_Widget.addTab(self.gb_stats_data, "Statistical Analysis")
+        Tab_Widget.addTab(self.gb_live_signals, "Live Signals")
         main_layout.addWidget(Tab_Widget)
         main_layout.addLayout(self.layout_buttons, 2)
         self.setLayout(main_layout)
@@ -116,9 +195,14 @@ class Create_Window(QDialog):
             # & 2.1.1. SESSION ID
             self.sb_session_id = QSpinBox()
             self.sb_session_id.setValue(1)
+            self.combo_participant_sex = QComboBox()
+            self.combo_participant_sex.addItems(PARTICIPANT_SEXES)
             # & 2.1.3. TRIALS NUM
             self.sb_num_trials = QSpinBox()
             self.sb_num_trials.setValue(3)  # $ 45
+            # Sequential analysis: D and ZD after every trial, the session can stop early
+            self.cb_sequential = QCheckBox("Sequential analysis")
+            self.lb_sequential = QLabel("")
             # & 2.2.1. TRIALS DURATION ELEMENTS
             self.sb_pre_screen = QSpinBox()
             self.sb_pre_screen.setValue(1)  # $ 3
@@ -226,6 +310,9 @@ class Create_Window(QDialog):
                 self.check_skin_conductance)
             self.cb_heart_rate = QCheckBox("Heart Rate")
             self.cb_heart_rate.toggled.connect(self.check_heart_rate)
+            # Record the pulse waveform and obtain the heart rate from its beats (needs 50 or 100 per second)
+            self.cb_pulse_waveform = QCheckBox("Pulse waveform")
+            self.cb_pulse_waveform.setDisabled(True)
             self.cb_brainwaves = QCheckBox("Brain Waves")
             self.cb_brainwaves.toggled.connect(self.check_brainwaves)
         # & SET LAYOUTS
@@ -293,6 +380,7 @@ class Create_Window(QDialog):
                 self.combo_skin_conductance_sample, 1, 5, 1, 2)
             layout_physiological.addWidget(
                 self.combo_heart_rate_sample, 2, 5, 1, 2)
+            layout_physiological.addWidget(self.cb_pulse_waveform, 2, 7, 1, 1)
             layout_physiological.addWidget(
                 self.combo_brainwaves_sample, 3, 5, 1, 2)
             self.gb_physiological.setLayout(layout_physiological)
@@ -307,12 +395,16 @@ class Create_Window(QDialog):
             layout_trial_and_screen.addWidget(self.gb_num_trials)
             # & 2.1.1. SESSION ID
             layout_session_id.addWidget(self.sb_session_id)
+            layout_session_id.addWidget(QLabel("Participant sex:"))
+            layout_session_id.addWidget(self.combo_participant_sex)
             self.gb_session_id.setLayout(layout_session_id)
             # & 2.1.2. TRIAL TYPE
             layout_trial_type.addWidget(self.combo_trial_type)
             self.gb_trial_type.setLayout(layout_trial_type)
             # & 2.1.3. TRIALS NUM
             layout_trial.addWidget(self.sb_num_trials)
+            layout_trial.addWidget(self.cb_sequential)
+            layout_trial.addWidget(self.lb_sequential)
             self.gb_num_trials.setLayout(layout_trial)
             # & 2.2. TRIALS DURATION
             layout_duration.addWidget(self.gb_pre_screen, 0, 0)
@@ -352,18 +444,19 @@ class Create_Window(QDialog):
             self.tb_start_at = QLineEdit("Session started at:")
             self.tb_finish_at = QLineEdit("Session finished at:")
             self.tb_onset_at = QLineEdit("First trial started at:")
-            self.tb_stimulus_id = QTextEdit("Stimulus ID:")
-            self.tb_trial_id = QTextEdit("Trial ID:")
-            self.tb_time_start_trial = QTextEdit("Time at the start of trial:")
-            self.tb_dur_before_interval = QTextEdit(
-                "Interval before each trial (s):")
-            self.tb_onset_to_trial = QTextEdit(
-                "First trial to end of this trial (s):")
-            self.tb_seconds_end_trial = QTextEdit(
-                "Duration of each trial (s):")
-            self.tb_dur_after_interval = QTextEdit(
-                "Interval after each trial (s):")
-            self.tb_time_end_trial = QTextEdit("Time at the end of trial:")
+        # & TABLE
+            # One row per trial, backed by the session arrays
+            self.session_model = Session_Table_Model([
+                ('trial_id', "Trial ID:", 'text'),
+                ('stimulus_id', "Stimulus ID:", 'text'),
+                ('time_start_trial', "Time at the start of trial:", 'time'),
+                ('time_end_trial', "Time at the end of trial:", 'time'),
+                ('dur_before_interval', "Interval before each trial (s):", 'text'),
+                ('dur_after_interval', "Interval after each trial (s):", 'text'),
+                ('seconds_end_trial', "Duration of each trial (s):", 'text'),
+                ('onset_to_trial', "First trial to end of this trial (s):", 'text'),
+            ], self)
+            self.tv_session_data = create_table_view(self.session_model)
         # & SET LAYOUT
             layout = QGridLayout()
             # top lane
@@ -371,111 +464,60 @@ class Create_Window(QDialog):
             layout.addWidget(self.tb_onset_at, 0, 3, 1, 2)
             layout.addWidget(self.tb_finish_at, 0, 5, 1, 3)
             # below lane
-            layout.addWidget(self.tb_trial_id, 1, 0, 5, 1)
-            layout.addWidget(self.tb_stimulus_id, 1, 1, 5, 1)
-            layout.addWidget(self.tb_time_start_trial, 1, 2, 5, 1)
-            layout.addWidget(self.tb_time_end_trial, 1, 3, 5, 1)
-            layout.addWidget(self.tb_dur_before_interval, 1, 4, 5, 1)
-            layout.addWidget(self.tb_dur_after_interval, 1, 5, 5, 1)
-            layout.addWidget(self.tb_seconds_end_trial, 1, 6, 5, 1)
-            layout.addWidget(self.tb_onset_to_trial, 1, 7, 5, 1)
+            layout.addWidget(self.tv_session_data, 1, 0, 5, 8)
             self.gb_session_data.setLayout(layout)
 
     def create_phys_layout(self):
             # & GROUP BOXES
             self.gb_phys_data = QGroupBox("")
             self.gb_phys_time = QGroupBox("Physiologial Time Data:")
-            self.gb_phys_trial_inst = QGroupBox("Trials and Instances:")
-            self.gb_phys_skin_conductance = QGroupBox("Skin Conductance Data:")
-            self.gb_phys_heart_rate = QGroupBox("Heart Rate Data:")
-            self.gb_phys_brainwaves = QGroupBox("Brainwaves Data:")
+            self.gb_phys_samples = QGroupBox(
+                "Trials, Instances, Skin Conductance, Heart Rate and Brainwaves Data:")
         # & TEXT BOX
             # Create text boxes
-            self.tb_phys_trial_id = QTextEdit("Trial ID [n]:")
-            self.tb_phys_instance_id = QTextEdit("Instance [i]:")
             self.tb_phys_start_at = QLineEdit("Physiological data started at:")
             self.tb_phys_finish_at = QLineEdit(
                 "Physiological data finished at:")
-            self.tb_skin_conductance_values = QTextEdit(
-                "Skin conductance values [xi]:")
-            self.tb_skin_conductance_timestamp = QTextEdit(
-                "Skin conductance timestamps [t_xi]:")
-            self.tb_heart_rate_values = QTextEdit("Heart rate values [yi]:")
-            self.tb_heart_rate_timestamp = QTextEdit(
-                "Heart rate timestamps [t_yi]:")
-            self.tb_brainwaves_values = QTextEdit("Brainwaves values [zi]:")
-            self.tb_brainwaves_timestamp = QTextEdit(
-                "Brainwaves timestamps [t_zi]:")
-            self.tb_skin_conductance_media = QTextEdit(
-                "Skin conductance media [mx_paa]:")
-            self.tb_skin_conductance_sd = QTextEdit(
-                "Skin conductance sd [sx_paa]:")
-            self.tb_skin_conductance_Z = QTextEdit(
-                "Skin conductance Z [Z_xi]:")
-            self.tb_skin_conductance_f = QTextEdit(
-                "Skin conductance f [f_xi]:")
-            self.tb_heart_rate_media = QTextEdit("Heart rate media [my_paa]:")
-            self.tb_heart_rate_sd = QTextEdit("Heart rate sd [sy_paa]:")
-            self.tb_heart_rate_Z = QTextEdit("Heart rate Z [Z_yi]:")
-            self.tb_heart_rate_f = QTextEdit("Heart rate f [f_yi]:")
-            self.tb_brainwaves_media = QTextEdit("Brainwaves media [mz_paa]:")
-            self.tb_brainwaves_sd = QTextEdit("Brainwaves sd [sz_paa]:")
-            self.tb_brainwaves_Z = QTextEdit("Brainwaves Z [Z_zi]:")
-            self.tb_brainwaves_f = QTextEdit("Brainwaves f [f_zi]:")
+        # & TABLE
+            # One row per sample, backed by the arrays of the analysis
+            self.phys_model = Session_Table_Model([
+                ('phys_trial_id', "Trial ID [n]:", 'text'),
+                ('phys_instance_id', "Instance [i]:", 'count'),
+                ('skin_conductance_values', "Skin conductance values [xi]:", 'float'),
+                ('skin_conductance_timestamp', "Skin conductance timestamps [t_xi]:", 'time'),
+                ('skin_conductance_media', "Skin conductance media [mx_paa]:", 'float'),
+                ('skin_conductance_sd', "Skin conductance sd [sx_paa]:", 'float'),
+                ('skin_conductance_Z', "Skin conductance Z [Z_xi]:", 'float'),
+                ('skin_conductance_f', "Skin conductance f [f_xi]:", 'float'),
+                ('heart_rate_values', "Heart rate values [yi]:", 'float'),
+                ('heart_rate_timestamp', "Heart rate timestamps [t_yi]:", 'time'),
+                ('heart_rate_media', "Heart rate media [my_paa]:", 'float'),
+                ('heart_rate_sd', "Heart rate sd [sy_paa]:", 'float'),
+                ('heart_rate_Z', "Heart rate Z [Z_yi]:", 'float'),
+                ('heart_rate_f', "Heart rate f [f_yi]:", 'float'),
+                ('brainwaves_values', "Brainwaves values [zi]:", 'float'),
+                ('brainwaves_timestamp', "Brainwaves timestamps [t_zi]:", 'time'),
+                ('brainwaves_media', "Brainwaves media [mz_paa]:", 'float'),
+                ('brainwaves_sd', "Brainwaves sd [sz_paa]:", 'float'),
+                ('brainwaves_Z', "Brainwaves Z [Z_zi]:", 'float'),
+                ('brainwaves_f', "Brainwaves f [f_zi]:", 'float'),
+            ], self)
+            self.tv_phys_data = create_table_view(self.phys_model)
         # & SET LAYOUT
             main_layout = QGridLayout()
             time_layout = QGridLayout()
-            trial_inst_layout = QGridLayout()
-            skin_conductance_layout = QGridLayout()
-            heart_rate_layout = QGridLayout()
-            brainwaves_layout = QGridLayout()
+            samples_layout = QGridLayout()
             # time layout
             time_layout.addWidget(self.tb_phys_start_at, 0, 0, 1, 4)
             time_layout.addWidget(self.tb_phys_finish_at, 0, 4, 1, 4)
-            # trial and instances layout
-            trial_inst_layout.addWidget(self.tb_phys_trial_id, 0, 0, 15, 1)
-            trial_inst_layout.addWidget(self.tb_phys_instance_id, 0, 1, 15, 1)
-            # skin conductance layout
-            skin_conductance_layout.addWidget(
-                self.tb_skin_conductance_values, 0, 0, 5, 1)
-            skin_conductance_layout.addWidget(
-                self.tb_skin_conductance_timestamp, 0, 1, 5, 1)
-            skin_conductance_layout.addWidget(
-                self.tb_skin_conductance_media, 5, 0, 5, 1)
-            skin_conductance_layout.addWidget(
-                self.tb_skin_conductance_sd, 5, 1, 5, 1)
-            skin_conductance_layout.addWidget(
-                self.tb_skin_conductance_Z, 10, 0, 5, 1)
-            skin_conductance_layout.addWidget(
-                self.tb_skin_conductance_f, 10, 1, 5, 1)
-            # heart rate layout
-            heart_rate_layout.addWidget(self.tb_heart_rate_values, 0, 0, 5, 1)
-            heart_rate_layout.addWidget(
-                self.tb_heart_rate_timestamp, 0, 1, 5, 1)
-            heart_rate_layout.addWidget(self.tb_heart_rate_media, 5, 0, 5, 1)
-            heart_rate_layout.addWidget(self.tb_heart_rate_sd, 5, 1, 5, 1)
-            heart_rate_layout.addWidget(self.tb_heart_rate_Z, 10, 0, 5, 1)
-            heart_rate_layout.addWidget(self.tb_heart_rate_f, 10, 1, 5, 1)
-            # brainwaves layout
-            brainwaves_layout.addWidget(self.tb_brainwaves_values, 0, 0, 5, 1)
-            brainwaves_layout.addWidget(
-                self.tb_brainwaves_timestamp, 0, 1, 5, 1)
-            brainwaves_layout.addWidget(self.tb_brainwaves_media, 5, 0, 5, 1)
-            brainwaves_layout.addWidget(self.tb_brainwaves_sd, 5, 1, 5, 1)
-            brainwaves_layout.addWidget(self.tb_brainwaves_Z, 10, 0, 5, 1)
-            brainwaves_layout.addWidget(self.tb_brainwaves_f, 10, 1, 5, 1)
+            # samples layout
+            samples_layout.addWidget(self.tv_phys_data, 0, 0, 15, 8)
             # Apply layouts
             self.gb_phys_time.setLayout(time_layout)
-            self.gb_phys_trial_inst.setLayout(trial_inst_layout)
-            self.gb_phys_skin_conductance.setLayout(skin_conductance_layout)
-            self.gb_phys_heart_rate.setLayout(heart_rate_layout)
-            self.gb_phys_brainwaves.setLayout(brainwaves_layout)
+            self.gb_phys_samples.setLayout(samples_layout)
             # Apply main layout
             main_layout.addWidget(self.gb_phys_time, 0, 0, 1, 8)
-            main_layout.addWidget(self.gb_phys_trial_inst, 1, 0, 15, 2)
-            main_layout.addWidget(self.gb_phys_skin_conductance, 1, 2, 15, 2)
-            main_layout.addWidget(self.gb_phys_heart_rate, 1, 4, 15, 2)
-            main_layout.addWidget(self.gb_phys_brainwaves, 1, 6, 15, 2)
+            main_layout.addWidget(self.gb_phys_samples, 1, 0, 15, 8)
             self.gb_phys_data.setLayout(main_layout)
 
     def create_stats_layout(self):
@@ -493,6 +535,9 @@ class Create_Window(QDialog):
             self.tb_stats_ratio_n = QLineEdit("")
             self.tb_stats_ratio_e = QLineEdit("")
             self.tb_stats_shuffle = QLineEdit("5000")
+            self.tb_stats_bootstrap = QLineEdit(str(bootstrap_operations.BOOTSTRAP_RESAMPLES))
+            # Empty for a random seed
+            self.tb_stats_seed = QLineEdit("")
             self.tb_stats_session_id = QTextEdit("Session ID [S]:")
             self.tb_stats_trial_id = QTextEdit("Trial ID [n]:")
             self.tb_skin_conductance_ZD = QLineEdit("Skin conductance ZD:")
@@ -509,6 +554,18 @@ class Create_Window(QDialog):
             self.lb_stats_ratio = QLabel("Ratio (E:N):")
             self.lb_stats_dotdot = QLabel(":")
             self.lb_stats_shuffle = QLabel('Randomized permutation cycles:')
+            self.lb_stats_bootstrap = QLabel('Bootstrap resamples:')
+            self.lb_stats_seed = QLabel('Seed:')
+            self.lb_stats_quality = QLabel('Bad samples:')
+            self.lb_stats_baseline = QLabel('Baseline:')
+            self.lb_stats_filters = QLabel('Filters:')
+        # & COMBOS
+            self.combo_stats_quality = QComboBox()
+            self.combo_stats_quality.addItems(list(QUALITY_POLICIES))
+            self.combo_stats_baseline = QComboBox()
+            self.combo_stats_baseline.addItems(list(BASELINES))
+            self.combo_stats_filters = QComboBox()
+            self.combo_stats_filters.addItems(list(PHYS_FILTER_OPTIONS))
         # & CHECKBOXES
             self.cb_stats_skin_conductance = QCheckBox("Skin Conductance")
             self.cb_stats_heart_rate = QCheckBox("Heart Rate")
@@ -532,6 +589,17 @@ class Create_Window(QDialog):
             ratio_layout.addWidget(self.tb_stats_ratio_n)
             shuffle_layout.addWidget(self.lb_stats_shuffle)
             shuffle_layout.addWidget(self.tb_stats_shuffle)
+            shuffle_layout.addWidget(self.lb_stats_bootstrap)
+            shuffle_layout.addWidget(self.tb_stats_bootstrap)
+            shuffle_layout.addWidget(self.lb_stats_seed)
+            shuffle_layout.addWidget(self.tb_stats_seed)
+            quality_layout = QHBoxLayout()
+            quality_layout.addWidget(self.lb_stats_quality)
+            quality_layout.addWidget(self.combo_stats_quality)
+            quality_layout.addWidget(self.lb_stats_baseline)
+            quality_layout.addWidget(self.combo_stats_baseline)
+            quality_layout.addWidget(self.lb_stats_filters)
+            quality_layout.addWidget(self.combo_stats_filters)
             phys_layout.addWidget(self.cb_stats_skin_conductance)
             phys_layout.addWidget(self.cb_stats_heart_rate)
             phys_layout.addWidget(self.cb_stats_brainwaves)
@@ -542,8 +610,9 @@ class Create_Window(QDialog):
             self.gb_stats_phys_D.setLayout(phys_D_layout)
             permut_layout.addLayout(ratio_layout, 0, 0, 1, 1)
             permut_layout.addLayout(shuffle_layout, 1, 0, 1, 1)
-            permut_layout.addWidget(self.gb_stats_phys, 0, 1, 2, 2)
-            permut_layout.addWidget(self.gb_stats_phys_D, 0, 3, 2, 2)
+            permut_layout.addLayout(quality_layout, 2, 0, 1, 1)
+            permut_layout.addWidget(self.gb_stats_phys, 0, 1, 3, 2)
+            permut_layout.addWidget(self.gb_stats_phys_D, 0, 3, 3, 2)
             # session and trials layout
             analysis_layout.addWidget(self.tb_stats_session_id)
             analysis_layout.addWidget(self.tb_stats_trial_id)
@@ -565,6 +634,21 @@ class Create_Window(QDialog):
             main_layout.addWidget(self.gb_stats_results, 15, 2, 1, 3)
             self.gb_stats_data.setLayout(main_layout)
 
+    def create_live_layout(self):
+            # & GROUP BOXES
+            self.gb_live_signals = QGroupBox("Live physiological signals (whole session, min/max per pixel):")
+        # & PLOTS
+            self.live_plots = {
+                "skin_conductance": Signal_Plot("Skin conductance [GSR]", "#1f77b4"),
+                "heart_rate": Signal_Plot("Heart rate [Pulse]", "#d62728"),
+                "brainwaves": Signal_Plot("Brainwaves", "#2ca02c"),
+            }
+        # & SET LAYOUT
+            layout = QVBoxLayout()
+            for plot in self.live_plots.values():
+                layout.addWidget(plot)
+            self.gb_live_signals.setLayout(layout)
+
     def create_buttons(self):
             # & BUTTONS
             self.butt_start_session = QPushButton("START SESSION")
@@ -579,6 +663,10 @@ class Create_Window(QDialog):
                 "Export Physiological Data to CSV")
             self.butt_export_CSV_phys.clicked.connect(
                 self.click_export_CSV_phys)
+        # & PROGRESS BAR
+            self.pb_analysis = QProgressBar()
+            self.pb_analysis.setFormat("Analysis: %p%")
+            self.pb_analysis.setValue(0)
         # & SET LAYOUT
             self.layout_buttons = QGridLayout()
             self.layout_buttons.addWidget(self.butt_start_session, 0, 0, 1, 4)
@@ -586,23 +674,90 @@ class Create_Window(QDialog):
             self.layout_buttons.addWidget(self.butt_clear_data, 1, 1)
             self.layout_buttons.addWidget(self.butt_export_CSV, 1, 2)
             self.layout_buttons.addWidget(self.butt_export_CSV_phys, 1, 3)
+            self.layout_buttons.addWidget(self.pb_analysis, 2, 0, 1, 4)
+
+    def create_phys_widgets(self):
+            # Widgets of each sensor, used to apply the results of the analysis; the samples go to phys_model as '<sensor>_<column>'
+            self.phys_widgets = {
+                "skin_conductance": {
+                    'checkbox': self.cb_skin_conductance,
+                    'combo': self.combo_skin_conductance,
+                    'sample': self.combo_skin_conductance_sample,
+                    'test': self.tb_skin_conductance_test,
+                    'Fn': self.tb_skin_conductance_Fn,
+                    'D': self.tb_skin_conductance_D,
+                    'ZD': self.tb_skin_conductance_ZD,
+                },
+                "heart_rate": {
+                    'checkbox': self.cb_heart_rate,
+                    'combo': self.combo_heart_rate,
+                    'sample': self.combo_heart_rate_sample,
+                    'test': self.tb_heart_rate_test,
+                    'Fn': self.tb_heart_rate_Fn,
+                    'D': self.tb_heart_rate_D,
+                    'ZD': self.tb_heart_rate_ZD,
+                },
+                "brainwaves": {
+                    'checkbox': self.cb_brainwaves,
+                    'combo': self.combo_brainwaves,
+                    'sample': self.combo_brainwaves_sample,
+                    'test': self.tb_brainwaves_test,
+                    'Fn': self.tb_brainwaves_Fn,
+                    'D': self.tb_brainwaves_D,
+                    'ZD': self.tb_brainwaves_ZD,
+                },
+            }
+            # Each backend has its own sample rates
+            for kind, widgets in self.phys_widgets.items():
+                widgets['combo'].currentTextChanged.connect(
+                    lambda _, kind=kind: self.set_sample_rates(kind))
+
+    def closeEvent(self, event):
+            # Stop any running analysis and acquisition before closing
+            self.analysis_worker.shutdown()
+            self.sequential_worker.shutdown()
+            self.release_acquisition()
+            self.close_psyleron_pool()
+            self.end_psyleron_session()
+            super().closeEvent(event)
 
     # & CLICK BUTTONS
     def click_start_session(self):
             # Call start_session with stated number of trials
             self.start_session(int(self.sb_num_trials.value()))
 
-    def click_refresh_physiological(self):  # !
-            pass
+    def click_refresh_physiological(self):
+            self.refresh_sensor_backends()
+            if len(self.sensor_backends) == 0:
+                QMessageBox.about(self, "Physiological", "No physiological sources found")
+
+    def sensor_settings(self):
+            # Values of the window the sensor backends may need
+            return {'neulog_port': self.tb_neulog_port.text()}
+
+    def refresh_sensor_backends(self):
+            # List in each combo the backends that can record that kind of sensor
+            self.sensor_backends = discover_sensor_backends(self.sensor_settings())
+            for kind, widgets in self.phys_widgets.items():
+                widgets['combo'].clear()
+                names = [name for name, backend in self.sensor_backends.items() if kind in backend.kinds]
+                widgets['combo'].addItems(names or ["-"])
+
+    def set_sample_rates(self, kind):
+            # Sample rates of the backend selected for a kind of sensor
+            widgets = self.phys_widgets[kind]
+            backend = self.sensor_backends.get(widgets['combo'].currentText())
+            if backend is None:
+                return
+            current = widgets['sample'].currentText()
+            widgets['sample'].clear()
+            widgets['sample'].addItems([str(rate) + " per second" for rate in backend.sample_rates(kind)])
+            if widgets['sample'].findText(current) >= 0:
+                widgets['sample'].setCurrentText(current)
 
     # $ Callbacks for Refresh Neulog
     def onNeulogReady(self, name):
-            self.combo_skin_conductance.clear()
-            self.combo_heart_rate.clear()
-            self.combo_brainwaves.clear()
-            self.combo_skin_conductance.addItem(name)
-            self.combo_heart_rate.addItem(name)
-            self.combo_brainwaves.addItem(name)
+            self.refresh_sensor_backends()
             QMessageBox.about(self, "Neulog", "Neulog API status: Ready")
 
     def onNeulogExperiment(self):
@@ -616,22 +771,25 @@ class Create_Window(QDialog):
     # $ End of callbacks for Refresh Neulog
     def click_refresh_neulog(self):
         presentiment_operations.refresh_neulog(
-            self.tb_neulog_port, self.onNeulogReady, self.onNeulogExperiment, self.onNeulogFailed)
+            self.tb_neulog_port.text(), self.onNeulogReady, self.onNeulogExperiment, self.onNeulogFailed)
 
-    def onGetGSRNeulogValue(self, value):
-        self.tb_skin_conductance_test.setText("GSR: " + value)
+    def sensor_test(self, kind):
+        # Show the current value of a sensor from its selected backend
+        widgets = self.phys_widgets[kind]
+        backend = self.sensor_backends.get(widgets['combo'].currentText())
+        if backend is None:
+            widgets['test'].setText("No source")
+            return
+        widgets['test'].setText(backend.channel_label(kind) + ": " + str(backend.read_value(kind)))
 
     def click_skin_conductance_test(self):
-        presentiment_operations.skin_conductance_test(self.tb_neulog_port.text(), self.combo_skin_conductance.currentText(), self.onGetGSRNeulogValue)
-
-    def onGetPulseNeulogValue(self, value):
-        self.tb_heart_rate_test.setText("Pulse: " + value)
+        self.sensor_test('skin_conductance')
 
     def click_heart_rate_test(self):
-        presentiment_operations.skin_conductance_test(self.tb_neulog_port.text(), self.combo_skin_conductance.currentText(), self.onGetGSRNeulogValue)
+        self.sensor_test('heart_rate')
 
-    def click_brainwaves_test(self):  # !
-        pass
+    def click_brainwaves_test(self):
+        self.sensor_test('brainwaves')
 
     def check_skin_conductance(self):
             if self.cb_skin_conductance.isChecked():
@@ -651,11 +809,13 @@ class Create_Window(QDialog):
                 self.tb_heart_rate_test.setEnabled(True)
                 self.butt_heart_rate_test.setEnabled(True)
                 self.combo_heart_rate_sample.setEnabled(True)
+                self.cb_pulse_waveform.setEnabled(True)
             else:
                 self.combo_heart_rate.setEnabled(False)
                 self.tb_heart_rate_test.setEnabled(False)
                 self.butt_heart_rate_test.setEnabled(False)
                 self.combo_heart_rate_sample.setEnabled(False)
+                self.cb_pulse_waveform.setEnabled(False)
 
     def check_brainwaves(self):
             if self.cb_brainwaves.isChecked():
@@ -673,30 +833,86 @@ class Create_Window(QDialog):
             self.combo_rng_sources.clear()
             pseudo = Pseudo_RNG()
             self.combo_rng_sources.addItem(pseudo.name)
+            self.combo_rng_sources.addItem(self.os_rng.name)
+            # The sources are enumerated again, so a Psyleron plugged in since the last refresh shows up
+            self.close_psyleron_pool()
             psyleron = PsyREG()
+            psyleron.clear_RNG()
             if psyleron.count_PsyREGs() >= 1:
                 self.combo_rng_sources.addItem(str(psyleron.get_name()))
             else:
                 pass
+            # With several Psylerons, they can also be read in parallel as one source
+            if psyleron.count_PsyREGs() >= 2:
+                self.psyleron_pool = PsyREG_Pool()
+                self.combo_rng_sources.addItem(self.psyleron_pool.get_name())
+
+    def close_psyleron_pool(self):
+            if self.psyleron_pool is not None:
+                self.psyleron_pool.close()
+                self.psyleron_pool = None
+
+    def end_psyleron_session(self):
+            # Close and release the Psyleron kept open during the session; the dll is not loaded just for this
+            if not PsyREG_driver_loaded():
+                return
+            try:
+                PsyREG().end_session()
+            except OSError as error:
+                print("Psyleron session not ended: " + str(error))
+
+    def selected_software_rng(self):
+            # OS-RNG if it's selected, Pseudo-RNG otherwise
+            if self.os_rng.name == self.combo_rng_sources.currentText():
+                return self.os_rng
+            return Pseudo_RNG()
+
+    def selected_psyleron(self):
+            # The pool of Psylerons if it's selected, the first Psyleron otherwise (None with a software RNG, so the
+            # dll is not loaded for a session that doesn't use it)
+            if self.combo_rng_sources.currentText() in (Pseudo_RNG().name, self.os_rng.name):
+                return None
+            if self.psyleron_pool is not None and self.psyleron_pool.get_name() == self.combo_rng_sources.currentText():
+                return self.psyleron_pool
+            return PsyREG()
 
     def onPsyleronBitGeneration(self, bits):
             self.tb_gen_bits.setText("Psyleron:" + str(bits))
+            # Status and throughput of each device of the pool
+            if self.psyleron_pool is not None and self.psyleron_pool.get_name() == self.combo_rng_sources.currentText():
+                self.tb_gen_bits.setToolTip(self.psyleron_pool.status_text())
+            else:
+                self.tb_gen_bits.setToolTip("")
 
     def onPsyleronBitGenerationFailure(self):
             QMessageBox.about(self, "ERROR", "Psyleron didn't send bits")
 
+    def onRNGAlarm(self, test, p_value):
+            # Not a message box, so the session isn't interrupted; the alarms are also in the exported report
+            self.tb_gen_bits.setText("RNG ALARM: %s failed (p=%.6f)" % (test, p_value))
+            self.tb_gen_bits.setStyleSheet("color: red")
+
     def onPseudoRNGBitGeneration(self, bits):
             self.tb_gen_bits.setText("Pseudo-RNG:" + str(bits))
 
+    def onOSRNGBitGeneration(self, bits):
+            self.tb_gen_bits.setText("OS-RNG:" + str(bits))
+
     def onPseudoRNGBitGenerationFailure(self):
             QMessageBox.about(self, "ERROR", "Pseudo-RNG didn't send bits")
 
     def click_generate_bits(self):
         self.tb_gen_bits.clear()
-        if not presentiment_operations.maybe_generate_psyleron_bits(self.combo_rng_sources.currentText(), self.onPsyleronBitGeneration, self.onPsyleronBitGenerationFailure):
+        psyleron = self.selected_psyleron()
+        if psyleron is not None and presentiment_operations.maybe_generate_psyleron_bits(self.combo_rng_sources.currentText(), self.onPsyleronBitGeneration, self.onPsyleronBitGenerationFailure, psyleron):
+            pass
+        elif not presentiment_operations.maybe_generate_OS_RNG_bits(self.combo_rng_sources.currentText(), self.onOSRNGBitGeneration, self.os_rng):
             presentiment_operations.maybe_generate_pseudo_RNG_bits(self.combo_rng_sources.currentText(), self.onPseudoRNGBitGeneration, self.onPseudoRNGBitGenerationFailure)
 
     def click_clear_data(self):
+            # Cancel the analysis of the previous session, if it's still running
+            self.analysis_worker.cancel()
+            self.pb_analysis.reset()
             # Establish again the normal texts
             self.tb_start_at.setText("Session started at:")
             self.tb_finish_at.setText("Session finished at:")
@@ -704,98 +920,52 @@ class Create_Window(QDialog):
             self.tb_skin_conductance_D.setText("Skin conductance D:")
             self.tb_heart_rate_D.setText("Heart rate D:")
             self.tb_brainwaves_D.setText("Brainwaves D:")
-            self.tb_trial_id.setText("Trial ID:")
-            self.tb_stimulus_id.setText("Stimulus ID:")
-            self.tb_time_start_trial.setText("Time at the start of trial:")
-            self.tb_onset_to_trial.setText(
-                "First trial to end of this trial (s):")
-            self.tb_seconds_end_trial.setText("Duration of each trial (s):")
-            self.tb_dur_after_interval.setText(
-                "Interval after each trial (s):")
-            self.tb_dur_before_interval.setText("Interval before trial (s):")
-            self.tb_time_end_trial.setText("Time at the end of trial:")
+            for widgets in self.phys_widgets.values():
+                widgets['D'].setToolTip("")
+                widgets['ZD'].setToolTip("")
+            self.phys_report = []
+            self.phys_results = {}
+            self.sequential_report = []
+            self.lb_sequential.setText("")
+            self.session_model.clear()
+            self.rng_monitor.reset()
+            self.tb_gen_bits.setStyleSheet("")
             self.tb_skin_conductance_Fn.setText(
                 "Skin conductance Fn [Σf_xi_paa]:")
             self.tb_heart_rate_Fn.setText("Heart rate Fn [Σf_yi_paa]:")
             self.tb_brainwaves_Fn.setText("Brainwaves Fn [Σf_zi_paa]:")
             self.tb_phys_start_at.setText("Physiological data started at:")
             self.tb_phys_finish_at.setText("Physiological data finished at:")
-            self.tb_phys_trial_id.setText("Trial ID [n]:")
-            self.tb_phys_instance_id.setText("Instance [i]:")
-            self.tb_skin_conductance_values.setText(
-                "Skin conductance values [xi]:")
-            self.tb_skin_conductance_timestamp.setText(
-                "Skin conductance timestamps [t_xi]:")
-            self.tb_skin_conductance_media.setText(
-                "Skin conductance media [mx_paa]:")
-            self.tb_skin_conductance_sd.setText(
-                "Skin conductance sd [sx_paa]:")
-            self.tb_skin_conductance_Z.setText("Skin conductance Z [Z_xi]:")
-            self.tb_skin_conductance_f.setText("Skin conductance f [f_xi]:")
-            self.tb_heart_rate_values.setText("Heart rate values [yi]:")
-            self.tb_heart_rate_timestamp.setText(
-                "Heart rate timestamps [t_yi]:")
-            self.tb_heart_rate_media.setText("Heart rate media [my_paa]:")
-            self.tb_heart_rate_sd.setText("Heart rate sd [sy_paa]:")
-            self.tb_heart_rate_Z.setText("Heart rate Z [Z_yi]:")
-            self.tb_heart_rate_f.setText("Heart rate f [f_yi]:")
-            self.tb_brainwaves_values.setText("Brainwaves values [zi]:")
-            self.tb_brainwaves_timestamp.setText(
-                "Brainwaves timestamps [t_zi]:")
-            self.tb_brainwaves_media.setText("Brainwaves media [mz_paa]:")
-            self.tb_brainwaves_sd.setText("Brainwaves sd [sz_paa]:")
-            self.tb_brainwaves_Z.setText("Brainwaves Z [Z_zi]:")
-            self.tb_brainwaves_f.setText("Brainwaves f [f_zi]:")
+            self.phys_model.clear()
+            for plot in self.live_plots.values():
+                plot.clear()
 
     def click_export_CSV_phys(self):
-            # Convert text in textbox to string
-            str_session_id = "S" + self.sb_session_id.text()
-            str_phys_trial_id = self.tb_phys_trial_id.toPlainText()
-            str_phys_instance_id = self.tb_phys_instance_id.toPlainText()
-            str_skin_conductance_values = self.tb_skin_conductance_values.toPlainText()
-            str_skin_conductance_timestamp = self.tb_skin_conductance_timestamp.toPlainText()
-            str_skin_conductance_media = self.tb_skin_conductance_media.toPlainText()
-            str_skin_conductance_sd = self.tb_skin_conductance_sd.toPlainText()
-            str_skin_conductance_Z = self.tb_skin_conductance_Z.toPlainText()
-            str_skin_conductance_f = self.tb_skin_conductance_f.toPlainText()
-            str_heart_rate_values = self.tb_heart_rate_values.toPlainText()
-            str_heart_rate_timestamp = self.tb_heart_rate_timestamp.toPlainText()
-            str_heart_rate_media = self.tb_heart_rate_media.toPlainText()
-            str_heart_rate_sd = self.tb_heart_rate_sd.toPlainText()
-            str_heart_rate_Z = self.tb_heart_rate_Z.toPlainText()
-            str_heart_rate_f = self.tb_heart_rate_f.toPlainText()
-            str_brainwaves_values = self.tb_brainwaves_values.toPlainText()
-            str_brainwaves_timestamp = self.tb_brainwaves_timestamp.toPlainText()
-            str_brainwaves_media = self.tb_brainwaves_media.toPlainText()
-            str_brainwaves_sd = self.tb_brainwaves_sd.toPlainText()
-            str_brainwaves_Z = self.tb_brainwaves_Z.toPlainText()
-            str_brainwaves_f = self.tb_brainwaves_f.toPlainText()
-
             # Obtain the path for the file to be saved
             save_path_name, _ = QFileDialog.getSaveFileName(self, 'Save File')
 
             data_handling_operations.export_CSV_phys(
-                str_session_id,
-                str_phys_trial_id,
-                str_phys_instance_id,
-                str_skin_conductance_values,
-                str_skin_conductance_timestamp,
-                str_skin_conductance_media,
-                str_skin_conductance_sd,
-                str_skin_conductance_Z,
-                str_skin_conductance_f,
-                str_heart_rate_values,
-                str_heart_rate_timestamp,
-                str_heart_rate_media,
-                str_heart_rate_sd,
-                str_heart_rate_Z,
-                str_heart_rate_f,
-                str_brainwaves_values,
-                str_brainwaves_timestamp,
-                str_brainwaves_media,
-                str_brainwaves_sd,
-                str_brainwaves_Z,
-                str_brainwaves_f,
+                ["S" + self.sb_session_id.text()],
+                self.phys_model.export_column('phys_trial_id'),
+                self.phys_model.export_column('phys_instance_id'),
+                self.phys_model.export_column('skin_conductance_values'),
+                self.phys_model.export_column('skin_conductance_timestamp'),
+                self.phys_model.export_column('skin_conductance_media'),
+                self.phys_model.export_column('skin_conductance_sd'),
+                self.phys_model.export_column('skin_conductance_Z'),
+                self.phys_model.export_column('skin_conductance_f'),
+                self.phys_model.export_column('heart_rate_values'),
+                self.phys_model.export_column('heart_rate_timestamp'),
+                self.phys_model.export_column('heart_rate_media'),
+                self.phys_model.export_column('heart_rate_sd'),
+                self.phys_model.export_column('heart_rate_Z'),
+                self.phys_model.export_column('heart_rate_f'),
+                self.phys_model.export_column('brainwaves_values'),
+                self.phys_model.export_column('brainwaves_timestamp'),
+                self.phys_model.export_column('brainwaves_media'),
+                self.phys_model.export_column('brainwaves_sd'),
+                self.phys_model.export_column('brainwaves_Z'),
+                self.phys_model.export_column('brainwaves_f'),
                 save_path_name)
 
     def click_export_CSV(self):
@@ -806,17 +976,10 @@ class Create_Window(QDialog):
             str_skin_conductance_D = self.tb_skin_conductance_D.text()
             str_heart_rate_D = self.tb_heart_rate_D.text()
             str_brainwaves_D = self.tb_brainwaves_D.text()
-            str_trial_id = self.tb_trial_id.toPlainText()
-            str_stimulus_id = self.tb_stimulus_id.toPlainText()
-            str_time_start_trial = self.tb_time_start_trial.toPlainText()
-            str_onset_to_trial = self.tb_onset_to_trial.toPlainText()
-            str_seconds_end_trial = self.tb_seconds_end_trial.toPlainText()
-            str_dur_after_interval = self.tb_dur_after_interval.toPlainText()
-            str_dur_before_interval = self.tb_dur_before_interval.toPlainText()
-            str_time_end_trial = self.tb_time_end_trial.toPlainText()
-            str_skin_conductance_Fn = self.tb_skin_conductance_Fn.toPlainText()
-            str_heart_rate_Fn = self.tb_heart_rate_Fn.toPlainText()
-            str_brainwaves_Fn = self.tb_brainwaves_Fn.toPlainText()
+            # Fn textboxes without their first line
+            list_skin_conductance_Fn = self.tb_skin_conductance_Fn.toPlainText().split("\n")[1:]
+            list_heart_rate_Fn = self.tb_heart_rate_Fn.toPlainText().split("\n")[1:]
+            list_brainwaves_Fn = self.tb_brainwaves_Fn.toPlainText().split("\n")[1:]
             # Remove specific text from strings
             str_start_at = str_start_at.replace('Session started at: ', '')
             str_finish_at = str_finish_at.replace('Session finished at: ', '')
@@ -832,27 +995,57 @@ class Create_Window(QDialog):
             save_path_name, _ = QFileDialog.getSaveFileName(self, 'Save File')
 
             data_handling_operations.export_CSV(
-                str_start_at,
-                str_finish_at,
-                str_onset_at,
-                str_skin_conductance_D,
-                str_heart_rate_D,
-                str_brainwaves_D,
-                str_trial_id,
-                str_stimulus_id,
-                str_time_start_trial,
-                str_onset_to_trial,
-                str_seconds_end_trial,
-                str_dur_after_interval,
-                str_dur_before_interval,
-                str_time_end_trial,
-                str_skin_conductance_Fn,
-                str_heart_rate_Fn,
-                str_brainwaves_Fn,
+                [str_start_at],
+                [str_finish_at],
+                [str_onset_at],
+                # Empty when it was not given
+                [self.combo_participant_sex.currentText() if self.combo_participant_sex.currentIndex() > 0 else ""],
+                [str_skin_conductance_D],
+                [str_heart_rate_D],
+                [str_brainwaves_D],
+                self.session_model.export_column('trial_id'),
+                self.session_model.export_column('stimulus_id'),
+                self.session_model.export_column('time_start_trial'),
+                self.session_model.export_column('onset_to_trial'),
+                self.session_model.export_column('seconds_end_trial'),
+                self.session_model.export_column('dur_after_interval'),
+                self.session_model.export_column('dur_before_interval'),
+                self.session_model.export_column('time_end_trial'),
+                list_skin_conductance_Fn,
+                list_heart_rate_Fn,
+                list_brainwaves_Fn,
+                self.rng_monitor.report(),
+                self.phys_report,
                 save_path_name)
+            # Keep the session in the local session index too, for the queries across sessions
+            if save_path_name:
+                self.index_session(save_path_name, str_start_at, str_finish_at, str_onset_at)
+
+    def index_session(self, source, started_at, finished_at, onset_at):
+            # Write the session, its trials and the results of every sensor to the session index
+            try:
+                index = Session_Index()
+                index.add_session(
+                    os.path.abspath(source),
+                    {'label': "S" + self.sb_session_id.text(), 'started_at': started_at, 'finished_at': finished_at,
+                     'onset_at': onset_at,
+                     'participant_sex': self.combo_participant_sex.currentText()
+                     if self.combo_participant_sex.currentIndex() > 0 else None},
+                    {'trial_id': self.session_model.column('trial_id'),
+                     'stimulus_id': self.session_model.column('stimulus_id'),
+                     'time_start': self.session_model.column('time_start_trial'),
+                     'time_end': self.session_model.column('time_end_trial')},
+                    {name: dict(result, samples_per_second=self.phys_rates.get(name))
+                     for name, result in self.phys_results.items()})
+                index.close()
+            except sqlite3.Error as error:
+                QMessageBox.about(self, "Session index", "The session could not be indexed: " + str(error))
 
     def click_stop(self):
             self.CODE_REBOOT = 1
+            self.analysis_worker.cancel()
+            self.sequential_worker.cancel()
+            self.release_acquisition()
             # Close white screen
             self.white_w.close()
             # Add the datastamp for the end of the session
@@ -896,6 +1089,7 @@ class Create_Window(QDialog):
             while bits > max_interval or bits < min_interval:
                 # Obtain specified max bits of RNG to generate interval
                 str_bits = rng.get_bits(len_max_interval)
+                self.rng_monitor.add_bits(str_bits)
                 bits = int(str_bits, 2)
             if bits <= max_interval and bits >= min_interval:
                 interval = bits
@@ -910,14 +1104,15 @@ class Create_Window(QDialog):
             while bits >= len_imglist:
                 # Obtain bits of RNG to generate index for imagelist
                 str_bits = rng.get_bits(len_bin_imagelist)
+                self.rng_monitor.add_bits(str_bits)
                 bits = int(str_bits, 2)
             if bits < len_imglist:
                 # Append with 'N' if neutral and 'E' if excotatory, and show image
                 # Starts counting from 0, so adding + 1 to the string
                 if bits < self.len_image_list_neutral:
-                    self.tb_stimulus_id.append("N-" + str(bits + 1))
+                    self.session_model.append_value('stimulus_id', "N-" + str(bits + 1))
                 else:
-                    self.tb_stimulus_id.append("E-" + str(bits + 1))
+                    self.session_model.append_value('stimulus_id', "E-" + str(bits + 1))
                 # Obtain image number in "image_list_filenames" array
                 self.image_window(self.image_list_filenames[bits])
             else:
@@ -925,215 +1120,269 @@ class Create_Window(QDialog):
                     self, "ERROR", "RNG bits generated an index number out of the range of the image list. Report bug with this messsage 'Review rng_get_image'")
 
     # & DO STUFF
-    def thread_neulog(self, neulog_class, num_sensors, total_secs):
-            # Every (aprox) 10 seconds, get the values from Neulog and save as self.diction; also print length of the list in the dictionary
-            for x in range(total_secs):
-                time.sleep(9)
-                self.diction = neulog_class.get_exp_values()
-                print(datetime.now().strftime('%H:%M:%S.%f')[:-3])
-                for y in range(num_sensors):
-                    print(len(self.diction[y]))
-
-    def delete_unused_phys_data(self, tb_time_versus_ant, tb_time_versus_post, tb_timestamps, tb_phys_vals):
-            # Convert text in textboxes to string
-            str_time_versus_ant = tb_time_versus_ant.text()
-            str_time_versus_post = tb_time_versus_post.text()
-            str_timestamps = tb_timestamps.toPlainText()
-            str_phys_vals = tb_phys_vals.toPlainText()
-            # Obtain only time from string
-            str_time_versus_ant = str_time_versus_ant[-12:]
-            str_time_versus_post = str_time_versus_post[-12:]
-            # Convert string to list
-            list_timestamps = str_timestamps.split("\n")
-            list_phys_vals = str_phys_vals.split("\n")
-            list_time_versus_ant = str_time_versus_ant.split("\n")
-            list_time_versus_post = str_time_versus_post.split("\n")
-            # Store and remove first line in each of the session data lists
-            list_timestamps_0 = list_timestamps[0]
-            del list_timestamps[0]
-            list_phys_vals_0 = list_phys_vals[0]
-            del list_phys_vals[0]
-            # Format the string timestamps to time format
-            list_timestamps_copy = list_timestamps.copy()
-            t_first = datetime.strptime(list_time_versus_ant[0], '%H:%M:%S.%f')
-            t_last = datetime.strptime(list_time_versus_post[0], '%H:%M:%S.%f')
-            count = 0
-            count_last = 0
-            # For each timestamp, format to time and compare to first trial, and...
-            for instance in list_timestamps_copy:
-                t_instance = datetime.strptime(instance, '%H:%M:%S.%f')
-                # remove the ones before the first trial
-                if t_instance < t_first:
-                    list_timestamps.remove(instance)
-                    count += 1
-                # remove the ones after the session ending
-                if t_instance > t_last:
-                    list_timestamps.remove(instance)
-                    count_last += 1
-            # Remove each value in the physical data corresponding to the deleted timestamps
-            for value in range(count):
-                del list_phys_vals[0]
-            for value in range(count_last):
-                del list_phys_vals[-1]
-            # Set the stored text for each textbox
-            tb_timestamps.setText(str(list_timestamps_0))
-            tb_phys_vals.setText(str(list_phys_vals_0))
-            # Append the good timestamps and values, corresponding to the start of the first trial
-            for instance in list_timestamps:
-                tb_timestamps.append(str(instance))
-            for instance in list_phys_vals:
-                tb_phys_vals.append(str(instance))
-
-    def create_phys_ids(self, tb_trials, tb_start_trial, tb_end_trial, tb_timestamps, tb_trialids, tb_instanceids):
-            # Convert text in textboxes to string
-            str_trials = tb_trials.toPlainText()
-            str_start_trial = tb_start_trial.toPlainText()
-            str_end_trial = tb_end_trial.toPlainText()
-            str_timestamps = tb_timestamps.toPlainText()
-            # Convert string to list
-            list_trials = str_trials.split("\n")
-            list_start_trial = str_start_trial.split("\n")
-            list_end_trial = str_end_trial.split("\n")
-            list_timestamps = str_timestamps.split("\n")
-            # Remove first line in each of the data in lists
-            del list_timestamps[0]
-            del list_trials[0]
-            del list_start_trial[0]
-            del list_end_trial[0]
-            # Counts for each trial and instance
-            count_trial = 0
-            count_instance = 1
-            # For each timestamp, format to time and compare to start of trial and end of trial
-            for instance in list_timestamps:
-                t_instance = datetime.strptime(instance, '%H:%M:%S.%f')
-                t_start_instance = datetime.strptime(
-                    list_start_trial[count_trial], '%H:%M:%S.%f')
-                t_end_instance = datetime.strptime(
-                    list_end_trial[count_trial], '%H:%M:%S.%f')
-                # For each instance, add the trial ID and instance ID to the respective textboxes
-                if t_instance >= t_start_instance:
-                    if t_instance < t_end_instance:
-                        tb_trialids.append(str(list_trials[count_trial]))
-                        tb_instanceids.append(str(count_instance))
-                        count_instance += 1
-                    else:
-                        count_trial += 1
-                        count_instance = 1
-                        tb_trialids.append(str(list_trials[count_trial]))
-                        tb_instanceids.append(str(count_instance))
-                        count_instance += 1
-
-    def calculate_media_sd_Z_f_Fn(self, presentiment_instances, tb_no_trials, tb_phys_vals, tb_trialids, tb_instanceids, tb_phys_media, tb_phys_sd, tb_phys_Z, tb_phys_f, tb_Fn):
-            # Convert text in textboxes to string
-            str_no_trials = tb_no_trials.toPlainText()
-            str_phys_vals = tb_phys_vals.toPlainText()
-            str_trialids = tb_trialids.toPlainText()
-            str_instanceids = tb_instanceids.toPlainText()
-            # Convert string to list
-            list_no_trials = str_no_trials.split("\n")
-            list_phys_vals = str_phys_vals.split("\n")
-            list_trialids = str_trialids.split("\n")
-            list_instanceids = str_instanceids.split("\n")
-            # Remove first line in each of the data in lists
-            del list_no_trials[0]
-            del list_phys_vals[0]
-            del list_trialids[0]
-            del list_instanceids[0]
-            # Declare counts:
-            count_presentiment_instances = 1
-            count_trials = 0
-            # Add the presentiment instances per trial to the corresponding presentiment_list
-            presentiment_lists = []
-            presentiment_lists_len = []
-            for trial in list_no_trials:
-                presentiment_lists.append([])
-                count_instances = -1
-                for value in list_phys_vals:
-                    count_instances += 1
-                    if trial == list_trialids[count_instances]:
-                        if count_presentiment_instances <= presentiment_instances:
-                            presentiment_lists[count_trials].append(
-                                float(value))
-                            count_presentiment_instances += 1
-                # Add the lenght of each presentiment list to presentiment_list_len and raise counters
-                presentiment_lists_len.append(
-                    len(presentiment_lists[count_trials]))
-                count_trials += 1
-                count_presentiment_instances = 1
-            # For each trial calculate media and sd of the presentiment timeframe
-            count_trials = 0
-            for trial in list_no_trials:
-                phys_media = numpy.mean(presentiment_lists[count_trials])
-                phys_sd = numpy.std(presentiment_lists[count_trials], ddof=1)
-                # Define counts:
-                count_instances = -1
-                count_Z = -1
-                count_Fn = -1
-                Fn = 0
-                # For each value calculate Z and f, and append media, sd, Z and f to the respective textboxes
-                for value in list_phys_vals:
-                    count_instances += 1
-                    if trial == list_trialids[count_instances]:
-                        phys_Z = (float(value)-phys_media)/phys_sd
-                        count_Z += 1
-                        count_Fn += 1
-                        if count_Z == 0:
-                            Z0 = phys_Z
-                        phys_f = phys_Z - Z0
-                        tb_phys_media.append(str(phys_media))
-                        tb_phys_sd.append(str(phys_sd))
-                        tb_phys_Z.append(str(phys_Z))
-                        tb_phys_f.append(str(phys_f))
-                        # Sum each f in the presentiment timeframe to generate Fn for each trial
-                        if count_Fn < presentiment_lists_len[count_trials]:
-                            Fn += phys_f
-                tb_Fn.append(str(Fn))
-                count_trials += 1
-
-    def calculate_D_Z(self, stimulus_id, trial_Fn, tb_D, tb_ZD):
-            # Store tb_D and tb_ZD text
-            tb_D_text = tb_D.text()
-            tb_ZD_text = tb_ZD.text()
-            # Convert text in textboxes to string
-            str_stimulus_id = stimulus_id.toPlainText()
-            str_trial_Fn = trial_Fn.toPlainText()
-            # Convert string to list
-            list_stimulus_id = str_stimulus_id.split("\n")
-            list_trial_Fn = str_trial_Fn.split("\n")
-            # Remove first line in each of the data in lists
-            del list_stimulus_id[0]
-            del list_trial_Fn[0]
-            # Declare number of stimuli and sums
-            N_stimuli = 0
-            E_stimuli = 0
-            sum_N_stimuli = 0
-            sum_E_stimuli = 0
-            count_trials = 0
-            # Count the number of neutral and excitatory stimuli in the stimulus_id textbox
-            for stim_id in list_stimulus_id:
-                if stim_id[:1] == 'N':
-                    N_stimuli += 1
-                    sum_N_stimuli += float(list_trial_Fn[count_trials])
-                else:
-                    E_stimuli += 1
-                    sum_E_stimuli += float(list_trial_Fn[count_trials])
-                count_trials += 1
-            # Calculate D (Σ FE - Σ FN) and append it to tb_D
-            calc_D = sum_E_stimuli - sum_N_stimuli
-            tb_D.setText(str(tb_D_text) + " " + str(calc_D))
-            # Create list of floats from list_trial_Fn
-            list_trial_Fn_floats = [float(i) for i in list_trial_Fn]
-            # Shuffle 5000 times the Fn values to generate D' to make a normal distribution
-            list_D_prime = []
-            for x in range(5000):
-                numpy.random.shuffle(list_trial_Fn_floats)
-                calc_D_prime = sum(
-                    list_trial_Fn_floats[:E_stimuli]) - sum(list_trial_Fn_floats[E_stimuli:])
-                list_D_prime.append(calc_D_prime)
-            calc_D_prime_media = numpy.mean(list_D_prime)
-            calc_D_prime_sd = numpy.std(list_D_prime)
-            calc_z = (calc_D - calc_D_prime_media) / calc_D_prime_sd
-            tb_ZD.setText(str(tb_ZD_text) + " " + str(calc_z))
+    def read_live_samples(self):
+            # Send the samples published since the last call to the live plots (called by live_timer)
+            for number, acquisition in enumerate(self.acquisitions):
+                view, self.live_cursors[number] = acquisition.read(self.live_cursors[number])
+                if len(view) == 0:
+                    continue
+                for channel, sensor_name in enumerate(acquisition.channel_names):
+                    self.live_plots[sensor_name].append(view['values'][:, channel])
+                    self.check_live_quality(sensor_name, view['timestamp'], view['values'][:, channel])
+                    if self.session_container is not None:
+                        self.session_container.append(sensor_name, view['timestamp'], view['values'][:, channel])
+
+    def check_live_quality(self, sensor_name, timestamps, values):
+            # Validate the new chunk of a sensor, the flagged samples are shown in its live plot
+            status = ""
+            if sensor_name in self.live_pulse:
+                # Waveform: the heart rate of the beats of the chunk is validated instead
+                timestamps, values = self.live_pulse[sensor_name].process(timestamps, values)
+                if len(values) > 0:
+                    self.live_bpm[sensor_name] = values[-1]
+                if sensor_name in self.live_bpm:
+                    status += " - %.0f BPM" % self.live_bpm[sensor_name]
+            state, flagged = self.live_quality.get(sensor_name, (None, 0))
+            flags, state = quality_operations.quality_flags(
+                timestamps, values, self.phys_value_ranges.get(sensor_name), state)
+            flagged += int(numpy.count_nonzero(quality_operations.bad_samples(flags)))
+            self.live_quality[sensor_name] = (state, flagged)
+            if flagged > 0:
+                status += " - " + str(flagged) + " bad samples"
+            if status:
+                self.live_plots[sensor_name].set_status(status)
+
+    def release_acquisition(self):
+            # Stop the acquisitions of the last session and free their shared memory
+            self.live_timer.stop()
+            for acquisition in self.acquisitions:
+                acquisition.release()
+            self.acquisitions = []
+            self.live_cursors = []
+            # A session stopped before its end keeps its samples, without trials
+            if self.session_container is not None:
+                self.session_container.close()
+                self.session_container = None
+
+    def open_session_container(self):
+            # Container of the raw samples of the session in PRESENTIMENT_SESSION_DIR, to analyse it again later
+            session_dir = os.getenv('PRESENTIMENT_SESSION_DIR')
+            if not session_dir:
+                return
+            path = os.path.join(session_dir, "S" + self.sb_session_id.text() + "_"
+                                + datetime.now().strftime('%Y%m%d_%H%M%S') + ".session")
+            try:
+                self.session_container = Session_Container(
+                    path, [sensor_name for acquisition in self.acquisitions for sensor_name in acquisition.channel_names],
+                    {'session_id': "S" + self.sb_session_id.text(), 'samples_per_second': self.phys_rates,
+                     'presentiment_seconds': int(self.sb_pre_screen.value()), 'waveforms': self.phys_waveforms})
+            except OSError as error:
+                QMessageBox.about(self, "Session container", "The samples won't be saved: " + str(error))
+
+    def close_session_container(self):
+            # The trials are known at the end of the session, they go to the container with the trial of every sample
+            if self.session_container is None:
+                return
+            try:
+                self.session_container.set_trials(
+                    self.session_model.column('trial_id'), self.session_model.column('stimulus_id'),
+                    self.session_model.column('time_start_trial'), self.session_model.column('time_end_trial'))
+            except OSError as error:
+                QMessageBox.about(self, "Session container", "The trials couldn't be saved: " + str(error))
+            self.session_container.close()
+            self.session_container = None
+
+    def recorded_phys_sensors(self):
+            # Each sensor is a channel of a sample buffer, read without copying
+            # @returns dict of the values, timestamps, sample rate and analysis options of every sensor recorded
+            phys_sensors = {}
+            for acquisition in self.acquisitions:
+                for channel, sensor_name in enumerate(acquisition.channel_names):
+                    timestamps, values = acquisition.channel(channel)
+                    phys_sensors[sensor_name] = (values, timestamps, self.phys_rates[sensor_name], {
+                        'value_range': self.phys_value_ranges[sensor_name],
+                        'filters': PHYS_FILTER_OPTIONS[self.combo_stats_filters.currentText()].get(sensor_name),
+                        'pulse_wave': sensor_name in self.phys_waveforms})
+            return phys_sensors
+
+    def check_sequential_stop(self, completed, trials):
+            #? Sequential analysis after a trial: the experimenter can stop the session when the last interim analysis
+            #? crossed a boundary; then the interim analysis of the trials completed so far is sent to its worker
+            #? D and ZD are of the first sensor checked, with the closed-form null
+            # @returns True if the session stops here (the trial in course counts as finished)
+            if self.sequential_boundaries is None or completed >= trials or not self.acquisitions:
+                return False
+            if self.ask_sequential_stop(completed, trials):
+                return True
+            phys_sensors = self.recorded_phys_sensors()
+            names = [name for name, widgets in self.phys_widgets.items()
+                     if widgets['checkbox'].isChecked() and name in phys_sensors]
+            if not names:
+                return False
+            now = analysis_operations.now_timestamp()
+            session = {
+                'grid': analysis_operations.analysis_grid(self.t_onset, now, self.analysis_rate),
+                'samples_per_second': self.analysis_rate,
+                'trial_start': numpy.asarray(self.session_model.column('time_start_trial'), dtype=numpy.int64),
+                # The trial in course ends now
+                'trial_end': numpy.asarray(list(self.session_model.column('time_end_trial')) + [now], dtype=numpy.int64),
+                'stimulus_ids': list(self.session_model.column('stimulus_id')),
+                'presentiment_instances': self.analysis_rate * int(self.sb_pre_screen.value()),
+                'shuffles': 0,
+                'quality_policy': QUALITY_POLICIES[self.combo_stats_quality.currentText()],
+                'baseline': BASELINES[self.combo_stats_baseline.currentText()],
+            }
+            # A previous interim analysis still running is cancelled, this one takes its place
+            self.sequential_sensor, self.sequential_trial = names[0], completed
+            self.sequential_worker.start(session, {names[0]: phys_sensors[names[0]]})
+            return False
+
+    def ask_sequential_stop(self, completed, trials):
+            # Ask the experimenter to stop when the last interim analysis crossed a boundary
+            # @returns True if the session stops
+            crossing, self.sequential_crossing = self.sequential_crossing, None
+            if crossing is None or self.sequential_declined:
+                return False
+            decision, trial, status, result = crossing
+            answer = QMessageBox.question(
+                self, "Sequential analysis", status + "\nThe " + decision + " boundary was crossed. Stop the session now?",
+                QMessageBox.Yes | QMessageBox.No)
+            if answer != QMessageBox.Yes:
+                # Once declined, the session runs all its trials (D and ZD are still shown)
+                self.sequential_report.append("sequential: " + decision + " boundary crossed at trial " + str(trial)
+                                              + ", the session went on")
+                self.sequential_declined = True
+                return False
+            self.sequential_report.append("sequential: stopped for " + decision + " at trial " + str(trial) + " of "
+                                          + str(trials) + " (" + self.sequential_sensor + " D " + str(result['D'])
+                                          + ", ZD " + str(result['ZD']) + "), the session ended after trial "
+                                          + str(completed))
+            return True
+
+    def start_analysis(self, phys_sensors):
+            self.close_session_container()
+            # Only the checked sensors are analysed
+            phys_sensors = {name: data for name, data in phys_sensors.items()
+                            if self.phys_widgets[name]['checkbox'].isChecked()}
+            if not phys_sensors:
+                return
+            # Collect the session data used by the analysis
+            self.analysis_trial_ids = list(self.session_model.column('trial_id'))
+            session = {
+                # Every sensor is resampled to this grid before assigning its samples to the trials
+                'grid': analysis_operations.analysis_grid(self.t_onset, self.t_finish, self.analysis_rate),
+                'samples_per_second': self.analysis_rate,
+                'trial_start': numpy.asarray(self.session_model.column('time_start_trial'), dtype=numpy.int64),
+                'trial_end': numpy.asarray(self.session_model.column('time_end_trial'), dtype=numpy.int64),
+                'stimulus_ids': list(self.session_model.column('stimulus_id')),
+                'presentiment_instances': self.presentiment_instances,
+                'shuffles': self.get_shuffle_cycles(),
+                'quality_policy': QUALITY_POLICIES[self.combo_stats_quality.currentText()],
+                'baseline': BASELINES[self.combo_stats_baseline.currentText()],
+                'bootstrap': self.get_bootstrap_resamples(),
+                'bootstrap_seed': self.get_bootstrap_seed(),
+            }
+            if not self.analysis_worker.start(session, phys_sensors):
+                QMessageBox.about(self, "Analysis", "The analysis of the previous session was still running: it was "
+                                  "cancelled and the analysis of this session starts as soon as it stops.")
+
+    def get_shuffle_cycles(self):
+            # Randomized permutation cycles from the Statistical Analysis tab (5000 by default)
+            try:
+                return max(int(self.tb_stats_shuffle.text()), 1)
+            except ValueError:
+                return 5000
+
+    def get_bootstrap_resamples(self):
+            # Bootstrap resamples from the Statistical Analysis tab (0 skips the intervals)
+            try:
+                return max(int(self.tb_stats_bootstrap.text()), 0)
+            except ValueError:
+                return bootstrap_operations.BOOTSTRAP_RESAMPLES
+
+    def get_bootstrap_seed(self):
+            # Seed of the bootstrap for reproducible intervals, None (random) when it is empty
+            try:
+                return int(self.tb_stats_seed.text())
+            except ValueError:
+                return None
+
+    def set_column_text(self, tb_column, lines):
+            # Keep the first line (the title) of the textbox and replace the rest at once
+            title = tb_column.toPlainText().split("\n")[0]
+            tb_column.setPlainText("\n".join([title] + lines))
+
+    # $ Callbacks for the analysis worker
+    def onSequentialFinished(self, results):
+            # D and ZD of the interim analysis; a crossing is asked about at the end of the trial in course
+            if self.sequential_boundaries is None or self.sequential_sensor not in results:
+                return
+            result, trial = results[self.sequential_sensor], self.sequential_trial
+            decision, power = sequential_operations.sequential_decision(result['ZD'], trial, self.sequential_boundaries)
+            status = "Trial " + str(trial) + "/" + str(len(self.sequential_boundaries)) + ": D " + str(
+                round(result['D'], 3)) + ", ZD " + str(round(result['ZD'], 3)) + " (boundary " + str(
+                round(float(self.sequential_boundaries[trial - 1]), 3)) + ", conditional power " + str(round(power, 3)) + ")"
+            self.lb_sequential.setText(status)
+            if decision != sequential_operations.STOP_NONE:
+                self.sequential_crossing = (decision, trial, status, result)
+
+    def onAnalysisProgress(self, done, total):
+            self.pb_analysis.setMaximum(total)
+            self.pb_analysis.setValue(done)
+
+    def onAnalysisFinished(self, results):
+            # Apply the results of every sensor to the widgets in one batch; the arrays are shown without copying them
+            phys_columns = {}
+            # Decisions of the sequential analysis go first
+            self.phys_report = list(self.sequential_report)
+            self.phys_results = {name: {'D': result['D'], 'ZD': result['ZD'], 'Fn': result['Fn']}
+                                 for name, result in results.items()}
+            for name, widgets in self.phys_widgets.items():
+                if name not in results:
+                    continue
+                result = results[name]
+                phys_columns[name + '_values'] = result['values']
+                phys_columns[name + '_timestamp'] = result['timestamps']
+                phys_columns[name + '_media'] = result['media']
+                phys_columns[name + '_sd'] = result['sd']
+                phys_columns[name + '_Z'] = result['Z']
+                phys_columns[name + '_f'] = result['f']
+                self.set_column_text(widgets['Fn'], [str(Fn) for Fn in result['Fn'].tolist()])
+                widgets['D'].setText(widgets['D'].text() + " " + str(result['D']))
+                widgets['ZD'].setText(widgets['ZD'].text() + " " + str(result['ZD']))
+                bootstrap_lines = []
+                if result['intervals'] is not None:
+                    # Percentile interval next to the value, both intervals in the tooltip and the export
+                    for statistic in ('D', 'ZD'):
+                        low, high = result['intervals'][statistic]['percentile']
+                        widgets[statistic].setText(widgets[statistic].text() + " [" + str(round(low, 4)) + ", "
+                                                   + str(round(high, 4)) + "]")
+                    bootstrap_lines = bootstrap_operations.bootstrap_report(
+                        result['intervals'], self.get_bootstrap_resamples(), seed=self.get_bootstrap_seed())
+                    widgets['ZD'].setToolTip("\n".join(bootstrap_lines))
+                # Report of the validation, excluded trials have no Fn
+                widgets['D'].setToolTip("\n".join(result['quality']))
+                # Filters and validation of every sensor go to the export
+                self.phys_report += [name + ": " + line
+                                     for line in ["baseline " + result['baseline']] + result['filters'] + result['quality']
+                                     + bootstrap_lines]
+                # Every sensor has its own grid (and timestamp column); the trial and instance IDs are the ones of the
+                # sensor with the most samples, so they cover the longest column
+                if len(result['trial_index']) > len(phys_columns.get('phys_trial_id', [])):
+                    # Index -1 (outside every trial) takes the empty label at the end
+                    trial_labels = numpy.array(self.analysis_trial_ids + [""])
+                    phys_columns['phys_trial_id'] = trial_labels[result['trial_index']]
+                    phys_columns['phys_instance_id'] = result['instance_ids']
+            self.phys_model.set_columns(phys_columns)
+
+    def onAnalysisFailed(self, message):
+            self.pb_analysis.reset()
+            QMessageBox.about(
+                self, "ERROR", "Statistical analysis can't be realized:\n" + message)
+
+    def onAnalysisCancelled(self):
+            self.pb_analysis.reset()
+    # $ End of callbacks for the analysis worker
 
     # & DISPLAY IMAGES
     def gen_imgage_list(self, open_path, img_list, img_list_fnames):
@@ -1183,77 +1432,73 @@ class Create_Window(QDialog):
             # Print TimeStamp in the "Start at:" box.
             t_start = datetime.now().strftime('%H:%M:%S.%f')[:-3]
             self.tb_start_at.setText("Session started at: " + t_start)
+            self.rng_monitor.reset()
+            # The boundaries of the sequential analysis are fixed before the first trial
+            self.sequential_boundaries = None
+            self.sequential_report = []
+            self.sequential_declined = False
+            self.sequential_worker.cancel()
+            self.sequential_crossing = None
+            self.lb_sequential.setText("")
+            if self.cb_sequential.isChecked():
+                self.sequential_boundaries = sequential_operations.efficacy_boundaries(trials)
+                self.sequential_report = ["sequential: one-sided O'Brien-Fleming alpha spending (alpha "
+                                          + str(sequential_operations.SPENDING_ALPHA) + ") over " + str(trials)
+                                          + " trials, final ZD boundary " + str(round(float(self.sequential_boundaries[-1]), 3))]
         # & START RECORDING PHYSIOLOGICAL DATA
-            # define physiological classes
-            # & NEULOG
-            # Define neulog class
-            neu = Neulog(self.tb_neulog_port.text())
-            neulog_used = False
-            neulog_phys_params = ""
-            neulog_num_sensors = 0
-            # Obtain the max amount of time for each trial
-            neulog_seconds = int(self.sb_first_screen.value()) + (int(self.sb_pre_screen.value()
-                                                                      + self.sb_stim_duration.value() + self.sb_post_screen.value()
-                                                                      + self.sb_before_max_interval.value() + self.sb_after_max_interval.value())
-                                                                  * int(self.sb_num_trials.value()))
-            if self.cb_skin_conductance.isChecked():
-                neulog_num_sensors += 1
-                if neu.name == self.combo_skin_conductance.currentText():
-                    neulog_used = True
-                    neulog_phys_params += ",GSR"
-                    neulog_samples_mult = int(
-                        self.combo_skin_conductance_sample.currentText()[:-11])
-                    # Translate the sample rate in main window to the Neulog API sample rate index
-                    if self.combo_skin_conductance_sample.currentText() == "20 per second":
-                        neulog_rate = '7'
-                    elif self.combo_skin_conductance_sample.currentText() == "10 per second":
-                        neulog_rate = '8'
-                    elif self.combo_skin_conductance_sample.currentText() == "5 per second":
-                        neulog_rate = '9'
-                    elif self.combo_skin_conductance_sample.currentText() == "2 per second":
-                        neulog_rate = '10'
-                    elif self.combo_skin_conductance_sample.currentText() == "1 per second":
-                        neulog_rate = '11'
-                else:
-                    pass
-            if self.cb_heart_rate.isChecked():
-                neulog_num_sensors += 1
-                if neu.name == self.combo_heart_rate.currentText():
-                    neulog_used = True
-                    neulog_phys_params += ",Pulse"
-                    neulog_samples_mult = int(
-                        self.combo_skin_conductance_sample.currentText()[:-11])
-                    # Translate the sample rate in main window to the Neulog API sample rate index
-                    if self.combo_heart_rate_sample.currentText() == "20 per second":
-                        neulog_rate = '7'
-                    elif self.combo_heart_rate_sample.currentText() == "10 per second":
-                        neulog_rate = '8'
-                    elif self.combo_heart_rate_sample.currentText() == "5 per second":
-                        neulog_rate = '9'
-                    elif self.combo_heart_rate_sample.currentText() == "2 per second":
-                        neulog_rate = '10'
-                    elif self.combo_heart_rate_sample.currentText() == "1 per second":
-                        neulog_rate = '11'
-                else:
-                    pass
-            if neulog_used == True:
-                # Obtain neulog parameters
-                exp_params = str(self.tb_neulog_port.text()) + \
-                    neulog_phys_params
-                exp_params_list = exp_params.split(',')
-                neu = Neulog(* exp_params_list)
-                neu.exp_stop()
-                neulog_samples = str(neulog_seconds * neulog_samples_mult)
-                neulog_seconds_threading = int(neulog_seconds / 10)
-                # Start neulog experiment
-                neu.exp_start(neulog_rate, neulog_samples)
-                t_phys_start = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+            # Checked sensors grouped by the backend selected for them
+            backend_kinds = {}
+            for kind, widgets in self.phys_widgets.items():
+                if widgets['checkbox'].isChecked() and widgets['combo'].currentText() in self.sensor_backends:
+                    backend_kinds.setdefault(widgets['combo'].currentText(), []).append(kind)
+            phys_used = len(backend_kinds) > 0
+            # Obtain the max amount of time of the session
+            phys_seconds = int(self.sb_first_screen.value()) + (int(self.sb_pre_screen.value()
+                                                                    + self.sb_stim_duration.value() + self.sb_post_screen.value()
+                                                                    + self.sb_before_max_interval.value() + self.sb_after_max_interval.value())
+                                                                * int(self.sb_num_trials.value()))
+            if phys_used == True:
+                # Start one acquisition per backend, with empty live plots
+                for plot in self.live_plots.values():
+                    plot.clear()
+                self.release_acquisition()
+                # Every sensor records at its own sample rate
+                self.phys_rates = {kind: int(self.phys_widgets[kind]['sample'].currentText()[:-11])
+                                   for kinds in backend_kinds.values() for kind in kinds}
+                self.phys_value_ranges = {kind: self.sensor_backends[backend_name].value_range(kind)
+                                          for backend_name, kinds in backend_kinds.items() for kind in kinds}
+                self.live_quality = {}
+                self.phys_waveforms = []
+                if self.cb_pulse_waveform.isChecked():
+                    self.phys_waveforms = [kind for backend_name, kinds in backend_kinds.items() for kind in kinds
+                                           if kind == 'heart_rate' and kind in self.sensor_backends[backend_name].waveforms]
+                self.live_pulse = {kind: Pulse_Detector() for kind in self.phys_waveforms}
+                self.live_bpm = {}
+                for backend_name, kinds in backend_kinds.items():
+                    acquisition = self.sensor_backends[backend_name].open_acquisition(
+                        kinds, [self.phys_rates[kind] for kind in kinds], phys_seconds,
+                        [kind for kind in kinds if kind in self.phys_waveforms])
+                    if not acquisition.start():
+                        # A backend that didn't start records nothing: its sensors are left out of the session
+                        acquisition.release()
+                        QMessageBox.about(
+                            self, backend_name, "Impossible to start recording with " + backend_name)
+                        continue
+                    self.acquisitions.append(acquisition)
+                    self.live_cursors.append(0)
+                started_kinds = [sensor_name for acquisition in self.acquisitions for sensor_name in acquisition.channel_names]
+                self.phys_rates = {kind: rate for kind, rate in self.phys_rates.items() if kind in started_kinds}
+                phys_used = len(self.acquisitions) > 0
+            if phys_used == True:
+                self.analysis_rate = max(self.phys_rates.values())
+                # The physiological data starts with the first acquisition
+                t_phys_start_ms = min([acquisition.start_timestamp() for acquisition in self.acquisitions])
+                t_phys_start = analysis_operations.format_timestamps([t_phys_start_ms])[0]
                 self.tb_phys_start_at.setText(
                     "Physiological data started at: " + t_phys_start)
-                # Start thread to recover samples every 10 seconds
-                thread1 = threading.Thread(target=self.thread_neulog, args=(
-                    neu, neulog_num_sensors, neulog_seconds_threading,))
-                thread1.start()
+                self.open_session_container()
+                # Read new samples for the live plots from the sample buffers
+                self.live_timer.start()
             else:
                 pass
         # & RESTART CODE
@@ -1272,7 +1517,9 @@ class Create_Window(QDialog):
                 QTimer.singleShot(
                     (int(self.sb_first_screen.value())*1000), loop.quit)
                 loop.exec_()
-                t_onset = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+                # Epoch ms, so the analysis is right for sessions that cross midnight
+                self.t_onset = analysis_operations.now_timestamp()
+                t_onset = analysis_operations.format_timestamps([self.t_onset])[0]
                 self.tb_onset_at.setText("First trial started at: " + t_onset)
         # & START TRIAL
                 # The number of trials is stated in the "click_start_function"
@@ -1281,8 +1528,9 @@ class Create_Window(QDialog):
                     while self.CODE_REBOOT == -1234:
                         # & DEFINE USED VARIABLES
                         # RNGs
-                        psyleron = PsyREG()
-                        pseudo = Pseudo_RNG()
+                        psyleron = self.selected_psyleron()
+                        # Software RNG: Pseudo-RNG or OS-RNG, both are checked with pseudo.name below
+                        pseudo = self.selected_software_rng()
                         # intervals and duration at 0
                         after_interval = 0
                         before_interval = 0
@@ -1326,9 +1574,8 @@ class Create_Window(QDialog):
                         # establish the constant duration of each trial adding the pre_stimuls screen duration, the stimulus duration, and post_stimulus screen duration
                         trial_dur_constant = int(self.sb_pre_screen.value(
                         ) + self.sb_stim_duration.value() + self.sb_post_screen.value())
-                        t_s = datetime.now().strftime('%H:%M:%S.%f')[:-3]
-                        self.tb_time_start_trial.append(t_s)
-                        self.tb_trial_id.append("n" + str(counter_trial))
+                        self.session_model.append_value('time_start_trial', analysis_operations.now_timestamp())
+                        self.session_model.append_value('trial_id', "n" + str(counter_trial))
                 # & ADDITIONAL ON DEMAND PROCEDURE
                         if counter_trial >= 2:
                             # Validate if session is On-demand or free-running
@@ -1346,7 +1593,7 @@ class Create_Window(QDialog):
                                 else:
                                     pass
                                     # & ADD BEFORE STIMULI INTERVAL
-                                if str(psyleron.get_name()) == self.combo_rng_sources.currentText():
+                                if psyleron is not None and str(psyleron.get_name()) == self.combo_rng_sources.currentText():
                                     if psyleron.count_PsyREGs() >= 1:
                                         # Gets random interval from RNG giving the input 1) type of RNG, 2) max interval + 1,
                                         # 3)min interval, 4) length of binary min interval,
@@ -1354,9 +1601,6 @@ class Create_Window(QDialog):
                                         before_interval_1000 = self.rng_get_bits(
                                             psyleron, int_before_bits, int_before_min_interval, len_bin_before_min_interval, int_before_max_interval, len_bin_before_max_interval)
                                         before_interval = before_interval_1000 / 1000
-                                        # Clear and realease psyleron
-                                        psyleron.clear_RNG()
-                                        psyleron.release_RNG()
                                     else:
                                         QMessageBox.about(
                                             self, "ERROR", "Psyleron didn't send bits")
@@ -1391,15 +1635,12 @@ class Create_Window(QDialog):
                 # & SHOW IMAGE FOR SB_IMAGE secs (default = 3)
                         # Selects randomly the image to show, and displays it for 3 seconds
                         # Check if Psyleron is being used
-                        if str(psyleron.get_name()) == self.combo_rng_sources.currentText():
+                        if psyleron is not None and str(psyleron.get_name()) == self.combo_rng_sources.currentText():
                             if psyleron.count_PsyREGs() >= 1:
                                 # Gets random image from RNG giving the input 1) type of RNG, 2) length of image list + 1,
                                 # 3) length of image list, and 4) length of the binary length of image list
                                 self.rng_get_image(
                                     psyleron, image_bits, len_image_list, len_bin_image_list)
-                                # Clear and release Psyleron
-                                psyleron.clear_RNG()
-                                psyleron.release_RNG()
                             else:
                                 QMessageBox.about(
                                     self, "ERROR", "Psyleron didn't send bits")
@@ -1428,134 +1669,74 @@ class Create_Window(QDialog):
                             (int(self.sb_post_screen.value())*1000), loop.quit)
                         loop.exec_()
                 # & SESSION FINISHED?
-                        # Check if all trails have happened (session over)
-                        if counter_trial >= trials:
+                        # Check if all trails have happened (session over), or if the sequential analysis stopped it
+                        if counter_trial >= trials or self.check_sequential_stop(counter_trial, trials):
                             # Close white screen
                             self.white_w.close()
                             # Add the before stimulus interval of last trial
-                            self.tb_dur_before_interval.append(
-                                str(int(before_interval)))
+                            self.session_model.append_value(
+                                'dur_before_interval', int(before_interval))
                             # Add a "0" string to the intervals, as last trial doesn't have interval
-                            self.tb_dur_after_interval.append("0")
+                            self.session_model.append_value('dur_after_interval', 0)
                             # Add the final onset duration
                             onset_duration += (trial_dur_constant +
                                                before_interval)
-                            self.tb_onset_to_trial.append(
-                                str(int(onset_duration)))
+                            self.session_model.append_value(
+                                'onset_to_trial', int(onset_duration))
                             # Add the final onset duration
                             trial_duration += (trial_dur_constant +
                                                before_interval)
-                            self.tb_seconds_end_trial.append(
-                                str(int(trial_duration)))
+                            self.session_model.append_value(
+                                'seconds_end_trial', int(trial_duration))
                             # Add the datastamp at the end of that trial
-                            t_f = datetime.now().strftime('%H:%M:%S.%f')[:-3]
-                            self.tb_time_end_trial.append(t_f)
+                            self.session_model.append_value('time_end_trial', analysis_operations.now_timestamp())
                             # Add the datastamp for the end of the session
-                            t_ff = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+                            self.t_finish = analysis_operations.now_timestamp()
+                            t_ff = analysis_operations.format_timestamps([self.t_finish])[0]
                             self.tb_finish_at.setText(
                                 "Session finished at: " + t_ff)
                             # stop code
                             self.CODE_REBOOT = 1
                         # & PHYSIOLOGICAL DATA
-                            # Validate if neulog us being used
-                            if neulog_used == True:
-                                # Obtain experiment values from Neulog server
-                                sensor_lists = neu.get_exp_values()
-                                sensor_list_index = 0
-                                # Obtain each list in the lists in the Neulog server
-                                for sensor_list in sensor_lists:
-                                    # Obtain the lapse of miliseconds between values of each sample
-                                    neulog_samples_mils = (
-                                        1000/int(neulog_samples_mult))
-                                    t_phys_start_next = t_phys_start
-                                    # Obatain the values for each list
-                                    for sample in sensor_list:
-                                        if sensor_list_index == 0:
-                                            # Append the sensor value to the textbox
-                                            self.tb_skin_conductance_values.append(
-                                                str(float(sample)))
-                                            # Obtain the timestamp corresponding to each value
-                                            t_phys_start_next = datetime.strptime(
-                                                t_phys_start_next, '%H:%M:%S.%f')
-                                            t_phys_start_next = t_phys_start_next + \
-                                                timedelta(
-                                                    milliseconds=neulog_samples_mils)
-                                            t_phys_start_next = t_phys_start_next.strftime('%H:%M:%S.%f')[
-                                                :-3]
-                                            self.tb_skin_conductance_timestamp.append(
-                                                str(t_phys_start_next))
-                                        elif sensor_list_index == 1:
-                                            # Append the sensor value to the textbox
-                                            self.tb_heart_rate_values.append(
-                                                str(float(sample)))
-                                            # Obtain the timestamp corresponding to each value
-                                            t_phys_start_next = datetime.strptime(
-                                                t_phys_start_next, '%H:%M:%S.%f')
-                                            t_phys_start_next = t_phys_start_next + \
-                                                timedelta(
-                                                    milliseconds=neulog_samples_mils)
-                                            t_phys_start_next = t_phys_start_next.strftime('%H:%M:%S.%f')[
-                                                :-3]
-                                            self.tb_heart_rate_timestamp.append(
-                                                str(t_phys_start_next))
-                                        sample += 1
-                                    sensor_list_index += 1
-                                # Stop neulog experiment in server
-                                neu.exp_stop()
+                            # Raw values and timestamps of each sensor, they are analysed by the analysis worker
+                            phys_sensors = {}
+                            # Validate if physiological sensors are being used
+                            if phys_used == True:
+                                # Stop the acquisitions after they obtained the last samples of their devices
+                                self.live_timer.stop()
+                                gaps, gap_ms = 0, 0
+                                for acquisition in self.acquisitions:
+                                    acquisition.stop()
+                                    acquisition_gaps, acquisition_gap_ms = acquisition.gaps()
+                                    gaps += acquisition_gaps
+                                    gap_ms += acquisition_gap_ms
+                                self.read_live_samples()
+                                phys_sensors = self.recorded_phys_sensors()
                                 # Register physical data ending time
                                 t_ff = datetime.now().strftime(
                                     '%H:%M:%S.%f')[:-3]
+                                # Long recordings may be split in segments (e.g. Neulog), report the time lost between them
+                                if gaps > 0:
+                                    t_ff += " (" + str(gaps) + " segment gaps, " + str(gap_ms) + " ms without samples)"
+                                # Max error of the sample timestamps against the clock of the trials
+                                t_ff += " (timestamps within ±" + str(max(
+                                    [acquisition.sync_bound() for acquisition in self.acquisitions])) + " ms)"
                                 self.tb_phys_finish_at.setText(
                                     "Physiological data finished at: " + t_ff)
-                            # Validate if other physiological hardware is being used: #!
-                            elif neulog_used == False:
+                            elif phys_used == False:
                                 pass
-                        # & ERASE DATA PRE-FIRST TRIAL STARTED
-                            if self.cb_skin_conductance.isChecked():
-                                self.delete_unused_phys_data(
-                                    self.tb_onset_at, self.tb_finish_at, self.tb_skin_conductance_timestamp, self.tb_skin_conductance_values)
-                            if self.cb_heart_rate.isChecked():
-                                self.delete_unused_phys_data(
-                                    self.tb_onset_at, self.tb_finish_at, self.tb_heart_rate_timestamp, self.tb_heart_rate_values)
-                            if self.cb_brainwaves.isChecked():
-                                self.delete_unused_phys_data(
-                                    self.tb_onset_at, self.tb_finish_at, self.tb_brainwaves_timestamp, self.tb_brainwaves_values)
-                        # & ADD TRIAL ID
-                            if self.cb_skin_conductance.isChecked():
-                                self.create_phys_ids(self.tb_trial_id, self.tb_time_start_trial, self.tb_time_end_trial,
-                                                     self.tb_skin_conductance_timestamp, self.tb_phys_trial_id, self.tb_phys_instance_id)
-                            elif self.cb_heart_rate.isChecked():
-                                self.create_phys_ids(self.tb_trial_id, self.tb_time_start_trial, self.tb_time_end_trial,
-                                                     self.tb_heart_rate_timestamp, self.tb_phys_trial_id, self.tb_phys_instance_id)
-                            elif self.cb_brainwaves.isChecked():
-                                self.create_phys_ids(self.tb_trial_id, self.tb_time_start_trial, self.tb_time_end_trial,
-                                                     self.tb_brainwaves_timestamp, self.tb_phys_trial_id, self.tb_phys_instance_id)
-                        # & CALCULATE MEDIA, SD, Z, f and Fn
-                            if neulog_used == True:
-                                phys_sample_rate = neulog_samples_mult
-                                self.presentiment_instances = phys_sample_rate * \
+                        # & CALCULATE MEDIA, SD, Z, f, Fn, D AND ZD
+                            if phys_used == True:
+                                # Instances of the presentiment timeframe in the analysis grid
+                                self.presentiment_instances = self.analysis_rate * \
                                     int(self.sb_pre_screen.text())
-                            elif neulog_used == False:  # !
+                            elif phys_used == False:
                                 pass
-                            if self.cb_skin_conductance.isChecked():
-                                self.calculate_media_sd_Z_f_Fn(self.presentiment_instances, self.tb_trial_id, self.tb_skin_conductance_values, self.tb_phys_trial_id, self.tb_phys_instance_id,
-                                                               self.tb_skin_conductance_media, self.tb_skin_conductance_sd, self.tb_skin_conductance_Z, self.tb_skin_conductance_f, self.tb_skin_conductance_Fn)
-                            if self.cb_heart_rate.isChecked():
-                                self.calculate_media_sd_Z_f_Fn(self.presentiment_instances, self.tb_trial_id, self.tb_heart_rate_values, self.tb_phys_trial_id,
-                                                               self.tb_phys_instance_id, self.tb_heart_rate_media, self.tb_heart_rate_sd, self.tb_heart_rate_Z, self.tb_heart_rate_f, self.tb_heart_rate_Fn)
-                            if self.cb_brainwaves.isChecked():
-                                self.calculate_media_sd_Z_f_Fn(self.presentiment_instances, self.tb_trial_id, self.tb_brainwaves_values, self.tb_phys_trial_id,
-                                                               self.tb_phys_instance_id, self.tb_brainwaves_media, self.tb_brainwaves_sd, self.tb_brainwaves_Z, self.tb_brainwaves_f, self.tb_brainwaves_Fn)
-                        # & CALCULATE D AND ZD
-                            if self.cb_skin_conductance.isChecked():
-                                self.calculate_D_Z(self.tb_stimulus_id, self.tb_skin_conductance_Fn,
-                                                   self.tb_skin_conductance_D, self.tb_skin_conductance_ZD)
-                            if self.cb_heart_rate.isChecked():
-                                self.calculate_D_Z(
-                                    self.tb_stimulus_id, self.tb_heart_rate_Fn, self.tb_heart_rate_D, self.tb_heart_rate_ZD)
-                            if self.cb_brainwaves.isChecked():
-                                self.calculate_D_Z(
-                                    self.tb_stimulus_id, self.tb_brainwaves_Fn, self.tb_brainwaves_D, self.tb_brainwaves_ZD)
+                            # Trimming, trial IDs and statistics run on the analysis worker, so the window doesn't freeze
+                            self.sequential_worker.cancel()
+                            self.start_analysis(phys_sensors)
+                            # The Psyleron was kept open for all the trials
+                            self.end_psyleron_session()
                         # & ENDING MESSAGE
                             # Show message stating the end of the session
                             QMessageBox.about(
@@ -1563,7 +1744,7 @@ class Create_Window(QDialog):
                 # & ADD EXTRA INTERVAL 0-5s
                         else:
                             # Check if Psyerlon is being used
-                            if str(psyleron.get_name()) == self.combo_rng_sources.currentText():
+                            if psyleron is not None and str(psyleron.get_name()) == self.combo_rng_sources.currentText():
                                 if psyleron.count_PsyREGs() >= 1:
                                     # Gets random interval from RNG giving the input 1) type of RNG, 2) max interval + 1,
                                     # 3)min interval, 4) length of binary min interval,
@@ -1571,9 +1752,6 @@ class Create_Window(QDialog):
                                     after_interval_1000 = self.rng_get_bits(
                                         psyleron, int_after_bits, int_after_min_interval, len_bin_after_min_interval, int_after_max_interval, len_bin_after_max_interval)
                                     after_interval = after_interval_1000 / 1000
-                                    # Clear and realease psyleron
-                                    psyleron.clear_RNG()
-                                    psyleron.release_RNG()
                                 else:
                                     QMessageBox.about(
                                         self, "ERROR", "Psyleron didn't send bits")
@@ -1594,20 +1772,19 @@ class Create_Window(QDialog):
                             loop.exec_()
                 # & ADD SESSION DATA
                         # Add the interval, duration, onset time, and end time of trial
-                            self.tb_dur_before_interval.append(
-                                str(int(before_interval)))
-                            self.tb_dur_after_interval.append(
-                                str(int(after_interval)))
+                            self.session_model.append_value(
+                                'dur_before_interval', int(before_interval))
+                            self.session_model.append_value(
+                                'dur_after_interval', int(after_interval))
                             onset_duration += (trial_dur_constant +
                                                before_interval + after_interval)
-                            self.tb_onset_to_trial.append(
-                                str(int(onset_duration)))
+                            self.session_model.append_value(
+                                'onset_to_trial', int(onset_duration))
                             trial_duration += (trial_dur_constant +
                                                before_interval + after_interval)
-                            self.tb_seconds_end_trial.append(
-                                str(int(trial_duration)))
-                            t_f = datetime.now().strftime('%H:%M:%S.%f')[:-3]
-                            self.tb_time_end_trial.append(t_f)
+                            self.session_model.append_value(
+                                'seconds_end_trial', int(trial_duration))
+                            self.session_model.append_value('time_end_trial', analysis_operations.now_timestamp())
                     else:  # Reboot
                         QMessageBox.about(
                             self, "TRIAL STOPPED", "TRIAL stopped, wait until SESSION has stopped.")
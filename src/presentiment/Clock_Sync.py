@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from external modules in Pipfile
+import numpy
+
+# Device milliseconds between the two exchanges used to estimate the drift (shorter spans only estimate the offset)
+MIN_DRIFT_SPAN_MS = 30000
+# Largest drift accepted (500 ppm), a larger one comes from bad exchanges and not from the device clock
+MAX_DRIFT = 0.0005
+
+
+class Clock_Sync():
+    #? Maps the clock of a device to the host clock (epoch ms) from request round trips, like NTP does
+    #? Each exchange is a request sent and answered at host times `sent` and `received` in which the device
+    #? reported its own time; the device read it somewhere in between, so the offset is the midpoint minus the
+    #? device time with an error of at most half the round trip (plus the resolution of the device time).
+    #? The exchange with the smallest error (minimum round trip) gives the offset, and the best exchange of
+    #? each half of the recording gives the drift, so a slow request never moves the timeline
+    def __init__(self):
+        # device ms, offset ms and max error ms of every exchange
+        self.exchanges = []
+        self.offset_ms = 0.0
+        self.reference_ms = 0.0
+        self.error_ms = None
+        self.drift = 0.0
+        self.drift_error = 0.0
+
+    def add(self, sent, received, device_ms, resolution_ms=0):
+        # sent, received: host epoch ms of the request and its answer; device_ms: device time given by the answer
+        self.exchanges.append((device_ms, (sent + received) / 2 - device_ms, (received - sent) / 2 + resolution_ms))
+        self.fit()
+
+    def fit(self):
+        device, offset, error = numpy.array(self.exchanges, dtype=numpy.float64).T
+        best = int(numpy.argmin(error))
+        self.reference_ms, self.offset_ms, self.error_ms = device[best], offset[best], error[best]
+        if device.max() - device.min() < MIN_DRIFT_SPAN_MS:
+            return
+        # Best exchange of each half of the device timeline
+        middle = (device.max() + device.min()) / 2
+        first_half = numpy.flatnonzero(device < middle)
+        second_half = numpy.flatnonzero(device >= middle)
+        first = first_half[numpy.argmin(error[first_half])]
+        second = second_half[numpy.argmin(error[second_half])]
+        span = device[second] - device[first]
+        drift = (offset[second] - offset[first]) / span
+        if abs(drift) <= MAX_DRIFT:
+            self.drift = drift
+            self.drift_error = (error[first] + error[second]) / span
+
+    def synchronized(self):
+        return self.error_ms is not None
+
+    def to_host(self, device_ms):
+        #? Host epoch ms (int64) of device times (a number or an array)
+        device_ms = numpy.asarray(device_ms, dtype=numpy.float64)
+        host = device_ms + self.offset_ms + self.drift * (device_ms - self.reference_ms)
+        return numpy.round(host).astype(numpy.int64)
+
+    def bound_ms(self, device_ms):
+        # Max error of to_host(device_ms): the error of the best exchange plus the drift error since it
+        return self.error_ms + self.drift_error * abs(device_ms - self.reference_ms)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+#? Includes from built in Python
+import threading
+
+#? Includes from external modules in Pipfile
+import numpy
+
+# Each level of the index summarizes blocks of FAN_OUT elements of the level below
+FAN_OUT = 8
+
+
+class Min_Max_Index():
+    #? Min/max decimation pyramid of a growing signal; level k stores the min and max of each block of FAN_OUT**k samples
+    #? A query never reads more than ~FAN_OUT blocks per pixel column, whatever the length of the signal
+    def __init__(self, capacity=4096):
+        self.lock = threading.Lock()
+        self.clear(capacity)
+
+    def clear(self, capacity=4096):
+        with self.lock:
+            self.length = 0
+            self.values = numpy.empty(capacity, dtype=numpy.float64)
+            self.mins = []  # mins[k-1] -> level k
+            self.maxs = []
+            self.version = 0
+
+    def __len__(self):
+        with self.lock:
+            return self.length
+
+    def get_version(self):
+        # Changes with every append, so a reader knows when to query again
+        with self.lock:
+            return self.version
+
+    def append(self, values):
+        # Append new samples and update only the blocks they touch on each level
+        values = numpy.asarray(values, dtype=numpy.float64).ravel()
+        if len(values) == 0:
+            return
+        with self.lock:
+            old_length = self.length
+            self.length += len(values)
+            self.values = self.grow(self.values, self.length)
+            self.values[old_length:self.length] = values
+            # Level 0 is the raw signal
+            below_min, below_max = self.values, self.values
+            below_length, first_dirty = self.length, old_length
+            level = 0
+            while below_length > 1:
+                level += 1
+                length = -(-below_length // FAN_OUT)
+                if len(self.mins) < level:
+                    self.mins.append(numpy.empty(0, dtype=numpy.float64))
+                    self.maxs.append(numpy.empty(0, dtype=numpy.float64))
+                self.mins[level - 1] = self.grow(self.mins[level - 1], length)
+                self.maxs[level - 1] = self.grow(self.maxs[level - 1], length)
+                # Recompute from the block that contains the first new element (it may have been partial)
+                first_block = first_dirty // FAN_OUT
+                edges = numpy.arange(first_block * FAN_OUT, below_length, FAN_OUT)
+                self.mins[level - 1][first_block:length] = numpy.minimum.reduceat(below_min[:below_length], edges)
+                self.maxs[level - 1][first_block:length] = numpy.maximum.reduceat(below_max[:below_length], edges)
+                below_min, below_max = self.mins[level - 1], self.maxs[level - 1]
+                below_length, first_dirty = length, first_block
+            self.version += 1
+
+    def grow(self, array, length):
+        # Double the capacity when needed, so appends are amortized O(1)
+        if len(array) >= length:
+            return array
+        bigger = numpy.empty(max(length, 2 * len(array), 16), dtype=array.dtype)
+        bigger[:len(array)] = array
+        return bigger
+
+    def query(self, start, stop, columns):
+        #? Decimate samples [start, stop) to at most `columns` buckets
+        # @returns positions (sample index at the start of each bucket), min and max of each bucket
+        with self.lock:
+            start = max(int(start), 0)
+            stop = min(int(stop), self.length)
+            columns = max(int(columns), 1)
+            if stop <= start:
+                empty = numpy.empty(0, dtype=numpy.float64)
+                return empty, empty, empty
+            samples_per_column = (stop - start) / columns
+            if samples_per_column <= 1:
+                raw = self.values[start:stop].copy()
+                return numpy.arange(start, stop, dtype=numpy.float64), raw, raw
+            # Highest level whose blocks still fit in one column
+            level = min(int(numpy.log(samples_per_column) / numpy.log(FAN_OUT)), len(self.mins))
+            block = FAN_OUT ** level
+            if level == 0:
+                level_min, level_max = self.values, self.values
+            else:
+                level_min, level_max = self.mins[level - 1], self.maxs[level - 1]
+            first = start // block
+            last = -(-stop // block)
+            bucket_edges = numpy.unique(numpy.linspace(first, last, columns + 1).astype(numpy.int64)[:-1])
+            mins = numpy.minimum.reduceat(level_min[first:last], bucket_edges - first)
+            maxs = numpy.maximum.reduceat(level_max[first:last], bucket_edges - first)
+            positions = (bucket_edges * block).astype(numpy.float64)
+            # Only the first and the last block may stick out of [start, stop): those two buckets are computed exactly
+            block_ends = numpy.append(bucket_edges[1:], last)
+            for bucket in {0, len(bucket_edges) - 1}:
+                low = max(int(bucket_edges[bucket]) * block, start)
+                high = min(int(block_ends[bucket]) * block, stop)
+                mins[bucket], maxs[bucket] = self.exact_min_max(low, high, block, level_min, level_max)
+            positions[0] = start
+            return positions, mins, maxs
+
+    def exact_min_max(self, low, high, block, level_min, level_max):
+        # Min and max of samples [low, high): the whole blocks from the level, the partial ones from the raw samples
+        first_whole = -(-low // block)
+        last_whole = high // block
+        if last_whole <= first_whole:
+            parts = [self.values[low:high]]
+        else:
+            parts = [self.values[low:first_whole * block], self.values[last_whole * block:high]]
+            parts_min = [part.min() for part in parts if len(part) > 0] + [level_min[first_whole:last_whole].min()]
+            parts_max = [part.max() for part in parts if len(part) > 0] + [level_max[first_whole:last_whole].max()]
+            return min(parts_min), max(parts_max)
+        return parts[0].min(), parts[0].max()
@@ -20,15 +20,26 @@ limitations under the License.
 
 #? Includes from built in Python
 import json
-import datetime
+from datetime import datetime
 
 #? Includes from external modules in Pipfile
+import numpy
 import requests
 
+#? Includes from this project
+from .analysis_operations import now_timestamp
+from .Clock_Sync import Clock_Sync
+
+# Max samples of one experiment the device buffer can hold (20 samples per second for 5 minutes); the buffer holds a
+# number of samples whatever the rate, so the segments are limited in samples, not in seconds
+MAX_SEGMENT_SAMPLES = 6000
+# Seconds before the expected end of a segment at which it starts to be polled for its last samples
+SEGMENT_END_MARGIN = 0.2
+
 
 class Neulog():
     #! Not implemented: "ResetSensor:[],[]", "SetPositiveDirection:[],[],[]" & "# SetRFID:[]"
-    #! Can't support more than 20 samples per second for more than 5 minutes
+    #! Can't support more than 20 samples per second for more than 5 minutes; longer experiments use Neulog_Segmented_Experiment
     def __init__(self,host,*additional_sensors):  
         self.name = "Neulog"
         self.host = str(host)
@@ -121,4 +132,94 @@ class Neulog():
             del data_dict[command][num][:2]
             num += 1
         # return list of lists of each sensor_type with only the values recorded
-        return data_dict[command]
\ No newline at end of file
+        return data_dict[command]
+
+
+class Neulog_Segmented_Experiment():
+    #? Records an experiment longer than the device buffer as back-to-back experiments (segments) of at most
+    #? MAX_SEGMENT_SAMPLES samples, stitched in one timeline; each segment has its own measured start, so the
+    #? dead time between two segments is a jump in the timestamps and it is annotated in `gaps`
+    #? The number of samples the device has recorded is its clock: every request is timed and given to a Clock_Sync
+    #? of the segment, which turns the sample times of the device into epoch ms with the HTTP latency and drift corrected
+    def __init__(self, neulog, sample_rate, sample_size, period_ms, max_segment_samples=MAX_SEGMENT_SAMPLES):
+        self.neulog = neulog
+        self.period_ms = period_ms
+        sample_size = int(sample_size)
+        # Sizes and StartExperiment urls of every segment are computed before the first one starts (the Neulog API
+        # can't arm an experiment ahead), so switching segments only costs the stop and start requests
+        self.segment_sizes = [min(max_segment_samples, sample_size - first)
+                              for first in range(0, sample_size, max_segment_samples)]
+        self.start_urls = [neulog.get_url('StartExperiment' + neulog.parameters + ',[' + str(sample_rate) + '],[' + str(size) + ']')
+                           for size in self.segment_sizes]
+        self.segment = -1
+        self.segment_start = 0
+        self.segment_received = 0
+        self.clock = Clock_Sync()
+        # Max error (ms) of the timestamps given until now
+        self.bound_ms = 0
+        self.last_timestamp = None
+        # List of (sample number after the gap, milliseconds missing before it)
+        self.gaps = []
+
+    def start_segment(self, segment):
+        # An experiment needs to be stopped before starting a new one
+        self.neulog.exp_stop()
+        # The device starts its clock (sample 0) somewhere during the StartExperiment request
+        sent = now_timestamp()
+        self.neulog.get_data_dict(self.start_urls[segment])
+        received = now_timestamp()
+        self.segment = segment
+        self.clock = Clock_Sync()
+        self.clock.add(sent, received, 0)
+        self.segment_start = int(self.clock.to_host(0))
+        self.segment_received = 0
+
+    def start(self):
+        self.start_segment(0)
+        return self.segment_start
+
+    def finished(self):
+        return self.segment == len(self.segment_sizes) - 1 and self.segment_received >= self.segment_sizes[-1]
+
+    def seconds_to_segment_end(self):
+        # Seconds until the current segment should have all its samples
+        end = self.segment_start + self.segment_sizes[self.segment] * self.period_ms
+        return max((end - int(now_timestamp())) / 1000 - SEGMENT_END_MARGIN, 0)
+
+    def poll(self):
+        #? New complete samples of the experiment; starts the next segment as soon as the current one is full
+        # @returns int64 timestamps (ms) and float64 values (one row per sample, one column per sensor)
+        sent = now_timestamp()
+        sensor_lists = self.neulog.get_exp_values()
+        received = now_timestamp()
+        size = self.segment_sizes[self.segment]
+        available = min([len(sensor_list) for sensor_list in sensor_lists] + [size])
+        if min([len(sensor_list) for sensor_list in sensor_lists]) < size:
+            # The device was between sample `available` and the next one when it answered
+            self.clock.add(sent, received, (available + 0.5) * self.period_ms, self.period_ms / 2)
+        timestamps = numpy.zeros(0, dtype=numpy.int64)
+        values = numpy.zeros((0, len(sensor_lists)), dtype=numpy.float64)
+        if available > self.segment_received:
+            # Whole block at once: one value column per sensor; the first sample of a segment is taken a period after its start
+            values = numpy.array([sensor_list[self.segment_received:available] for sensor_list in sensor_lists], dtype=numpy.float64).T
+            device_ms = numpy.arange(self.segment_received + 1, available + 1) * self.period_ms
+            timestamps = self.clock.to_host(device_ms)
+            if self.last_timestamp is not None:
+                # A better exchange may move the timeline back a little, the timestamps must keep increasing
+                timestamps = numpy.maximum(timestamps, self.last_timestamp + 1 + numpy.arange(len(timestamps)))
+            self.bound_ms = max(self.bound_ms, self.clock.bound_ms(device_ms[-1]))
+            if self.segment_received == 0 and self.last_timestamp is not None:
+                missing = int(timestamps[0]) - self.last_timestamp - round(self.period_ms)
+                if missing > 0:
+                    self.gaps.append((self.samples_before_segment(), missing))
+            self.segment_received = available
+            self.last_timestamp = int(timestamps[-1])
+        if self.segment_received >= size and self.segment < len(self.segment_sizes) - 1:
+            self.start_segment(self.segment + 1)
+        return timestamps, values
+
+    def samples_before_segment(self):
+        return sum(self.segment_sizes[:self.segment])
+
+    def stop(self):
+        return self.neulog.exp_stop()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+#? Includes from built in Python
+import math
+import multiprocessing
+import traceback
+
+#? Includes from this project
+from .Neulog import Neulog, Neulog_Segmented_Experiment
+from .Sample_Buffer import Sample_Buffer, STATE_RUNNING, STATE_FINISHED, STATE_FAILED
+
+# Seconds between two requests of the experiment samples to the Neulog API
+POLL_SECONDS = 1
+# Shortest wait between two requests, while waiting for the last samples of a segment
+MIN_POLL_SECONDS = 0.05
+# Extra records in the buffer, in case Neulog sends more samples than requested
+BUFFER_MARGIN = 1024
+
+def neulog_acquisition_process(buffer_name, port, sensors, sample_rate, sample_size, period_ms, poll_seconds, started, stop,
+                               sensor_ranges=None):
+    #? Runs in its own process: starts the Neulog experiment and writes every new sample in the sample buffer
+    #? HTTP requests and JSON parsing happen here, so they never hold the GIL of the GUI process
+    buffer = Sample_Buffer(name=buffer_name)
+    try:
+        # The range of each sensor is set before the experiment (e.g. Pulse: 1 = BPM, 2 = waveform)
+        for sensor, sensor_range in zip(sensors, sensor_ranges or []):
+            Neulog(port, sensor).set_sensor_range(sensor_range)
+        neu = Neulog(port, *sensors)
+        # Long experiments are recorded in segments that fit in the device buffer
+        experiment = Neulog_Segmented_Experiment(neu, sample_rate, sample_size, period_ms)
+        buffer.set_start(experiment.start())
+        buffer.set_state(STATE_RUNNING)
+        started.set()
+        while True:
+            # Wake up earlier when the current segment is about to end, so the next one starts right away
+            wait = max(min(poll_seconds, experiment.seconds_to_segment_end()), MIN_POLL_SECONDS)
+            stopping = stop.wait(wait)
+            timestamps, values = experiment.poll()
+            if len(timestamps) > 0:
+                buffer.write(timestamps, values)
+                buffer.set_gaps(len(experiment.gaps), sum([missing for _, missing in experiment.gaps]))
+                buffer.set_sync_bound(math.ceil(experiment.bound_ms))
+            if stopping or experiment.finished():
+                break
+        experiment.stop()
+        buffer.set_state(STATE_FINISHED)
+    except Exception:
+        traceback.print_exc()
+        buffer.set_state(STATE_FAILED)
+        started.set()
+    finally:
+        buffer.close()
+
+
+class Neulog_Acquisition():
+    #? Controls the acquisition process from the GUI and gives zero-copy access to its sample buffer
+    def __init__(self, port, sensors, sample_rate, sample_size, samples_per_second, poll_seconds=POLL_SECONDS, channel_names=None,
+                 sensor_ranges=None):
+        self.sensors = list(sensors)
+        # Names of the channels of the sample buffer (e.g. the kinds of sensor), the Neulog sensor types by default
+        self.channel_names = list(channel_names or sensors)
+        self.buffer = Sample_Buffer(capacity=int(sample_size) + BUFFER_MARGIN, num_channels=len(self.sensors))
+        context = multiprocessing.get_context('spawn')
+        self.started = context.Event()
+        self.stop_event = context.Event()
+        self.process = context.Process(
+            target=neulog_acquisition_process,
+            args=(self.buffer.name, str(port), self.sensors, str(sample_rate), str(sample_size),
+                  1000 / samples_per_second, poll_seconds, self.started, self.stop_event, sensor_ranges),
+            daemon=True)
+
+    def start(self, timeout=30):
+        # @returns True once the Neulog experiment is running
+        self.process.start()
+        self.started.wait(timeout)
+        return self.buffer.get_state() == STATE_RUNNING
+
+    def start_timestamp(self):
+        return self.buffer.get_start()
+
+    def gaps(self):
+        # Number of gaps between experiment segments and the total milliseconds without samples
+        return self.buffer.get_gaps()
+
+    def sync_bound(self):
+        # Max error (ms) of the sample timestamps against the host clock
+        return self.buffer.get_sync_bound()
+
+    def read(self, since=0):
+        return self.buffer.read(since)
+
+    def channel(self, index):
+        return self.buffer.channel(index)
+
+    def stop(self, timeout=30):
+        # Ask for the last samples, stop the experiment and wait for the process
+        self.stop_event.set()
+        self.process.join(timeout)
+        return self.buffer.get_state() == STATE_FINISHED
+
+    def release(self):
+        if self.process.is_alive():
+            self.stop_event.set()
+            self.process.join(5)
+        self.buffer.close()
+        self.buffer.unlink()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+#? Includes from this project
+from .Neulog import Neulog
+from .Neulog_Acquisition import Neulog_Acquisition
+from .Sensor_Backend import Sensor_Backend
+
+# Neulog sensor type of each kind of sensor
+NEULOG_SENSORS = {'skin_conductance': 'GSR', 'heart_rate': 'Pulse'}
+# Sensor range used by the test buttons and the experiments (GSR: 2 = mS; Pulse: 1 = BPM)
+NEULOG_RANGES = {'skin_conductance': '2', 'heart_rate': '1'}
+# Sensor range of the kinds recorded as a waveform (Pulse: 2 = Wave[Arb])
+NEULOG_WAVE_RANGES = {'heart_rate': '2'}
+# Valid values of the ranges used in the experiments (GSR: mS; Pulse: BPM)
+NEULOG_VALUE_RANGES = {'skin_conductance': (0.0, 10.0), 'heart_rate': (30.0, 240.0)}
+# Neulog API sample rate index of each number of samples per second
+NEULOG_RATES = {100: '5', 50: '6', 20: '7', 10: '8', 5: '9', 2: '10', 1: '11'}
+# Rates above 20 per second are only offered for the waveforms, the beats need them
+NEULOG_WAVE_MIN_RATE = 50
+
+
+class Neulog_Backend(Sensor_Backend):
+    #? Neulog sensors through the Neulog API server on localhost:<neulog_port>
+    name = "Neulog"
+    kinds = list(NEULOG_SENSORS)
+    waveforms = list(NEULOG_WAVE_RANGES)
+
+    @classmethod
+    def discover(cls, settings):
+        neu = Neulog(settings['neulog_port'])
+        status = neu.get_status()
+        if status == 'Neulog API status: Experiment':
+            # An experiment left running must be stopped before starting a new one
+            neu.exp_stop()
+        elif status != 'Neulog API status: Ready':
+            return []
+        return [cls(settings)]
+
+    def sample_rates(self, kind):
+        return [rate for rate in NEULOG_RATES if kind in self.waveforms or rate < NEULOG_WAVE_MIN_RATE]
+
+    def value_range(self, kind):
+        return NEULOG_VALUE_RANGES[kind]
+
+    def channel_label(self, kind):
+        return NEULOG_SENSORS[kind]
+
+    def read_value(self, kind):
+        neu = Neulog(self.settings['neulog_port'], NEULOG_SENSORS[kind])
+        neu.set_sensor_range(NEULOG_RANGES[kind])
+        return float(neu.get_values()[0])
+
+    def open_acquisition(self, kinds, samples_per_second, seconds, waveforms=()):
+        # The Neulog API runs one experiment at a time, so every sensor records at the highest rate
+        rate = max(samples_per_second)
+        ranges = [NEULOG_WAVE_RANGES[kind] if kind in waveforms else NEULOG_RANGES[kind] for kind in kinds]
+        return Neulog_Acquisition(self.settings['neulog_port'], [NEULOG_SENSORS[kind] for kind in kinds],
+                                  NEULOG_RATES[rate], str(int(seconds * rate)), rate, channel_names=kinds,
+                                  sensor_ranges=ranges)
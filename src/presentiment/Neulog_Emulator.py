@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+#? Includes from built in Python
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+#? Local stand-in for the NeuLog API server, for testing and benchmarking without the hardware
+#? It answers the same urls as the real server (http://localhost:<port>/NeuLogAPI?<Command>:[param],...)
+#? Run it with: python src/presentiment/Neulog_Emulator.py --port 22004
+
+# Samples per second of each Neulog API sample rate index
+SAMPLE_RATES = {'2': 1000, '3': 500, '4': 200, '5': 100, '6': 50, '7': 20, '8': 10, '9': 5, '10': 2, '11': 1}
+API_VERSION = '7.3.8 (emulator)'
+
+
+def gsr_value(t, sensor_range):
+    # Skin conductance (mS): slow drift plus a skin conductance response every ~15 seconds
+    tonic = 4 + 0.5 * math.sin(2 * math.pi * t / 120)
+    since_response = t % 15
+    phasic = 0.8 * (since_response / 1.5) * math.exp(1 - since_response / 1.5)
+    value = tonic + phasic
+    # Range 1 is arbitrary units
+    return value if sensor_range == '2' else value * 250
+
+
+def pulse_value(t, sensor_range):
+    # Heart rate around 70 BPM with respiratory sinus arrhythmia
+    bpm = 70 + 4 * math.sin(2 * math.pi * t / 4.5)
+    if sensor_range == '1':
+        return bpm
+    # Range 2 is the pulse wave (arbitrary units): systolic peak plus dicrotic notch
+    # The phase is the integral of the heart rate, so the beats follow the BPM above
+    phase = ((70 * t - 4 * 4.5 / (2 * math.pi) * math.cos(2 * math.pi * t / 4.5)) / 60) % 1
+    return 512 + 300 * math.exp(-((phase - 0.15) / 0.06) ** 2) + 90 * math.exp(-((phase - 0.45) / 0.08) ** 2)
+
+
+WAVEFORMS = {'GSR': gsr_value, 'Pulse': pulse_value}
+
+
+class Neulog_Emulator():
+    #? State of the emulated NeuLog server: sensors, ranges and the running experiment
+    #? speed > 1 makes experiments run faster than real time (e.g. for load tests at high sample rates)
+    def __init__(self, speed=1, latency_ms=0, jitter_ms=0, error_rate=0, drop_rate=0, max_samples=None, noise=0.01, seed=None):
+        self.speed = speed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.max_samples = max_samples
+        self.noise = noise
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.ranges = {'GSR': '2', 'Pulse': '1'}
+        self.experiment = None
+        self.last_experiment = None
+        self.requests = 0
+        self.started_at = time.perf_counter()
+
+    def clock(self):
+        # Seconds of emulated time
+        return (time.perf_counter() - self.started_at) * self.speed
+
+    def sample(self, sensor_type, t):
+        waveform = WAVEFORMS.get(sensor_type, lambda t, sensor_range: 0.0)
+        value = waveform(t, self.ranges.get(sensor_type, '1'))
+        return round(value * (1 + self.random.gauss(0, self.noise)), 3)
+
+    def handle(self, command, parameters):
+        #? @returns the value of the json answer {command: value}
+        sensors = [(parameters[i], parameters[i + 1]) for i in range(0, len(parameters) - 1, 2)]
+        with self.lock:
+            self.requests += 1
+            if command == 'GetSeverStatus':
+                return 'Experiment' if self.experiment is not None else 'Ready'
+            if command == 'GetServerVersion':
+                return API_VERSION
+            if command in ('SetSensorsID', 'ResetSensor', 'SetPositiveDirection', 'SetRFID'):
+                return 'True'
+            if command == 'SetSensorRange':
+                for sensor_type, _ in sensors:
+                    self.ranges[sensor_type] = parameters[-1]
+                return 'True'
+            if command == 'GetSensorValue':
+                now = self.clock()
+                return [self.sample(sensor_type, now) for sensor_type, _ in sensors]
+            if command == 'StartExperiment':
+                # Parameters: sensor pairs, then sample rate index and number of samples
+                rate, size = parameters[-2], int(parameters[-1])
+                if self.experiment is not None or rate not in SAMPLE_RATES:
+                    return 'False'
+                if self.max_samples is not None and size > self.max_samples:
+                    return 'False'
+                self.experiment = {'sensors': [sensor_type for sensor_type, _ in sensors[:-1]],
+                                   'rate': SAMPLE_RATES[rate], 'size': size, 'start': self.clock(), 'samples': []}
+                return 'True'
+            if command == 'StopExperiment':
+                if self.experiment is not None:
+                    # The samples of the last experiment can still be read
+                    self.record(self.experiment)
+                    self.last_experiment = self.experiment
+                    self.experiment = None
+                return 'True'
+            if command == 'GetExperimentSamples':
+                return self.experiment_samples(sensors)
+        raise KeyError(command)
+
+    def record(self, experiment):
+        # Generate the samples recorded until now
+        available = min(int((self.clock() - experiment['start']) * experiment['rate']), experiment['size'])
+        samples = experiment['samples']
+        while len(samples) < available:
+            t = experiment['start'] + (len(samples) + 1) / experiment['rate']
+            samples.append([self.sample(sensor_type, t) for sensor_type in experiment['sensors']])
+
+    def experiment_samples(self, sensors):
+        # Samples of the running experiment, or of the last one once it was stopped
+        experiment = self.experiment or self.last_experiment
+        if experiment is None:
+            return [[sensor_type, int(sensor_id)] for sensor_type, sensor_id in sensors]
+        if experiment is self.experiment:
+            self.record(experiment)
+        answer = []
+        for sensor_type, sensor_id in sensors:
+            values = []
+            if sensor_type in experiment['sensors']:
+                channel = experiment['sensors'].index(sensor_type)
+                values = [sample[channel] for sample in experiment['samples']]
+            answer.append([sensor_type, int(sensor_id)] + values)
+        return answer
+
+
+def create_handler(emulator):
+
+    class Neulog_Request_Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if emulator.latency_ms or emulator.jitter_ms:
+                time.sleep(max(emulator.latency_ms + emulator.random.uniform(-1, 1) * emulator.jitter_ms, 0) / 1000)
+            if emulator.random.random() < emulator.drop_rate:
+                # Injected fault: close the connection without answering
+                self.close_connection = True
+                return
+            path, _, query = self.path.partition('?')
+            command, _, parameters = unquote(query).partition(':')
+            if path != '/NeuLogAPI' or emulator.random.random() < emulator.error_rate:
+                self.send_error(500)
+                return
+            try:
+                value = emulator.handle(command, re.findall(r'\[([^\]]*)\]', parameters))
+            except KeyError:
+                self.send_error(404)
+                return
+            body = json.dumps({command: value}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Neulog_Request_Handler
+
+
+def start_emulator(port=0, **options):
+    #? Serve the emulator in a background thread
+    # @returns the server (server.server_address[1] is the port) and the emulator state
+    emulator = Neulog_Emulator(**options)
+    server = ThreadingHTTPServer(('localhost', port), create_handler(emulator))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, emulator
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for the NeuLog API server')
+    parser.add_argument('--port', type=int, default=22004)
+    parser.add_argument('--speed', type=float, default=1, help='Emulated seconds per real second')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0, help='Probability of answering HTTP 500')
+    parser.add_argument('--drop-rate', type=float, default=0, help='Probability of closing the connection without answer')
+    parser.add_argument('--max-samples', type=int, default=None, help='Reject experiments longer than the device buffer')
+    parser.add_argument('--seed', type=int, default=None)
+    arguments = parser.parse_args()
+    server, _ = start_emulator(arguments.port, speed=arguments.speed, latency_ms=arguments.latency_ms,
+                               jitter_ms=arguments.jitter_ms, error_rate=arguments.error_rate,
+                               drop_rate=arguments.drop_rate, max_samples=arguments.max_samples, seed=arguments.seed)
+    print('Neulog API emulator on port ' + str(server.server_address[1]))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+#? Includes from built in Python
+import os
+import threading
+#? Includes from external modules in Pipfile
+import numpy
+
+# Bytes read from the OS on each refill (one syscall)
+BLOCK_BYTES = 4096
+
+
+def read_os_entropy(size):
+    # getrandom() where the OS has it (Linux), otherwise urandom() (Windows, macOS)
+    if hasattr(os, 'getrandom'):
+        return os.getrandom(size)
+    return os.urandom(size)
+
+
+class OS_RNG():
+    #? Cryptographic random bits from the OS entropy source, read in blocks of BLOCK_BYTES into a buffer
+    def __init__(self, block_bytes=BLOCK_BYTES):
+        self.name = "OS-RNG"
+        self.block_bytes = block_bytes
+        self.buffer = numpy.zeros(0, dtype=numpy.uint8)
+        self.position = 0
+        self.lock = threading.Lock()
+
+    def take_bits(self, count):
+        #? Next `count` bits of the buffer as a uint8 array of 0 and 1, refilling it when needed
+        with self.lock:
+            chunks = []
+            while count > 0:
+                if self.position == len(self.buffer):
+                    blocks = -(-count // (8 * self.block_bytes))
+                    self.buffer = numpy.unpackbits(numpy.frombuffer(read_os_entropy(blocks * self.block_bytes), dtype=numpy.uint8))
+                    self.position = 0
+                taken = min(count, len(self.buffer) - self.position)
+                chunks.append(self.buffer[self.position:self.position + taken])
+                self.position += taken
+                count -= taken
+            return numpy.concatenate(chunks) if len(chunks) != 1 else chunks[0]
+
+    # @params maxbts: Number of bits to generate
+    # @returns Generated bits
+    def get_bits(self, maxbts):
+        if maxbts <= 0:
+            return ''
+        # '0' and '1' are 48 and 49 in ASCII
+        return (self.take_bits(maxbts) + 48).tobytes().decode()
+
+    # @params low, high: Bounds of the integer, both included
+    # @returns Uniform random integer, without modulo bias (rejection sampling)
+    def get_integer(self, low, high):
+        span = high - low
+        if span <= 0:
+            return low
+        length = span.bit_length()
+        weights = 1 << numpy.arange(length - 1, -1, -1, dtype=numpy.int64)
+        while True:
+            value = int(self.take_bits(length).astype(numpy.int64) @ weights)
+            if value <= span:
+                return low + value
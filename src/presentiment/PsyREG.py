@@ -20,173 +20,307 @@ limitations under the License.
 
 #? Includes from built in Python
 import ctypes
+import threading
+#? Includes from external modules in Pipfile
+import numpy
 #? Includes from this project
-from .PsyREGFinder import PsyREGPath
+from .PsyREGFinder import PsyREGPath, PsyREGEmulatorOptions
+from .PsyREG_Emulator import PsyREG_Emulator
 
-class PsyREG():
-    def __init__(self):  
+#? Define variables
+PSYREG_API_VERSION = 1 # Version of the API that this header is indended for. Should be compared to PsyREGAPIVersion() */
+INVALID_DATASOURCE = -1 # Constant representing an invalid Datasource */
+BSS_GOOD = 0x0000 # no flags set. the device is ok and there are no problems */
+BSS_CONNECTING = 0x0001 # device connection is being established (in the process of opening) */
+BSS_WAITING = 0x0002 # waiting for device data (buffer empty) */
+BSS_BUSY = 0x0004 # device is in use by another application */
+BSS_NODEVICE = 0x0008 # there is no device by this name connected anymore */
+BSS_READERROR = 0x0010 # was there a read error during the last read */
+BSS_BADCFG = 0x0020 # was there a bad configuration for the device (e.g. conflicting values or unset values) */
+BSS_CANTPROCESS = 0x0040 # was there a processing error? [set at bitsource level] */
+BSS_INITERROR = 0x0080 # was there an initialization error / problem with the data structure [set at bitsource level] */
+BSS_TIMEOUT = 0x0100 # did the reader time out since the last device read [set at bitsource level] */
+BSS_GENERALERROR = 0x8000 # was there any error at all. set if any other error (busy, nodevice, readerror, cantprocess) [set at bitsource level] */
+BSS_INVALID = 0x0200 # is the DataSource invalid. This occurs when a DataSource was not created or has already been destroyed. */
+
+#? Types of results and arguments of the PsyREG dll functions: name without "PsyREG" -> (restype, argtypes)
+PSYREG_SIGNATURES = {
+    'EnumerateSources': (ctypes.c_int32, []),
+    'ClearSources': (ctypes.c_void_p, []),
+    'GetSourceCount': (ctypes.c_uint32, []),
+    'GetSource': (ctypes.c_int32, [ctypes.c_uint32]),
+    'ReleaseSource': (ctypes.c_void_p, [ctypes.c_int32]),
+    'GetDeviceTypeBSTR': (ctypes.c_char_p, [ctypes.c_int32]),
+    'GetDeviceIdBSTR': (ctypes.c_char_p, [ctypes.c_int32]),
+    'Open': (ctypes.c_int32, [ctypes.c_int32]),
+    'Close': (ctypes.c_void_p, [ctypes.c_int32]),
+    'Reset': (ctypes.c_void_p, [ctypes.c_int32]),
+    'GetStatus': (ctypes.c_int32, [ctypes.c_int32]),
+    'GetBit': (ctypes.c_int32, [ctypes.c_int32, ctypes.POINTER(ctypes.c_ubyte)]),
+    'GetByte': (ctypes.c_int32, [ctypes.c_int32, ctypes.POINTER(ctypes.c_ubyte)]),
+}
+#? Functions that not every version of the dll exports; they are None in the driver when missing
+# As in psyreg.h: int PsyREGGetBits(DataSource, unsigned char* pucBuf, int iMaxBits, BOOL bBlock) writes one bit per
+# byte (in the least significant bit) and int PsyREGGetBytes(DataSource, unsigned char* pucBuf, int iMaxBytes, BOOL bBlock)
+# writes whole bytes; both return the number of bytes written
+PSYREG_OPTIONAL_SIGNATURES = {
+    'GetBits': (ctypes.c_int32, [ctypes.c_int32, ctypes.POINTER(ctypes.c_ubyte), ctypes.c_int32, ctypes.c_int32]),
+    'GetBytes': (ctypes.c_int32, [ctypes.c_int32, ctypes.POINTER(ctypes.c_ubyte), ctypes.c_int32, ctypes.c_int32]),
+}
+
+
+class PsyREG_Driver():
+    #? The PsyREG dll loaded once per process, with the signatures bound once and the source handles cached
+    #? Get it with PsyREG_driver(); every PsyREG() shares it
+    def __init__(self):
         #? Define path of DLL
         self.path_REG_dll = PsyREGPath()
-        self.REG_dll = ctypes.CDLL(self.path_REG_dll) # load DLL
-        #? Define variables
-        PSYREG_API_VERSION = 1 # Version of the API that this header is indended for. Should be compared to PsyREGAPIVersion() */
-        INVALID_DATASOURCE = -1 # Constant representing an invalid Datasource */
-        BSS_GOOD = 0x0000 # no flags set. the device is ok and there are no problems */
-        BSS_CONNECTING = 0x0001 # device connection is being established (in the process of opening) */
-        BSS_WAITING = 0x0002 # waiting for device data (buffer empty) */
-        BSS_BUSY = 0x0004 # device is in use by another application */
-        BSS_NODEVICE = 0x0008 # there is no device by this name connected anymore */
-        BSS_READERROR = 0x0010 # was there a read error during the last read */
-        BSS_BADCFG = 0x0020 # was there a bad configuration for the device (e.g. conflicting values or unset values) */
-        BSS_CANTPROCESS = 0x0040 # was there a processing error? [set at bitsource level] */
-        BSS_INITERROR = 0x0080 # was there an initialization error / problem with the data structure [set at bitsource level] */
-        BSS_TIMEOUT = 0x0100 # did the reader time out since the last device read [set at bitsource level] */
-        BSS_GENERALERROR = 0x8000 # was there any error at all. set if any other error (busy, nodevice, readerror, cantprocess) [set at bitsource level] */
-        BSS_INVALID = 0x0200 # is the DataSource invalid. This occurs when a DataSource was not created or has already been destroyed. */
+        emulator_options = PsyREGEmulatorOptions()
+        if emulator_options is not None:
+            # Emulated device with the same C API, for testing without the hardware
+            self.REG_dll = PsyREG_Emulator(emulator_options)
+        else:
+            self.REG_dll = ctypes.CDLL(self.path_REG_dll) # load DLL
+        # Bind every function once, so a call is only the FFI call
+        for name, (restype, argtypes) in PSYREG_SIGNATURES.items():
+            self.bind(name, restype, argtypes)
+        for name, (restype, argtypes) in PSYREG_OPTIONAL_SIGNATURES.items():
+            try:
+                self.bind(name, restype, argtypes)
+            except AttributeError:
+                setattr(self, name, None)
+        self.lock = threading.RLock()
+        self.forget_sources()
+
+    def bind(self, name, restype, argtypes):
+        function = getattr(self.REG_dll, 'PsyREG' + name)
+        function.restype = restype
+        function.argtypes = argtypes
+        setattr(self, name, function)
+
+    def forget_sources(self):
+        # Cache of the source manager: enumeration, source handles, open handles and device names
+        self.enumerated = None
+        self.source_count = None
+        self.handles = {}
+        self.opened = {}
+        self.names = {}
+
+    # & SOURCE MANAGER
+    def enumerate_sources(self):
+        #? Call Psyleron; if it's not called it won't know you're talking to him (only the first time)
+        with self.lock:
+            if self.enumerated is None:
+                self.enumerated = self.EnumerateSources()
+            return self.enumerated
+
+    def count_sources(self):
+        with self.lock:
+            self.enumerate_sources()
+            if self.source_count is None:
+                self.source_count = self.GetSourceCount()
+            return self.source_count
+
+    def get_source(self, index=0):
+        #? Get source from psyleron; if it's not stated, it won't get data, even if it's called
+        with self.lock:
+            self.enumerate_sources()
+            if index not in self.handles:
+                self.handles[index] = self.GetSource(index)
+            return self.handles[index]
+
+    def device_name(self, source):
+        #? Type and ID of the Psyleron of a source
+        with self.lock:
+            if source not in self.names:
+                device_type = self.GetDeviceTypeBSTR(source).decode("utf-8") #Decode from byte to string
+                device_id = self.GetDeviceIdBSTR(source).decode("utf-8")
+                self.names[source] = (device_type, device_id)
+            return self.names[source]
+
+    def release_source(self, source):
+        #? Releases a given source back to the source manager
+        with self.lock:
+            self.opened.pop(source, None)
+            self.names.pop(source, None)
+            self.handles = {index: handle for index, handle in self.handles.items() if handle != source}
+            return self.ReleaseSource(source)
+
+    def clear_sources(self):
+        #? Clears the entire list of sources; handles are not valid anymore
+        with self.lock:
+            self.forget_sources()
+            return self.ClearSources()
+
+    # & DATA SOURCE
+    def open_source(self, source):
+        #? Open the stream of data to obtain bits and bytes (only if it's not open yet)
+        with self.lock:
+            if source not in self.opened:
+                self.opened[source] = self.Open(source)
+            return self.opened[source]
+
+    def close_source(self, source):
+        with self.lock:
+            self.opened.pop(source, None)
+            return self.Close(source)
+
+    def reset_source(self, source):
+        return self.Reset(source)
+
+    def get_status(self, source):
+        return self.GetStatus(source)
+
+    def read_bits(self, source, count):
+        #? Read `count` bits as a uint8 array of 0 and 1
+        if self.GetBits is not None:
+            # Bulk read: a few FFI calls for the whole request, blocking until the bits are there
+            buffer = (ctypes.c_ubyte * count)()
+            bits = numpy.empty(count, dtype=numpy.uint8)
+            read = 0
+            while read < count:
+                written = self.GetBits(source, buffer, count - read, 1)
+                if written <= 0:
+                    break
+                # One bit per byte, in the least significant bit
+                bits[read:read + written] = numpy.frombuffer(buffer, dtype=numpy.uint8)[:written] & 1
+                read += written
+            if read == count:
+                return bits
+            return numpy.concatenate([bits[:read], self.read_bits_one_by_one(source, count - read)])
+        return self.read_bits_one_by_one(source, count)
+
+    def read_bits_one_by_one(self, source, count):
+        bit = ctypes.c_ubyte()
+        bit_pointer = ctypes.byref(bit)
+        get_bit = self.GetBit
+        bits = numpy.empty(count, dtype=numpy.uint8)
+        for number in range(count):
+            get_bit(source, bit_pointer)
+            bits[number] = bit.value
+        return bits
+
+    def read_bytes(self, source, count):
+        #? Read `count` bytes (between 0 and 255) as a uint8 array
+        if self.GetBytes is not None:
+            buffer = (ctypes.c_ubyte * count)()
+            values = numpy.empty(count, dtype=numpy.uint8)
+            read = 0
+            while read < count:
+                written = self.GetBytes(source, buffer, count - read, 1)
+                if written <= 0:
+                    break
+                values[read:read + written] = numpy.frombuffer(buffer, dtype=numpy.uint8)[:written]
+                read += written
+            if read == count:
+                return values
+            return numpy.concatenate([values[:read], self.read_bytes_one_by_one(source, count - read)])
+        return self.read_bytes_one_by_one(source, count)
+
+    def read_bytes_one_by_one(self, source, count):
+        byte = ctypes.c_ubyte()
+        byte_pointer = ctypes.byref(byte)
+        get_byte = self.GetByte
+        values = numpy.empty(count, dtype=numpy.uint8)
+        for number in range(count):
+            get_byte(source, byte_pointer)
+            values[number] = byte.value
+        return values
+
+
+driver_lock = threading.Lock()
+driver = None
+
+def PsyREG_driver():
+    #? Process-wide PsyREG driver, the dll is loaded by the first call
+    global driver
+    with driver_lock:
+        if driver is None:
+            driver = PsyREG_Driver()
+        return driver
+
+def PsyREG_driver_loaded():
+    #? Whether the dll was loaded, without loading it (e.g. to end a session that used no Psyleron)
+    with driver_lock:
+        return driver is not None
+
+
+class PsyREG():
+    def __init__(self):
+        # All the instances share the same loaded dll and source handles
+        self.driver = PsyREG_driver()
+        self.REG_dll = self.driver.REG_dll
 
     def get_name(self):
         #? Obtain the Type and ID of the Psyleron, and return in a formatted string
-        self.invoke_RNG()
-        source = self.get_source() 
-        # Define all the types of results and arguments in the PsyREG dll functions
-        self.REG_dll.PsyREGGetDeviceTypeBSTR.restype = ctypes.c_char_p
-        self.REG_dll.PsyREGGetDeviceTypeBSTR.argtypes = [ctypes.c_int32]
-        self.REG_dll.PsyREGGetDeviceIdBSTR.restype = ctypes.c_char_p
-        self.REG_dll.PsyREGGetDeviceIdBSTR.argtypes = [ctypes.c_int32]
-        PsyREG_ID = self.REG_dll.PsyREGGetDeviceIdBSTR(source)
-        PsyREG_ID = PsyREG_ID.decode("utf-8") #Decode from byte to string
-        PsyREG_Type = self.REG_dll.PsyREGGetDeviceTypeBSTR(source)
-        PsyREG_Type = PsyREG_Type.decode("utf-8") #Decode from byte to string
+        source = self.get_source()
+        PsyREG_Type, PsyREG_ID = self.driver.device_name(source)
         name_PsyREG = ("Psyleron %s: %s" % (PsyREG_Type, PsyREG_ID)) # Format string of the name
-        # print(name_PsyREG)
         return name_PsyREG
 
     def get_bits(self, maxbts):
-        #? Obtain 1 bit of random data; 1 or 0
-        self.invoke_RNG() 
-        source = self.get_source() 
-        self.open_RNG()
-        # Define all the types of results and arguments in the PsyREG dll functions
-        self.REG_dll.PsyREGGetBit.restype = ctypes.c_int32
-        self.REG_dll.PsyREGGetBit.argtypes = [ctypes.c_int32,ctypes.POINTER(ctypes.c_ubyte)]
-        # For loop for x number of MAXBTS stated
-        str_list = []
-        for bit_psyreg in range(maxbts):
-            bit_psyreg = ctypes.c_ubyte()
-            self.REG_dll.PsyREGGetBit(source, ctypes.byref(bit_psyreg))
-            str_list.append(bit_psyreg.value)
-        str_bits = ''.join(str(x) for x in str_list)
-        # print(str_bits)
-        return str_bits
-        
+        #? Obtain maxbts bits of random data; 1 or 0
+        source = self.get_source()
+        self.driver.open_source(source)
+        bits = self.driver.read_bits_one_by_one(source, maxbts)
+        # '0' and '1' are 48 and 49 in ASCII
+        return (bits + 48).tobytes().decode()
+
+    def get_bits_bulk(self, maxbts):
+        #? Obtain chunks of bits with PsyREGGetBits (falls back to one bit per call if the dll doesn't export it)
+        source = self.get_source()
+        self.driver.open_source(source)
+        return (self.driver.read_bits(source, maxbts) + 48).tobytes().decode()
+
     def get_bytes(self, maxbts):
         #? Obtain 1 byte (between 0 and 255) of random data
-        self.invoke_RNG() 
-        source = self.get_source() 
-        self.open_RNG()
-        # Define all the types of results and arguments in the PsyREG dll functions
-        self.REG_dll.PsyREGGetByte.restype = ctypes.c_int32
-        self.REG_dll.PsyREGGetByte.argtypes = [ctypes.c_int32,ctypes.POINTER(ctypes.c_ubyte)]
-        # For loop for x number of MAXBTS stated
-        str_list = []
-        for byte_psyreg in range(maxbts):
-            byte_psyreg = ctypes.c_ubyte()
-            self.REG_dll.PsyREGGetByte(source, ctypes.byref(byte_psyreg))
-            str_list.append(byte_psyreg.value)
-        str_bytes = ''.join(str(x) for x in str_list)
-        # print(str_bytes)
+        source = self.get_source()
+        self.driver.open_source(source)
+        str_bytes = ''.join(str(x) for x in self.driver.read_bytes(source, maxbts).tolist())
         return str_bytes
 
-    # def get_bits(self,max_bits):         ######! NOT WORKING YET
-        # #? Obtain chunks of bits
-        # self.invoke_RNG() 
-        # source = self.get_source() 
-        # self.open_RNG()
-        # # Define all the types of results and arguments in the PsyREG dll functions
-        # REG_dll.PsyREGGetBits.restype = ctypes.c_int32
-        # REG_dll.PsyREGGetBits.argtypes = [ctypes.c_int32,ctypes.POINTER(ctypes.c_ubyte),ctypes.c_int32,ctypes.c_int32]
-        # bits_psyreg = ctypes.c_ubyte()
-        # REG_dll.PsyREGGetBits(source, ctypes.byref(bits_psyreg), max_bits)
-        # return bits_psyreg.value
-
     def invoke_RNG(self):
         #? Call Psyleron; if it's not called it won't know you're talking to him
-        # Define all the types of results and arguments in the PsyREG dll function
-        self.REG_dll.PsyREGEnumerateSources.restype = ctypes.c_int32
-        self.REG_dll.PsyREGEnumerateSources.argtypes = []
-        PsyREG_EnumerateSources = self.REG_dll.PsyREGEnumerateSources()
-        return PsyREG_EnumerateSources
-    
+        return self.driver.enumerate_sources()
+
     def get_source(self):
         #? Get source from psyleron; if it's not stated, it won't get data, even if it's called
-        # Define all the types of results and arguments in the PsyREG dll function
-        self.REG_dll.PsyREGGetSource.restype = ctypes.c_int32
-        self.REG_dll.PsyREGGetSource.argtypes = [ctypes.c_uint32]
-        PsyREG_GetSource = self.REG_dll.PsyREGGetSource(0)
-        return PsyREG_GetSource
+        return self.driver.get_source(0)
 
     def open_RNG(self):
         #? Open the stream of data to obtain bits and bytes
-        source = self.get_source() 
-        # Define all the types of results and arguments in the PsyREG dll function
-        self.REG_dll.PsyREGOpen.restype = ctypes.c_int32
-        self.REG_dll.PsyREGOpen.argtypes = [ctypes.c_int32]
-        PsyREG_Open = self.REG_dll.PsyREGOpen(source)
-        return PsyREG_Open
+        return self.driver.open_source(self.get_source())
 
     def close_RNG(self):
         #? Closes an open DataSource and prevents further interaction
-        source = self.get_source() 
-        # Define all the types of results and arguments in the PsyREG dll function
-        self.REG_dll.PsyREGClose.restype = ctypes.c_void_p
-        self.REG_dll.PsyREGClose.argtypes = [ctypes.c_int32]
-        PsyREG_Close = self.REG_dll.PsyREGClose(source)
-        return PsyREG_Close
+        return self.driver.close_source(self.get_source())
 
     def release_RNG(self):
         #? Releases a given source back to the source manager
-        source = self.get_source() 
-        # Define all the types of results and arguments in the PsyREG dll function
-        self.REG_dll.PsyREGReleaseSource.restype = ctypes.c_void_p
-        self.REG_dll.PsyREGReleaseSource.argtypes = [ctypes.c_int32]
-        PsyREG_Release = self.REG_dll.PsyREGReleaseSource(source)
-        return PsyREG_Release
+        return self.driver.release_source(self.get_source())
 
     def clear_RNG(self):
         #? Clears the entire list of sources built by one or more calls to EnumerateSources (invoke_RNG)
-        # Define all the types of results and arguments in the PsyREG dll function
-        self.REG_dll.PsyREGClearSources.restype = ctypes.c_void_p
-        self.REG_dll.PsyREGClearSources.argtypes = []
-        PsyREG_Clear = self.REG_dll.PsyREGClearSources()
-        return PsyREG_Clear
+        return self.driver.clear_sources()
+
+    def end_session(self):
+        #? The source stays open during a session, so every read is only the FFI call; close and release it at the end
+        source = self.driver.handles.get(0)
+        if source is None:
+            return
+        if source in self.driver.opened:
+            self.close_RNG()
+        self.release_RNG()
+        self.clear_RNG()
 
     def reset_RNG(self):
         #? Signals that the data in the DataSource internal buffer is stale and performs a clear.
-        source = self.get_source() 
-        # Define all the types of results and arguments in the PsyREG dll function
-        self.REG_dll.PsyREGReset.restype = ctypes.c_void_p
-        self.REG_dll.PsyREGReset.argtypes = [ctypes.c_int32]
-        PsyREG_Reset = self.REG_dll.PsyREGReset(source)
-        return PsyREG_Reset
+        return self.driver.reset_source(self.get_source())
 
     def get_status(self):
         #? Obtain 0 if status is good, 512 if status is bad
-        self.invoke_RNG() 
-        source = self.get_source() 
-        # Define all the types of results and arguments in the PsyREG dll functions
-        self.REG_dll.PsyREGGetStatus.restype = ctypes.c_int32
-        self.REG_dll.PsyREGGetStatus.argtypes = [ctypes.c_int32]
-        # Pass functions from PsyREG dll
-        PsyREG_Status = self.REG_dll.PsyREGGetStatus(source)
-        return PsyREG_Status
+        return self.driver.get_status(self.get_source())
 
     def count_PsyREGs(self):
         #? Count number of Psylerons connected
-        self.invoke_RNG() 
-        # Define all the types of results and arguments in the PsyREG dll function
-        self.REG_dll.PsyREGGetSourceCount.restype = ctypes.c_uint32
-        self.REG_dll.PsyREGGetSourceCount.argtypes = []
-        PsyREG_GetSourceCount = self.REG_dll.PsyREGGetSourceCount(0)
-        return PsyREG_GetSourceCount
-
-        
\ No newline at end of file
+        return self.driver.count_sources()
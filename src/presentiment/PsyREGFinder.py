@@ -21,4 +21,8 @@ import os
 
 def PsyREGPath():
     path, _ = os.path.split(os.path.realpath(__file__))
-    return os.environ.get("PSYREGPSYREG") or os.path.join(path, 'libraries','PsyREG.dll') # DLL file path
\ No newline at end of file
+    return os.environ.get("PSYREGPSYREG") or os.path.join(path, 'libraries','PsyREG.dll') # DLL file path
+
+def PsyREGEmulatorOptions():
+    # Options of the emulated PsyREG.dll (see PsyREG_Emulator.py), None to use the real DLL
+    return os.environ.get("PSYREG_EMULATOR") or None
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+#? Includes from built in Python
+import ctypes
+import random
+import threading
+import time
+
+#? Stand-in for PsyREG.dll with the same C API, used in place of ctypes.CDLL when PSYREG_EMULATOR is set
+#? PSYREG_EMULATOR is a list of options, e.g. "devices=2,bits_per_second=1000000,stall_rate=0.01,stall_ms=50,seed=1"
+#?  devices         -> number of emulated sources
+#?  bits_per_second -> throughput of each source; reads wait for the bits that are not generated yet
+#?  buffer_bits     -> bits a source can keep when nobody reads them
+#?  stall_rate      -> probability that a read finds the device stalled (status BSS_WAITING)
+#?  stall_ms        -> duration of a stall
+#?  timeout_ms      -> max wait of a read before it gives up with BSS_TIMEOUT
+#?  seed            -> seed of the random bits and the stalls (system random if not given)
+
+PSYREG_API_VERSION = 1
+INVALID_DATASOURCE = -1
+BSS_GOOD = 0x0000
+BSS_WAITING = 0x0002
+BSS_TIMEOUT = 0x0100
+BSS_INVALID = 0x0200
+
+# Byte -> its least significant bit, to turn random bytes into one random bit per byte
+LOW_BIT = bytes([value & 1 for value in range(256)])
+
+DEFAULT_OPTIONS = {'devices': 1, 'bits_per_second': 1000000, 'buffer_bits': 1 << 20, 'stall_rate': 0,
+                   'stall_ms': 0, 'timeout_ms': 1000, 'seed': None}
+
+
+def parse_options(text):
+    # "key=value,key=value" -> dict of options with the types of DEFAULT_OPTIONS
+    options = dict(DEFAULT_OPTIONS)
+    for item in (text or '').split(','):
+        key, _, value = item.strip().partition('=')
+        if key in options and value != '':
+            options[key] = float(value) if key in ('stall_rate', 'bits_per_second') else int(value)
+    return options
+
+
+def write_bytes(pointer, data):
+    #? Copy data to the memory a ctypes argument points to (byref(), an array or a POINTER instance)
+    target = getattr(pointer, '_obj', pointer)
+    if isinstance(target, ctypes._Pointer):
+        address = ctypes.cast(target, ctypes.c_void_p).value
+    else:
+        address = ctypes.addressof(target)
+    ctypes.memmove(address, data, len(data))
+
+
+class Emulated_Source():
+    #? One emulated device: bits are produced at `bits_per_second` since it was opened
+    def __init__(self, number, options, generator):
+        self.number = number
+        self.options = options
+        self.random = generator
+        self.device_id = 'EMU%05d' % number
+        self.opened = False
+        self.status = BSS_GOOD
+        self.produced_at = 0.0
+        self.available = 0.0
+        self.stalled_until = 0.0
+        self.lock = threading.Lock()
+
+    def open(self):
+        self.opened = True
+        self.produced_at = time.perf_counter()
+        self.available = 0.0
+        self.status = BSS_GOOD
+        return 1
+
+    def close(self):
+        self.opened = False
+
+    def reset(self):
+        self.available = 0.0
+
+    def produce(self):
+        now = time.perf_counter()
+        self.available = min(self.available + (now - self.produced_at) * self.options['bits_per_second'],
+                             self.options['buffer_bits'])
+        self.produced_at = now
+        return now
+
+    def take_available(self, bits):
+        # Up to `bits` bits without waiting
+        with self.lock:
+            self.produce()
+            if time.perf_counter() < self.stalled_until:
+                return 0
+            bits = min(bits, int(self.available))
+            self.available -= bits
+            return bits
+
+    def take(self, bits):
+        #? Wait until `bits` bits are available (or the read times out)
+        # @returns number of bits that can be read
+        with self.lock:
+            now = self.produce()
+            if self.options['stall_rate'] and self.random.random() < self.options['stall_rate']:
+                # Injected stall: the device sends nothing for stall_ms
+                self.stalled_until = now + self.options['stall_ms'] / 1000
+            deadline = now + self.options['timeout_ms'] / 1000
+            while True:
+                if now >= self.stalled_until and self.available >= bits:
+                    self.available -= bits
+                    self.status = BSS_GOOD
+                    return bits
+                if now >= deadline:
+                    # Return what was buffered before the timeout
+                    bits = int(self.available) if now >= self.stalled_until else 0
+                    self.available -= bits
+                    self.status = BSS_TIMEOUT
+                    return bits
+                self.status = BSS_WAITING
+                if now < self.stalled_until:
+                    wait = self.stalled_until - now
+                else:
+                    wait = (bits - self.available) / self.options['bits_per_second']
+                time.sleep(min(max(wait, 0.0001), deadline - now))
+                now = self.produce()
+
+
+class Emulated_Function():
+    #? Behaves like a function of a ctypes.CDLL: restype and argtypes can be set, they are ignored
+    def __init__(self, function):
+        self.function = function
+        self.restype = None
+        self.argtypes = None
+
+    def __call__(self, *arguments):
+        return self.function(*arguments)
+
+
+class PsyREG_Emulator():
+    #? Emulated PsyREG.dll: attributes are the exported functions (PsyREGGetBit, PsyREGGetBits, ...)
+    def __init__(self, options=None):
+        self.options = parse_options(options) if isinstance(options, str) or options is None else options
+        self.random = random.Random(self.options['seed'])
+        self.sources = []
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if not name.startswith('PsyREG'):
+            raise AttributeError(name)
+        implementation = getattr(type(self), 'emulate_' + name[len('PsyREG'):], None)
+        if implementation is None:
+            raise AttributeError('function ' + name + ' not found')
+        function = Emulated_Function(self.count_calls(implementation.__get__(self)))
+        # Keep it, so restype and argtypes set by the caller are kept like in ctypes
+        setattr(self, name, function)
+        return function
+
+    def count_calls(self, implementation):
+        def call(*arguments):
+            self.calls += 1
+            return implementation(*arguments)
+        return call
+
+    def source(self, handle):
+        if 1 <= handle <= len(self.sources) and self.sources[handle - 1] is not None:
+            return self.sources[handle - 1]
+        return None
+
+    # & SOURCE MANAGER
+    def emulate_APIVersion(self):
+        return PSYREG_API_VERSION
+
+    def emulate_EnumerateSources(self):
+        with self.lock:
+            if len(self.sources) == 0:
+                self.sources = [Emulated_Source(number, self.options, random.Random(self.random.random()))
+                                for number in range(1, self.options['devices'] + 1)]
+            return len(self.sources)
+
+    def emulate_ClearSources(self):
+        with self.lock:
+            self.sources = []
+
+    def emulate_GetSourceCount(self, *arguments):
+        return len(self.sources)
+
+    def emulate_GetSource(self, index):
+        return index + 1 if 0 <= index < len(self.sources) else INVALID_DATASOURCE
+
+    def emulate_ReleaseSource(self, handle):
+        source = self.source(handle)
+        if source is not None:
+            source.close()
+
+    def emulate_GetDeviceTypeBSTR(self, handle):
+        return b'PsyREG (emulated)' if self.source(handle) is not None else b''
+
+    def emulate_GetDeviceIdBSTR(self, handle):
+        source = self.source(handle)
+        return source.device_id.encode() if source is not None else b''
+
+    # & DATA SOURCE
+    def emulate_Open(self, handle):
+        source = self.source(handle)
+        return source.open() if source is not None else 0
+
+    def emulate_Close(self, handle):
+        source = self.source(handle)
+        if source is not None:
+            source.close()
+
+    def emulate_IsOpened(self, handle):
+        source = self.source(handle)
+        return int(source is not None and source.opened)
+
+    def emulate_Reset(self, handle):
+        source = self.source(handle)
+        if source is not None:
+            source.reset()
+
+    def emulate_GetStatus(self, handle):
+        source = self.source(handle)
+        return source.status if source is not None else BSS_INVALID
+
+    def emulate_GetBit(self, handle, bit):
+        source = self.source(handle)
+        if source is None or not source.opened or source.take(1) < 1:
+            return 0
+        write_bytes(bit, bytes([source.random.getrandbits(1)]))
+        return 1
+
+    def emulate_GetByte(self, handle, byte):
+        source = self.source(handle)
+        if source is None or not source.opened or source.take(8) < 8:
+            return 0
+        write_bytes(byte, source.random.randbytes(1))
+        return 1
+
+    def emulate_GetBits(self, handle, buffer, max_bits, block):
+        #? Bulk read like psyreg.h: int PsyREGGetBits(DataSource, unsigned char* pucBuf, int iMaxBits, BOOL bBlock)
+        #? One bit per byte (in the least significant bit); without bBlock only the bits already available are given
+        # @returns the number of bytes written in the buffer
+        source = self.source(handle)
+        if source is None or not source.opened:
+            return 0
+        bits = source.take(int(max_bits)) if block else source.take_available(int(max_bits))
+        data = source.random.randbytes(bits).translate(LOW_BIT)
+        write_bytes(buffer, data)
+        return bits
+
+    def emulate_GetBytes(self, handle, buffer, max_bytes, block):
+        #? Bulk read like psyreg.h: int PsyREGGetBytes(DataSource, unsigned char* pucBuf, int iMaxBytes, BOOL bBlock)
+        # @returns the number of bytes written in the buffer
+        source = self.source(handle)
+        if source is None or not source.opened:
+            return 0
+        bits = source.take(8 * int(max_bytes)) if block else source.take_available(8 * int(max_bytes))
+        data = source.random.randbytes(bits // 8)
+        write_bytes(buffer, data)
+        return len(data)
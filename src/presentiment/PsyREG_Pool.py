@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+#? Includes from built in Python
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+#? Includes from external modules in Pipfile
+import numpy
+#? Includes from this project
+from .PsyREG import PsyREG_driver, BSS_GOOD, INVALID_DATASOURCE
+
+#? Ways of combining the streams of the devices
+COMBINE_XOR = 'XOR' # every device reads all the bits and they are XORed: entropy of all devices, throughput of the slowest
+COMBINE_INTERLEAVE = 'interleave' # every device reads a share of the bits: sum of the throughputs, lower latency
+
+
+class Pool_Device():
+    #? Status and throughput counters of one device of the pool
+    def __init__(self, index):
+        self.index = index
+        self.name = ""
+        self.status = BSS_GOOD
+        self.bits = 0
+        self.seconds = 0.0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, bits, seconds, status):
+        with self.lock:
+            self.bits += bits
+            self.seconds += seconds
+            self.status = status
+            if status != BSS_GOOD:
+                self.errors += 1
+
+    def throughput(self):
+        # Bits per second while reading
+        return self.bits / self.seconds if self.seconds > 0 else 0.0
+
+
+class PsyREG_Pool():
+    #? All the connected Psylerons read in parallel (one thread per device) and combined in one stream
+    #? Same methods as PsyREG, so it can be used as the RNG of a session
+    #? Interleave by default: the bits come from the devices in turn at the sum of their throughputs (XOR mixes the
+    #? entropy of all of them but it is only as fast as the slowest one)
+    def __init__(self, combine=COMBINE_INTERLEAVE):
+        self.driver = PsyREG_driver()
+        self.combine = combine
+        self.devices = [Pool_Device(index) for index in range(self.driver.count_sources())]
+        for device in self.devices:
+            source = self.driver.get_source(device.index)
+            if source != INVALID_DATASOURCE:
+                device_type, device_id = self.driver.device_name(source)
+                device.name = "%s: %s" % (device_type, device_id)
+        self.name = "Psyleron pool: %d devices (%s)" % (len(self.devices), combine)
+        self.executor = ThreadPoolExecutor(max_workers=max(len(self.devices), 1), thread_name_prefix='PsyREG_Pool')
+
+    def get_name(self):
+        return self.name
+
+    def count_PsyREGs(self):
+        return len(self.devices)
+
+    def read_device(self, device, count):
+        # Handles come from the driver cache, so they're fetched again if the sources were cleared
+        source = self.driver.get_source(device.index)
+        self.driver.open_source(source)
+        t_start = time.perf_counter()
+        bits = self.driver.read_bits(source, count)
+        device.record(len(bits), time.perf_counter() - t_start, self.driver.get_status(source))
+        return bits
+
+    def read_bits(self, count):
+        #? Read `count` combined bits as a uint8 array of 0 and 1
+        if len(self.devices) == 0 or count <= 0:
+            return numpy.zeros(0, dtype=numpy.uint8)
+        if self.combine == COMBINE_INTERLEAVE:
+            share = -(-count // len(self.devices))
+            streams = list(self.executor.map(lambda device: self.read_device(device, share), self.devices))
+            # Bit k of device d goes to position k * devices + d
+            return numpy.stack(streams, axis=1).ravel()[:count]
+        streams = list(self.executor.map(lambda device: self.read_device(device, count), self.devices))
+        return numpy.bitwise_xor.reduce(numpy.stack(streams), axis=0)
+
+    def get_bits(self, maxbts):
+        # '0' and '1' are 48 and 49 in ASCII
+        return (self.read_bits(maxbts) + 48).tobytes().decode()
+
+    def clear_RNG(self):
+        # The devices stay open for the whole session; they're released by close()
+        pass
+
+    def release_RNG(self):
+        pass
+
+    def statistics(self):
+        #? Status and throughput of each device
+        return [{'name': device.name, 'status': device.status, 'bits': device.bits,
+                 'bits_per_second': device.throughput(), 'errors': device.errors} for device in self.devices]
+
+    def status_text(self):
+        return "\n".join(["%s: status %d, %.0f bits/s, %d bits, %d errors" % (
+            stats['name'], stats['status'], stats['bits_per_second'], stats['bits'], stats['errors'])
+            for stats in self.statistics()])
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for device in self.devices:
+            self.driver.release_source(self.driver.get_source(device.index))
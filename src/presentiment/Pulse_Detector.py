@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from external modules in Pipfile
+import numpy
+
+#? Includes from this project
+from .Signal_Filter import create_filter_pipeline
+
+# Band of the pulse wave kept before looking for the beats: (stage, Hz) as in Signal_Filter.PHYS_FILTERS
+PULSE_FILTERS = [('highpass', 0.5), ('lowpass', 8.0)]
+# Shortest and longest inter-beat intervals accepted (200 and 30 BPM)
+MIN_IBI_MS = 300
+MAX_IBI_MS = 2000
+# A peak is a beat if it reaches this fraction of the amplitude of the recent beats
+PEAK_THRESHOLD = 0.5
+# Weight of every new beat in the amplitude of the recent beats
+AMPLITUDE_WEIGHT = 0.1
+# The first amplitude is this percentile of the first seconds of the filtered waveform (a short artifact doesn't reach it)
+STARTUP_MS = 3000
+STARTUP_PERCENTILE = 95
+# Without beats for longer than MAX_IBI_MS the amplitude halves every AMPLITUDE_HALF_LIFE_MS, so it recovers from an artifact
+AMPLITUDE_HALF_LIFE_MS = 1000
+
+
+class Pulse_Detector():
+    #? Heart rate from the pulse waveform: band-pass filter, peaks (beats) and inter-beat intervals
+    #? It works chunk by chunk: the filter state, the last 2 samples, the last beat and the beat amplitude are
+    #? carried to the next chunk; the peaks are found with array operations and only the candidate peaks
+    #? (a few per second) are looped over, so the cost per chunk doesn't grow with the length of the session
+    #? Every peak is judged against the amplitude at its own time, so the beats don't depend on how the samples are chunked
+    def __init__(self, samples_per_second=None):
+        self.samples_per_second = samples_per_second
+        self.pipeline = None
+        self.tail_timestamps = numpy.zeros(0)
+        self.tail_values = numpy.zeros(0)
+        self.last_beat = None
+        self.amplitude = None
+        self.amplitude_time = None
+        self.beats = 0
+
+    def amplitude_at(self, time):
+        #? @returns the amplitude of the recent beats at time (ms), decayed if no beat came for longer than MAX_IBI_MS
+        idle = time - self.amplitude_time - MAX_IBI_MS
+        if idle <= 0:
+            return self.amplitude
+        return self.amplitude * 0.5 ** (idle / AMPLITUDE_HALF_LIFE_MS)
+
+    def process(self, timestamps, values):
+        #? @returns the timestamps (int64 ms) of the beats found in the chunk and the heart rate (BPM) at each of them
+        #? (the first beat has no inter-beat interval, neither do beats after an interval out of [MIN_IBI_MS, MAX_IBI_MS])
+        timestamps = numpy.asarray(timestamps, dtype=numpy.float64)
+        values = numpy.asarray(values, dtype=numpy.float64)
+        if self.pipeline is None:
+            if self.samples_per_second is None:
+                if len(timestamps) < 2:
+                    return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0)
+                # Sample rate of the recording, from its timestamps
+                self.samples_per_second = 1000 / numpy.median(numpy.diff(timestamps))
+            self.pipeline = create_filter_pipeline(PULSE_FILTERS, self.samples_per_second)
+        filtered = self.pipeline.process(values)
+        # The last 2 samples of the previous chunk go first, so a peak at the border is found too
+        t = numpy.concatenate([self.tail_timestamps, timestamps])
+        x = numpy.concatenate([self.tail_values, filtered])
+        if self.amplitude is None:
+            # Keep the samples until the first STARTUP_MS are in, the same ones whatever the chunks
+            if len(t) == 0 or t[-1] - t[0] < STARTUP_MS:
+                self.tail_timestamps, self.tail_values = t, x
+                return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0)
+            self.amplitude = max(float(numpy.percentile(x[t < t[0] + STARTUP_MS], STARTUP_PERCENTILE)), 0.0)
+            self.amplitude_time = t[0] + STARTUP_MS
+        self.tail_timestamps, self.tail_values = t[-2:], x[-2:]
+        if len(x) < 3:
+            return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0)
+        # Local maxima of the positive half wave: the threshold is checked peak by peak below
+        previous, middle, following = x[:-2], x[1:-1], x[2:]
+        peaks = numpy.flatnonzero((middle > previous) & (middle >= following) & (middle > 0)) + 1
+        # Time of the top of the parabola through each peak and its neighbours (finer than the sample period)
+        curvature = x[peaks - 1] - 2 * x[peaks] + x[peaks + 1]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            shift = numpy.where(curvature < 0, 0.5 * (x[peaks - 1] - x[peaks + 1]) / curvature, 0.0)
+        peak_times = t[peaks] + shift * (t[peaks + 1] - t[peaks - 1]) / 2
+        beat_times, rates = [], []
+        for peak_time, peak_value in zip(peak_times.tolist(), x[peaks].tolist()):
+            if self.last_beat is not None and peak_time - self.last_beat < MIN_IBI_MS:
+                # Refractory period: a second peak of the same beat (e.g. the dicrotic notch)
+                continue
+            amplitude = self.amplitude_at(peak_time)
+            if peak_value <= PEAK_THRESHOLD * amplitude:
+                continue
+            if self.last_beat is not None and peak_time - self.last_beat <= MAX_IBI_MS:
+                beat_times.append(peak_time)
+                rates.append(60000 / (peak_time - self.last_beat))
+            self.last_beat = peak_time
+            self.amplitude = amplitude + AMPLITUDE_WEIGHT * (peak_value - amplitude)
+            self.amplitude_time = peak_time
+            self.beats += 1
+        return numpy.round(numpy.array(beat_times)).astype(numpy.int64), numpy.array(rates, dtype=numpy.float64)
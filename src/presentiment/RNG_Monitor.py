@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+#? Includes from built in Python
+import math
+from datetime import datetime
+#? Includes from external modules in Pipfile
+import numpy
+
+# Number of 1 bits of every byte value
+POPCOUNT = numpy.unpackbits(numpy.arange(256, dtype=numpy.uint8)[:, None], axis=1).sum(axis=1).astype(numpy.int64)
+# p-value under which a test raises an alarm; low, because the tests are repeated after every read
+ALARM_ALPHA = 0.001
+# Bits needed before the tests can raise alarms
+MIN_BITS = 256
+# Bits of each block of the block-frequency test (a multiple of 8)
+BLOCK_BITS = 64
+# Lags of the autocorrelation tests (lag 1 is the runs test)
+AUTOCORRELATION_LAGS = (2, 8)
+
+
+def to_bit_array(bits):
+    # '0'/'1' strings (as returned by get_bits) or arrays of 0 and 1 -> uint8 array
+    if isinstance(bits, str):
+        return numpy.frombuffer(bits.encode(), dtype=numpy.uint8) - 48
+    return numpy.asarray(bits, dtype=numpy.uint8)
+
+def popcount(packed):
+    return int(POPCOUNT[packed].sum())
+
+def normal_p_value(z):
+    # Two-sided p-value of a standard normal statistic
+    return math.erfc(abs(z) / math.sqrt(2))
+
+def chi_square_p_value(chi2, degrees):
+    # Upper tail of a chi-square distribution (Wilson-Hilferty approximation, fine from a few degrees of freedom)
+    if degrees <= 0:
+        return 1.0
+    z = ((chi2 / degrees) ** (1 / 3) - (1 - 2 / (9 * degrees))) / math.sqrt(2 / (9 * degrees))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+class RNG_Monitor():
+    #? Streaming health tests (NIST SP 800-22 monobit, runs and block frequency, plus autocorrelation) of the RNG bits
+    #? The statistics are counts updated with a popcount of packed bits, so each read only costs its own bits
+    def __init__(self, on_alarm=None, alpha=ALARM_ALPHA, min_bits=MIN_BITS, block_bits=BLOCK_BITS, lags=AUTOCORRELATION_LAGS):
+        # on_alarm(test name, p-value) is called when a test starts failing
+        self.on_alarm = on_alarm
+        self.alpha = alpha
+        self.min_bits = min_bits
+        self.block_bits = block_bits
+        self.lags = (1,) + tuple(lags)
+        self.reset()
+
+    def reset(self):
+        self.bits = 0
+        self.ones = 0
+        # Last bits of the previous read, to compare across reads
+        self.history = numpy.zeros(0, dtype=numpy.uint8)
+        # Number of compared pairs (x[i], x[i + lag]) and how many of them differ
+        self.compared = {lag: 0 for lag in self.lags}
+        self.differences = {lag: 0 for lag in self.lags}
+        # Block-frequency test: complete blocks and the block being filled
+        self.blocks = 0
+        self.block_deviations = 0.0
+        self.block_fill = 0
+        self.block_ones = 0
+        self.failing = set()
+        self.alarms = []
+
+    def add_bits(self, bits):
+        #? Update the statistics with new bits and check them
+        bits = to_bit_array(bits)
+        if len(bits) == 0:
+            return
+        self.bits += len(bits)
+        self.ones += popcount(numpy.packbits(bits))
+        # Pairs at distance `lag` whose second bit is new; packbits pads both sides with the same zeros
+        extended = numpy.concatenate([self.history, bits])
+        for lag in self.lags:
+            start = max(len(self.history), lag)
+            if start < len(extended):
+                pairs = numpy.packbits(extended[start:]) ^ numpy.packbits(extended[start - lag:len(extended) - lag])
+                self.differences[lag] += popcount(pairs)
+                self.compared[lag] += len(extended) - start
+        self.history = extended[-max(self.lags):]
+        self.add_blocks(bits)
+        self.check()
+
+    def add_blocks(self, bits):
+        # Complete the block being filled
+        first = min(self.block_bits - self.block_fill, len(bits))
+        self.block_ones += int(numpy.count_nonzero(bits[:first]))
+        self.block_fill += first
+        if self.block_fill == self.block_bits:
+            self.close_block(self.block_ones)
+            self.block_fill, self.block_ones = 0, 0
+        bits = bits[first:]
+        if len(bits) == 0:
+            return
+        # Whole blocks at once, then keep the rest for the next read
+        whole = len(bits) // self.block_bits * self.block_bits
+        if whole > 0:
+            block_ones = POPCOUNT[numpy.packbits(bits[:whole]).reshape(-1, self.block_bits // 8)].sum(axis=1)
+            for ones in block_ones.tolist():
+                self.close_block(ones)
+        self.block_fill = len(bits) - whole
+        self.block_ones += int(numpy.count_nonzero(bits[whole:]))
+
+    def close_block(self, ones):
+        self.blocks += 1
+        self.block_deviations += (ones / self.block_bits - 0.5) ** 2
+
+    def p_values(self):
+        #? p-value of each test, None while there are not enough bits
+        results = {'monobit': None, 'runs': None, 'block frequency': None}
+        results.update({'autocorrelation lag %d' % lag: None for lag in self.lags[1:]})
+        n = self.bits
+        if n < 2:
+            return results
+        results['monobit'] = normal_p_value((2 * self.ones - n) / math.sqrt(n))
+        pi = self.ones / n
+        if abs(pi - 0.5) >= 2 / math.sqrt(n):
+            # Prerequisite of the runs test: too biased to count runs
+            results['runs'] = 0.0
+        else:
+            runs = self.differences[1] + 1
+            results['runs'] = math.erfc(abs(runs - 2 * n * pi * (1 - pi)) / (2 * math.sqrt(2 * n) * pi * (1 - pi)))
+        if self.blocks > 0:
+            results['block frequency'] = chi_square_p_value(4 * self.block_bits * self.block_deviations, self.blocks)
+        for lag in self.lags[1:]:
+            compared = self.compared[lag]
+            if compared > 0:
+                results['autocorrelation lag %d' % lag] = normal_p_value(2 * (self.differences[lag] - compared / 2) / math.sqrt(compared))
+        return results
+
+    def check(self):
+        # Alarm once when a test starts failing; it can alarm again after it passes
+        if self.bits < self.min_bits:
+            return
+        for test, p_value in self.p_values().items():
+            if p_value is None:
+                continue
+            if p_value < self.alpha and test not in self.failing:
+                self.failing.add(test)
+                self.alarms.append((datetime.now().strftime('%H:%M:%S.%f')[:-3], test, p_value))
+                if self.on_alarm is not None:
+                    self.on_alarm(test, p_value)
+            elif p_value >= self.alpha:
+                self.failing.discard(test)
+
+    def report(self):
+        #? RNG quality report of the session, one line per item
+        lines = ["Bits: %d" % self.bits,
+                 "Ones: %.4f" % (self.ones / self.bits if self.bits else float('nan'))]
+        for test, p_value in self.p_values().items():
+            if p_value is None:
+                lines.append("%s: not enough bits" % test)
+            else:
+                lines.append("%s p: %.6f (%s)" % (test, p_value, "FAIL" if p_value < self.alpha else "pass"))
+        lines += ["Alarm at %s: %s p=%.6f" % alarm for alarm in self.alarms] or ["Alarms: none"]
+        return lines
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+#? Includes from built in Python
+from multiprocessing import shared_memory
+
+#? Includes from external modules in Pipfile
+import numpy
+
+#? Layout of the shared memory: a header of HEADER_SLOTS int64 followed by `capacity` fixed-width records
+HEADER_SLOTS = 8
+LENGTH = 0  # Number of records written (records [0, LENGTH) have been published)
+CAPACITY = 1  # Number of records that fit in the buffer
+CHANNELS = 2  # Number of values per record
+START = 3  # Timestamp (int64 ms) at which the acquisition started
+STATE = 4  # One of the STATE_* values below
+GAPS = 5  # Number of gaps in the timeline (e.g. between two Neulog experiment segments)
+GAP_MS = 6  # Total milliseconds without samples in those gaps
+SYNC_BOUND = 7  # Max error (ms) of the timestamps against the host clock (see Clock_Sync)
+#? Acquisition states
+STATE_CREATED = 0
+STATE_RUNNING = 1
+STATE_FINISHED = 2
+STATE_FAILED = 3
+
+def record_dtype(num_channels):
+    # timestamp: int64 ms, values: one float64 per channel
+    return numpy.dtype([('timestamp', '<i8'), ('values', '<f8', (num_channels,))])
+
+
+class Sample_Buffer():
+    #? Single-writer append-only buffer of sample records in shared memory, sized for the whole session (the
+    #? analysis reads every sample at the end, so nothing may be overwritten)
+    #? The writer fills the records first and then publishes them by moving LENGTH; published records never change,
+    #? so readers get NumPy views of the shared memory (no copies) that can't be torn
+    def __init__(self, capacity=None, num_channels=None, name=None):
+        if name is None:
+            # Create a new buffer
+            size = HEADER_SLOTS * 8 + capacity * record_dtype(num_channels).itemsize
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.header = numpy.ndarray((HEADER_SLOTS,), dtype=numpy.int64, buffer=self.shm.buf)
+            self.header[:] = 0
+            self.header[CAPACITY] = capacity
+            self.header[CHANNELS] = num_channels
+            self.owner = True
+        else:
+            # Attach to a buffer created by another process
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.header = numpy.ndarray((HEADER_SLOTS,), dtype=numpy.int64, buffer=self.shm.buf)
+            self.owner = False
+        self.name = self.shm.name
+        self.capacity = int(self.header[CAPACITY])
+        self.num_channels = int(self.header[CHANNELS])
+        self.records = numpy.ndarray((self.capacity,), dtype=record_dtype(self.num_channels),
+                                     buffer=self.shm.buf, offset=HEADER_SLOTS * 8)
+
+    def length(self):
+        return int(self.header[LENGTH])
+
+    def get_state(self):
+        return int(self.header[STATE])
+
+    def set_state(self, state):
+        self.header[STATE] = state
+
+    def get_start(self):
+        return int(self.header[START])
+
+    def set_start(self, timestamp):
+        self.header[START] = timestamp
+
+    def get_gaps(self):
+        return int(self.header[GAPS]), int(self.header[GAP_MS])
+
+    def set_gaps(self, gaps, gap_ms):
+        self.header[GAPS] = gaps
+        self.header[GAP_MS] = gap_ms
+
+    def get_sync_bound(self):
+        return int(self.header[SYNC_BOUND])
+
+    def set_sync_bound(self, bound_ms):
+        self.header[SYNC_BOUND] = bound_ms
+
+    def write(self, timestamps, values):
+        #? Append a block of records (only one process may write)
+        # timestamps: n int64 ms; values: n x num_channels floats
+        # @returns the number of records written, fewer than n if the buffer is full
+        timestamps = numpy.asarray(timestamps, dtype=numpy.int64)
+        values = numpy.asarray(values, dtype=numpy.float64).reshape(len(timestamps), self.num_channels)
+        length = self.length()
+        count = min(len(timestamps), self.capacity - length)
+        self.records['timestamp'][length:length + count] = timestamps[:count]
+        self.records['values'][length:length + count] = values[:count]
+        # Publish the records
+        self.header[LENGTH] = length + count
+        return count
+
+    def read(self, since=0):
+        #? View of the records published since record `since`
+        # @returns the view (empty if there are no new records) and the new cursor
+        length = self.length()
+        return self.records[min(since, length):length], length
+
+    def channel(self, index, since=0):
+        # Timestamps and values of one channel since record `since` (views, no copies)
+        view, _ = self.read(since)
+        return view['timestamp'], view['values'][:, index]
+    def close(self):
+        # Views handed out keep the memory mapped; in that case it is unmapped when they are garbage collected
+        self.header = None
+        self.records = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self):
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+#? Includes from built in Python
+import importlib
+import os
+
+#? Kinds of physiological sensor used by the sessions
+SENSOR_KINDS = ['skin_conductance', 'heart_rate', 'brainwaves']
+
+#? Backends by name: "module:Class" (a module starting with '.' is in this package); a module is only imported when used
+#? More backends can be added without changing the code with PRESENTIMENT_SENSOR_BACKENDS="Name=module:Class,..."
+SENSOR_BACKENDS = {
+    'Neulog': '.Neulog_Backend:Neulog_Backend',
+}
+
+
+class Sensor_Backend():
+    #? Interface of a physiological sensor backend
+    #? An acquisition (from open_acquisition) records in blocks: read(since) gives a NumPy view of the records with
+    #? a timestamp (int64 epoch ms on the host clock) and one float64 value per channel (see Sample_Buffer.record_dtype)
+    # Name shown in the sensor combos
+    name = ""
+    # Kinds of sensor (SENSOR_KINDS) the backend can record
+    kinds = []
+    # Kinds it can also record as a raw waveform (e.g. the pulse wave, the heart rate comes from its beats)
+    waveforms = []
+
+    def __init__(self, settings):
+        # settings: dict with the values of the window the backends may need (e.g. 'neulog_port')
+        self.settings = settings
+
+    @classmethod
+    def discover(cls, settings):
+        # @returns list of backends ready to be used (e.g. one per connected device), empty if there's none
+        return []
+
+    def sample_rates(self, kind):
+        # Samples per second the backend can record for a kind of sensor
+        return [20, 10, 5, 2, 1]
+
+    def value_range(self, kind):
+        # (low, high) valid values of a kind of sensor, values at the limits are saturated (see quality_operations)
+        return (-float('inf'), float('inf'))
+
+    def channel_label(self, kind):
+        # Short label of the values of a kind of sensor (e.g. 'GSR')
+        return kind
+
+    def read_value(self, kind):
+        # @returns the current value of a sensor, for the test buttons
+        raise NotImplementedError
+
+    def open_acquisition(self, kinds, samples_per_second, seconds, waveforms=()):
+        #? samples_per_second: sample rate of each kind; a backend that records all its channels at one rate
+        #? records at the highest one, the analysis averages the faster channels down to their rate
+        #? waveforms: kinds (of `waveforms`) to record as a raw waveform
+        #? @returns an acquisition of the kinds of sensor (one channel each, in this order) with the methods:
+        #?  start() -> True when it's recording, start_timestamp() -> int64 ms, read(since) -> (blocks, cursor),
+        #?  channel(index) -> (timestamps, values), gaps() -> (count, ms), sync_bound() -> max error (ms) of the
+        #?  timestamps against the host clock, stop() and release();
+        #?  and channel_names, the kinds of its channels
+        raise NotImplementedError
+
+
+def registered_sensor_backends():
+    # SENSOR_BACKENDS plus the ones in PRESENTIMENT_SENSOR_BACKENDS
+    backends = dict(SENSOR_BACKENDS)
+    for item in os.environ.get("PRESENTIMENT_SENSOR_BACKENDS", "").split(','):
+        name, _, path = item.partition('=')
+        if name.strip() and path.strip():
+            backends[name.strip()] = path.strip()
+    return backends
+
+loaded_sensor_backends = {}
+
+def load_sensor_backend(name):
+    # @returns the class of a backend, None if its module can't be imported (e.g. a missing driver)
+    if name not in loaded_sensor_backends:
+        module_name, _, class_name = registered_sensor_backends()[name].partition(':')
+        try:
+            module = importlib.import_module(module_name, __package__)
+            loaded_sensor_backends[name] = getattr(module, class_name)
+        except (ImportError, AttributeError) as error:
+            print("Sensor backend " + name + " not available: " + str(error))
+            loaded_sensor_backends[name] = None
+    return loaded_sensor_backends[name]
+
+def discover_sensor_backends(settings):
+    #? @returns dict name -> backend of every backend with a device ready
+    found = {}
+    for name in registered_sensor_backends():
+        backend_class = load_sensor_backend(name)
+        if backend_class is None:
+            continue
+        try:
+            for backend in backend_class.discover(settings):
+                found[backend.name] = backend
+        except Exception as error:
+            # A backend without its device (e.g. server not running) is not listed
+            print("Sensor backend " + name + " not found: " + str(error))
+    return found
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from built in Python
+import json
+import os
+
+#? Includes from external modules in Pipfile
+import numpy
+
+#? Session container: a directory with a JSON header (header.json) and one raw little-endian file per array of
+#? each channel (sensor): <channel>.timestamps (int64 ms), <channel>.values (float64) and <channel>.trials (int32
+#? trial index, -1 outside every trial). Opening it only reads the header, the arrays are numpy.memmap views of the
+#? files (nothing is copied nor parsed), so a recording of any size opens at once. Samples are appended during the
+#? acquisition; the length of a channel is the one of its shortest file, so a block half written is never read
+
+CONTAINER_FORMAT = 'presentiment-session'
+CONTAINER_VERSION = 1
+HEADER_FILE = 'header.json'
+# Array of a channel -> little-endian dtype of its file
+CHANNEL_ARRAYS = {'timestamps': '<i8', 'values': '<f8', 'trials': '<i4'}
+# Samples whose trial index is computed at once when the trials are set
+TRIAL_BLOCK = 1 << 20
+
+class Session_Container():
+    #? Create a container with `channels` (names of the sensors), or open an existing one when channels is None
+    def __init__(self, path, channels=None, metadata=None):
+        self.path = path
+        self.files = {}
+        self.maps = {}
+        if channels is not None:
+            os.makedirs(path)
+            self.header = {'format': CONTAINER_FORMAT, 'version': CONTAINER_VERSION, 'byte_order': 'little',
+                           'channels': {channel: {array: {'file': channel + '.' + array, 'dtype': dtype}
+                                                  for array, dtype in CHANNEL_ARRAYS.items()} for channel in channels},
+                           'trials': {'trial_ids': [], 'stimulus_ids': [], 'start': [], 'end': []},
+                           'metadata': dict(metadata or {})}
+            for channel in channels:
+                for array in CHANNEL_ARRAYS:
+                    open(self.array_path(channel, array), 'wb').close()
+            self.write_header()
+        else:
+            with open(os.path.join(path, HEADER_FILE), encoding='utf-8') as file:
+                self.header = json.load(file)
+            if self.header.get('format') != CONTAINER_FORMAT or self.header.get('version', 0) > CONTAINER_VERSION:
+                raise ValueError(path + ' is not a session container this version can read')
+
+    def channels(self):
+        return list(self.header['channels'])
+
+    def metadata(self):
+        return self.header['metadata']
+
+    def update_metadata(self, **values):
+        self.header['metadata'].update(values)
+        self.write_header()
+
+    def write_header(self):
+        # Written to a temporary file first, so the header is never half written
+        temporary = os.path.join(self.path, HEADER_FILE + '.tmp')
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(self.header, file, indent=1)
+        os.replace(temporary, os.path.join(self.path, HEADER_FILE))
+
+    def array_path(self, channel, array):
+        return os.path.join(self.path, self.header['channels'][channel][array]['file'])
+
+    def append(self, channel, timestamps, values, trials=None):
+        #? Append a block of samples to a channel (e.g. a chunk of the acquisition)
+        # trials: trial index of each sample, -1 (not known yet, see set_trials) by default
+        timestamps = numpy.asarray(timestamps, dtype='<i8')
+        values = numpy.asarray(values, dtype='<f8').reshape(len(timestamps))
+        trials = numpy.full(len(timestamps), -1, dtype='<i4') if trials is None else numpy.asarray(trials, dtype='<i4')
+        for array, data in (('values', values), ('trials', trials), ('timestamps', timestamps)):
+            if (channel, array) not in self.files:
+                self.files[(channel, array)] = open(self.array_path(channel, array), 'ab')
+            file = self.files[(channel, array)]
+            file.write(data.tobytes())
+            # Readers of the container (e.g. another process) see the block right away
+            file.flush()
+
+    def length(self, channel):
+        # Samples of the channel written completely
+        return min([os.path.getsize(self.array_path(channel, array)) // numpy.dtype(dtype).itemsize
+                    for array, dtype in CHANNEL_ARRAYS.items()])
+
+    def array(self, channel, array):
+        #? Read-only memmap of an array of a channel; mapped again only if the channel grew
+        length = self.length(channel)
+        mapped = self.maps.get((channel, array))
+        if mapped is None or mapped[0] != length:
+            dtype = numpy.dtype(self.header['channels'][channel][array]['dtype'])
+            if length == 0:
+                # An empty file can't be mapped
+                data = numpy.zeros(0, dtype=dtype)
+            else:
+                data = numpy.memmap(self.array_path(channel, array), dtype=dtype, mode='r', shape=(length,))
+            mapped = (length, data)
+            self.maps[(channel, array)] = mapped
+        return mapped[1]
+
+    def channel(self, channel):
+        # Timestamps and values of a channel (memmap views)
+        return self.array(channel, 'timestamps'), self.array(channel, 'values')
+
+    def trials(self):
+        # Trial IDs, stimulus IDs, start and end (int64 ms) of the trials
+        trials = self.header['trials']
+        return (trials['trial_ids'], trials['stimulus_ids'], numpy.array(trials['start'], dtype=numpy.int64),
+                numpy.array(trials['end'], dtype=numpy.int64))
+
+    def set_trials(self, trial_ids, stimulus_ids, trial_start, trial_end):
+        #? Write the trials in the header and the trial index of every sample (the trial whose end comes right after
+        #? it, like analysis_operations.create_phys_ids)
+        trial_start = numpy.asarray(trial_start, dtype=numpy.int64)
+        trial_end = numpy.asarray(trial_end, dtype=numpy.int64)
+        self.header['trials'] = {'trial_ids': [str(trial_id) for trial_id in trial_ids],
+                                 'stimulus_ids': [str(stimulus_id) for stimulus_id in stimulus_ids],
+                                 'start': trial_start.tolist(), 'end': trial_end.tolist()}
+        self.write_header()
+        for channel in self.channels():
+            length = self.length(channel)
+            if length == 0:
+                continue
+            timestamps = self.array(channel, 'timestamps')
+            trials = numpy.memmap(self.array_path(channel, 'trials'), dtype='<i4', mode='r+', shape=(length,))
+            for first in range(0, length, TRIAL_BLOCK):
+                block = numpy.asarray(timestamps[first:first + TRIAL_BLOCK])
+                index = numpy.searchsorted(trial_end, block, side='right')
+                valid = index < len(trial_end)
+                if len(trial_start) > 0:
+                    valid &= block >= trial_start[0]
+                trials[first:first + len(block)] = numpy.where(valid, index, -1)
+            trials.flush()
+            del trials
+
+    def trial_window(self, channel, trial, before_ms=0, after_ms=0):
+        #? Timestamps and values of a channel from `before_ms` before the start of a trial to `after_ms` after its
+        #? end, found by binary search on the timestamps (only a few pages of the files are read)
+        # trial: index of the trial or its trial ID
+        trial_ids, _, trial_start, trial_end = self.trials()
+        if not isinstance(trial, (int, numpy.integer)):
+            trial = trial_ids.index(str(trial))
+        timestamps, values = self.channel(channel)
+        first, last = numpy.searchsorted(timestamps, [trial_start[trial] - before_ms, trial_end[trial] + after_ms])
+        return timestamps[first:last], values[first:last]
+
+    def phys(self):
+        # The channels and trials in the form of legacy_operations.read_phys_export, so legacy_session builds the
+        # session of analysis_operations.analyse_sensor
+        trial_ids, stimulus_ids, trial_start, trial_end = self.trials()
+        return {
+            'name': os.path.basename(os.path.normpath(self.path)),
+            'session_id': self.header['metadata'].get('session_id'),
+            'trial_ids': trial_ids,
+            'stimulus_ids': stimulus_ids,
+            'trial_start': trial_start,
+            'trial_end': trial_end,
+            'rows': max([self.length(channel) for channel in self.channels()] + [0]),
+            'sensors': {channel: dict(zip(('timestamps', 'values'), self.channel(channel))) for channel in self.channels()
+                        if self.length(channel) > 0},
+        }
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+        self.files = {}
+        # Views handed out keep their files mapped until they are garbage collected
+        self.maps = {}
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from built in Python
+import os
+import re
+import sqlite3
+
+#? Includes from external modules in Pipfile
+import numpy
+import pandas
+
+#? Includes from this project
+from .pooled_operations import STIMULUS_COLUMN, FN_COLUMNS, COVARIATE_COLUMNS, EXPORT_ENCODING
+from .analysis_operations import parse_timestamps
+from .legacy_operations import milliseconds_since_midnight, first_session_day
+from .trial_operations import neutral_trials
+
+# Index used when PRESENTIMENT_SESSION_INDEX is not set
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser('~'), 'presentiment_sessions.sqlite')
+# Columns of the session exports (see data_handling_operations.export_CSV) besides the ones of pooled_operations
+SESSION_COLUMNS = {'started_at': 'Session started at:', 'finished_at': 'Session finished at:',
+                   'onset_at': 'First trial started at:'}
+D_COLUMNS = {'skin_conductance': 'Skin conductance D [SUM(FnE)-SUM(FnN)]:',
+             'heart_rate': 'Heart rate D [SUM(FnE)-SUM(FnN)]:',
+             'brainwaves': 'Brainwaves D [SUM(FnE)-SUM(FnN)]:'}
+TRIAL_COLUMNS = {'trial_id': 'Trial ID:', 'time_start': 'Time at the start of trial:', 'time_end': 'Time at the end of trial:'}
+REPORT_COLUMN = 'Physiological analysis report:'
+# Sample rate of a sensor in the lines of the physiological report, e.g. "skin_conductance: ... (20 samples/s)"
+REPORT_RATE = re.compile(r'^(\w+): .*\((\d+(?:\.\d+)?) samples/s\)')
+# Times of the exports, local '%H:%M:%S.%f'
+EXPORT_TIME = re.compile(r'^\d{2}:\d{2}:\d{2}(\.\d{1,6})?$')
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT UNIQUE,
+    label TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    onset_at TEXT,
+    participant_sex TEXT,
+    num_trials INTEGER
+);
+CREATE TABLE IF NOT EXISTS session_sensors (
+    session_id INTEGER REFERENCES sessions(session_id) ON DELETE CASCADE,
+    sensor TEXT,
+    samples_per_second REAL,
+    D REAL,
+    ZD REAL,
+    PRIMARY KEY (session_id, sensor)
+);
+CREATE TABLE IF NOT EXISTS trials (
+    session_id INTEGER REFERENCES sessions(session_id) ON DELETE CASCADE,
+    trial_number INTEGER,
+    trial_id TEXT,
+    stimulus_id TEXT,
+    excitatory INTEGER,
+    time_start INTEGER,
+    time_end INTEGER,
+    PRIMARY KEY (session_id, trial_number)
+);
+CREATE TABLE IF NOT EXISTS trial_Fn (
+    session_id INTEGER REFERENCES sessions(session_id) ON DELETE CASCADE,
+    sensor TEXT,
+    trial_number INTEGER,
+    Fn REAL,
+    PRIMARY KEY (session_id, sensor, trial_number)
+);
+CREATE INDEX IF NOT EXISTS sessions_by_trials ON sessions (num_trials);
+CREATE INDEX IF NOT EXISTS sessions_by_sex ON sessions (participant_sex);
+CREATE INDEX IF NOT EXISTS sensors_by_rate ON session_sensors (sensor, samples_per_second);
+CREATE INDEX IF NOT EXISTS trials_by_stimulus ON trials (stimulus_id);
+"""
+
+
+def leading_float(text):
+    # First number of a text such as "49.16 [-313.7, 401.7]", NaN if there is none
+    match = re.match(r'\s*(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|nan)', str(text))
+    return float(match.group(1)) if match else float('nan')
+
+
+class Session_Index():
+    #? Local SQLite index of the sessions: metadata, trials, Fn of every trial and D/ZD of every sensor
+    #? Each session is kept once per source (the file it was exported to); adding it again replaces it
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("PRESENTIMENT_SESSION_INDEX") or DEFAULT_INDEX_PATH
+        self.connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(SCHEMA)
+
+    def add_session(self, source, metadata, trials, sensors):
+        #? Write a session in one transaction
+        # metadata: dict with label, started_at, finished_at, onset_at and participant_sex (all optional)
+        # trials: dict of lists trial_id, stimulus_id, time_start and time_end (one item per trial)
+        # sensors: dict of sensor name -> dict with samples_per_second, D, ZD and Fn (list, one per trial)
+        # @returns the session_id
+        stimulus_ids = [str(stimulus_id) for stimulus_id in trials.get('stimulus_id', [])]
+        num_trials = len(stimulus_ids)
+        def column(name):
+            values = list(trials.get(name, []))
+            return values + [None] * (num_trials - len(values))
+        with self.connection:
+            self.connection.execute("DELETE FROM sessions WHERE source = ?", (source,))
+            cursor = self.connection.execute(
+                "INSERT INTO sessions (source, label, started_at, finished_at, onset_at, participant_sex, num_trials)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source, metadata.get('label'), metadata.get('started_at'), metadata.get('finished_at'),
+                 metadata.get('onset_at'), metadata.get('participant_sex') or None, num_trials))
+            session_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO trials VALUES (?, ?, ?, ?, ?, ?, ?)",
+                zip([session_id] * num_trials, range(1, num_trials + 1), column('trial_id'), stimulus_ids,
+                    (~neutral_trials(stimulus_ids)).astype(int).tolist(),
+                    [None if time is None else int(time) for time in column('time_start')],
+                    [None if time is None else int(time) for time in column('time_end')]))
+            for sensor, values in sensors.items():
+                self.connection.execute("INSERT INTO session_sensors VALUES (?, ?, ?, ?, ?)",
+                                        (session_id, sensor, values.get('samples_per_second'), values.get('D'),
+                                         values.get('ZD')))
+                Fn = numpy.asarray(values.get('Fn', []), dtype=numpy.float64)[:num_trials]
+                # NaN (excluded trials) is kept as NULL
+                self.connection.executemany(
+                    "INSERT INTO trial_Fn VALUES (?, ?, ?, ?)",
+                    [(session_id, sensor, number + 1, float(Fn_value) if numpy.isfinite(Fn_value) else None)
+                     for number, Fn_value in enumerate(Fn)])
+        return session_id
+
+    def import_export(self, path):
+        #? Index a session exported with data_handling_operations.export_CSV
+        # @returns the session_id
+        df = pandas.read_csv(path, encoding=EXPORT_ENCODING, encoding_errors='replace', dtype=str)
+        def first(column):
+            values = df[column].dropna().tolist() if column in df else []
+            return values[0] if values else None
+        def values(column):
+            return df[column].dropna().tolist() if column in df else []
+        metadata = {key: first(column) for key, column in SESSION_COLUMNS.items()}
+        metadata['participant_sex'] = first(COVARIATE_COLUMNS['sex'])
+        stimulus_ids = values(STIMULUS_COLUMN)
+        # Per trial columns keep their rows, one per stimulus, as in pooled_operations.read_session_export
+        def trial_column(column):
+            cells = df[column].tolist()[:len(stimulus_ids)] if column in df else []
+            return [None if pandas.isna(cell) else cell for cell in cells] + [None] * (len(stimulus_ids) - len(cells))
+        trials = {key: trial_column(column) for key, column in TRIAL_COLUMNS.items()}
+        trials['stimulus_id'] = stimulus_ids
+        trials.update(self.trial_times(path, metadata['started_at'], trials['time_start'], trials['time_end']))
+        rates = {}
+        for line in values(REPORT_COLUMN):
+            match = REPORT_RATE.match(line)
+            if match:
+                rates.setdefault(match.group(1), float(match.group(2)))
+        sensors = {}
+        for sensor, column in FN_COLUMNS.items():
+            if column not in df or df[column].isna().all():
+                continue
+            # The exports don't record ZD (only D and the Fn), so it stays NULL for the sessions imported from them
+            sensors[sensor] = {'samples_per_second': rates.get(sensor), 'D': leading_float(first(D_COLUMNS[sensor])),
+                               'ZD': None,
+                               'Fn': pandas.to_numeric(df[column], errors='coerce').to_numpy(dtype=numpy.float64)[:len(stimulus_ids)]}
+        return self.add_session(os.path.abspath(path), metadata, trials, sensors)
+
+    @staticmethod
+    def trial_times(path, started_at, time_start, time_end):
+        # Times of the start and end of the trials of an export as int64 epoch ms (None where there is no time)
+        # The day is the one of the session start, from the last change of the export (written at the end of the session)
+        texts = [time for pair in zip(time_start, time_end) for time in pair]
+        valid = [time is not None and EXPORT_TIME.match(str(time)) is not None for time in texts]
+        parsed = [str(time) for time, ok in zip(texts, valid) if ok]
+        first = started_at if started_at is not None and EXPORT_TIME.match(str(started_at)) else (parsed or [None])[0]
+        if first is None:
+            return {'time_start': [None] * len(time_start), 'time_end': [None] * len(time_end)}
+        # The session start goes first, so a trial after midnight is taken from the next day
+        timestamps = iter(parse_timestamps([first] + parsed, first_session_day(path, milliseconds_since_midnight([first])[0][0]))[1:].tolist())
+        times = [next(timestamps) if ok else None for ok in valid]
+        return {'time_start': times[0::2], 'time_end': times[1::2]}
+
+    def find_sessions(self, sensor=None, samples_per_second=None, min_trials=None, participant_sex=None):
+        #? Sessions matching all the conditions given, e.g. GSR at 20 Hz with 40 trials or more
+        # @returns list of dicts with the columns of the session (and of the sensor, when one is given)
+        query = "SELECT sessions.*" + (", session_sensors.*" if sensor else "") + " FROM sessions"
+        conditions, parameters = [], []
+        if sensor:
+            query += " JOIN session_sensors USING (session_id)"
+            conditions.append("session_sensors.sensor = ?")
+            parameters.append(sensor)
+            if samples_per_second is not None:
+                conditions.append("session_sensors.samples_per_second = ?")
+                parameters.append(samples_per_second)
+        if min_trials is not None:
+            conditions.append("sessions.num_trials >= ?")
+            parameters.append(min_trials)
+        if participant_sex is not None:
+            conditions.append("sessions.participant_sex = ?")
+            parameters.append(participant_sex)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return [dict(row) for row in self.connection.execute(query + " ORDER BY session_id", parameters)]
+
+    def trial_rows(self, session_ids, sensor):
+        #? Trials of the sessions with the Fn of a sensor, ordered by session and trial
+        # @returns numpy arrays session_id, trial_number, excitatory (bool) and Fn (NaN for the trials without Fn)
+        session_ids = [int(session_id) for session_id in session_ids]
+        rows = self.connection.execute(
+            "SELECT trials.session_id, trials.trial_number, trials.excitatory, trial_Fn.Fn FROM trials"
+            " LEFT JOIN trial_Fn ON trial_Fn.session_id = trials.session_id AND trial_Fn.trial_number = trials.trial_number"
+            " AND trial_Fn.sensor = ?"
+            " WHERE trials.session_id IN (SELECT value FROM json_each(?))"
+            " ORDER BY trials.session_id, trials.trial_number", (sensor, str(session_ids))).fetchall()
+        if not rows:
+            return (numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=bool),
+                    numpy.zeros(0))
+        session_id, trial_number, excitatory, Fn = zip(*rows)
+        return (numpy.array(session_id, dtype=numpy.int64), numpy.array(trial_number, dtype=numpy.int64),
+                numpy.array(excitatory, dtype=bool), numpy.array(Fn, dtype=numpy.float64))
+
+    def pooled_sessions(self, sessions, sensor):
+        #? Sessions from find_sessions as the input of pooled_operations.pooled_analysis
+        session_id, _, excitatory, Fn = self.trial_rows([session['session_id'] for session in sessions], sensor)
+        ids = [session['session_id'] for session in sessions]
+        starts, ends = numpy.searchsorted(session_id, ids, 'left'), numpy.searchsorted(session_id, ids, 'right')
+        pooled = []
+        for number, session in enumerate(sessions):
+            rows = slice(starts[number], ends[number])
+            pooled.append({'name': session['source'], 'stimulus_ids': numpy.where(excitatory[rows], 'E', 'N').tolist(),
+                           'Fn': Fn[rows], 'covariates': {'sex': session['participant_sex'] or ''}})
+        return pooled
+
+    def close(self):
+        self.connection.close()
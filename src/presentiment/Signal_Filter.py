@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from external modules in Pipfile
+import numpy
+
+#? Stateful filters for the physiological channels: every filter keeps its state between calls to process(),
+#? so a signal can be filtered chunk by chunk during the acquisition or at once over a stored array,
+#? with the same result and without a second pass over the data
+
+# Samples per block of the vectorized recursion of SOS_Filter
+BLOCK_SAMPLES = 64
+# Order of the Butterworth filters
+BUTTERWORTH_ORDER = 2
+#? Filters of each kind of sensor, applied in order: (stage, parameter)
+#?  ('lowpass', Hz), ('highpass', Hz) -> Butterworth filters of BUTTERWORTH_ORDER
+#?  ('detrend', seconds)               -> subtracts the mean of the last `seconds` (causal moving mean)
+PHYS_FILTERS = {
+    'skin_conductance': [('lowpass', 1.0), ('detrend', 30)],
+}
+
+
+def butterworth_sos(order, cutoff_hz, samples_per_second, highpass=False):
+    #? Digital Butterworth filter (bilinear transform with pre-warping) as second-order sections
+    # @returns array of sections [b0, b1, b2, 1, a1, a2] (the layout of scipy.signal's sos)
+    fs = float(samples_per_second)
+    warped = 2 * fs * numpy.tan(numpy.pi * cutoff_hz / fs)
+    # Poles of the analog prototype in the left half plane
+    prototype = numpy.exp(1j * numpy.pi * (2 * numpy.arange(order) + order + 1) / (2 * order))
+    analog = warped / prototype if highpass else warped * prototype
+    poles = (2 * fs + analog) / (2 * fs - analog)
+    zero = 1.0 if highpass else -1.0
+    # Frequency at which the gain is 1 (z = -1 for the high-pass, z = 1 for the low-pass)
+    unit = -1.0 if highpass else 1.0
+    sections = []
+    # One section per pair of conjugate poles, the real pole of an odd order gets a first-order section
+    for pole in poles[poles.imag > 1e-12]:
+        a = numpy.array([1.0, -2 * pole.real, abs(pole) ** 2])
+        b = numpy.array([1.0, -2 * zero, 1.0])
+        sections.append(numpy.concatenate([b * numpy.polyval(a, unit) / numpy.polyval(b, unit), a]))
+    for pole in poles[numpy.abs(poles.imag) <= 1e-12]:
+        a = numpy.array([1.0, -pole.real, 0.0])
+        b = numpy.array([1.0, -zero, 0.0])
+        sections.append(numpy.concatenate([b * numpy.polyval(a[:2], unit) / numpy.polyval(b[:2], unit), a]))
+    return numpy.array(sections)
+
+
+class SOS_Filter():
+    #? IIR filter of second-order sections with state, vectorized in blocks of BLOCK_SAMPLES
+    #? Each section is a linear system z[n+1] = A z[n] + B x[n], y[n] = C z[n] + D x[n] (direct form II transposed);
+    #? the zero-state output of all the blocks is one matrix product and only the 2 state values are carried
+    #? from block to block, so the Python loop runs once per block instead of once per sample
+    def __init__(self, sos, name=""):
+        self.sos = numpy.atleast_2d(numpy.asarray(sos, dtype=numpy.float64))
+        self.name = name
+        self.sections = [self.block_matrices(section) for section in self.sos]
+        self.reset()
+
+    def reset(self):
+        # Zero state: the first chunk starts as if the signal had been 0 before it
+        self.states = [numpy.zeros(2) for _ in self.sections]
+        self.started = False
+
+    @staticmethod
+    def block_matrices(section):
+        b0, b1, b2, _, a1, a2 = section
+        A = numpy.array([[-a1, 1.0], [-a2, 0.0]])
+        B = numpy.array([b1 - a1 * b0, b2 - a2 * b0])
+        # powers[j] = A^j
+        powers = [numpy.eye(2)]
+        for _ in range(BLOCK_SAMPLES):
+            powers.append(A @ powers[-1])
+        powers = numpy.array(powers)
+        # Impulse response h[0] = D, h[m] = C A^(m-1) B, as a lower triangular Toeplitz matrix
+        impulse = numpy.concatenate([[b0], (powers[:BLOCK_SAMPLES - 1] @ B)[:, 0]])
+        lags = numpy.arange(BLOCK_SAMPLES)[:, None] - numpy.arange(BLOCK_SAMPLES)[None, :]
+        T = numpy.where(lags >= 0, impulse[numpy.clip(lags, 0, None)], 0.0)
+        # Output of the initial state (rows C A^j) and state at the end of the block
+        O = powers[:BLOCK_SAMPLES, 0, :]
+        E = (powers[BLOCK_SAMPLES - 1::-1] @ B).T
+        return section, A, B, T, O, E, powers[BLOCK_SAMPLES]
+
+    def process(self, values):
+        #? Filter the next chunk of the signal
+        # @returns the filtered chunk (float64)
+        values = numpy.asarray(values, dtype=numpy.float64)
+        if len(values) > 0 and not self.started:
+            # Start from the steady state of the first value, so the output doesn't ramp up from 0
+            self.started = True
+            level = values[0]
+            for number, (section, A, B, T, O, E, A_block) in enumerate(self.sections):
+                # Steady state for a constant input: z = A z + B x
+                self.states[number] = numpy.linalg.solve(numpy.eye(2) - A, B * level)
+                level *= section[:3].sum() / section[3:].sum()
+        for number, (section, A, B, T, O, E, A_block) in enumerate(self.sections):
+            values, self.states[number] = self.process_section(values, self.states[number], section, A, B, T, O, E, A_block)
+        return values
+
+    @staticmethod
+    def process_section(x, state, section, A, B, T, O, E, A_block):
+        blocks = len(x) // BLOCK_SAMPLES
+        y = numpy.empty(len(x))
+        if blocks > 0:
+            X = x[:blocks * BLOCK_SAMPLES].reshape(blocks, BLOCK_SAMPLES)
+            # Zero-state outputs and end states of every block at once
+            Y = X @ T.T
+            ends = X @ E.T
+            starts = numpy.empty((blocks, 2))
+            for block in range(blocks):
+                starts[block] = state
+                state = A_block @ state + ends[block]
+            y[:blocks * BLOCK_SAMPLES] = (Y + starts @ O.T).ravel()
+        # Samples after the last whole block, one by one
+        b0, b1, b2, _, a1, a2 = section
+        for position in range(blocks * BLOCK_SAMPLES, len(x)):
+            y[position] = b0 * x[position] + state[0]
+            state = numpy.array([b1 * x[position] - a1 * y[position] + state[1], b2 * x[position] - a2 * y[position]])
+        return y, state
+
+
+class Moving_Mean_Detrend():
+    #? Causal detrend: subtracts from every sample the mean of the last `width` samples (itself included)
+    #? The last width - 1 samples are kept between chunks
+    def __init__(self, width, name=""):
+        self.width = max(int(width), 1)
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.tail = numpy.zeros(0)
+
+    def process(self, values):
+        values = numpy.asarray(values, dtype=numpy.float64)
+        joined = numpy.concatenate([self.tail, values])
+        sums = numpy.concatenate([[0.0], numpy.cumsum(joined)])
+        positions = numpy.arange(len(self.tail), len(joined))
+        low = numpy.maximum(positions + 1 - self.width, 0)
+        means = (sums[positions + 1] - sums[low]) / (positions + 1 - low)
+        self.tail = joined[-(self.width - 1):] if self.width > 1 else numpy.zeros(0)
+        return values - means
+
+
+class Filter_Pipeline():
+    #? Filters applied one after another; `parameters` describes every stage (it goes to the export)
+    def __init__(self, stages, parameters):
+        self.stages = stages
+        self.parameters = parameters
+
+    def process(self, values):
+        for stage in self.stages:
+            values = stage.process(values)
+        return values
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+
+def create_filter_pipeline(filters, samples_per_second):
+    #? Pipeline for a list of (stage, parameter) (see PHYS_FILTERS) at `samples_per_second`
+    #? A Butterworth cutoff at or above the Nyquist frequency can't be designed, that stage is skipped
+    stages, parameters = [], []
+    nyquist = samples_per_second / 2
+    for stage, parameter in filters or []:
+        if stage in ('lowpass', 'highpass'):
+            description = stage + " Butterworth order " + str(BUTTERWORTH_ORDER) + " at " + str(parameter) + " Hz"
+            if parameter >= nyquist:
+                parameters.append(description + " (skipped, Nyquist " + str(nyquist) + " Hz)")
+                continue
+            stages.append(SOS_Filter(butterworth_sos(BUTTERWORTH_ORDER, parameter, samples_per_second, stage == 'highpass'),
+                                     description))
+        elif stage == 'detrend':
+            description = "detrend with the moving mean of " + str(parameter) + " s"
+            stages.append(Moving_Mean_Detrend(round(parameter * samples_per_second), description))
+        else:
+            raise ValueError("Unknown filter stage: " + str(stage))
+        parameters.append(description)
+    return Filter_Pipeline(stages, [item + " (" + str(samples_per_second) + " samples/s)" for item in parameters])
@@ -22,4 +22,25 @@ from .Neulog import *
 from .Pseudo_RNG import *
 from .PsyREG import *
 from .data_handling_operations import *
-from .presentiment_operations import *
\ No newline at end of file
+from .presentiment_operations import *
+from .analysis_operations import *
+from .Min_Max_Index import *
+from .Sample_Buffer import *
+from .Neulog_Acquisition import *
+from .PsyREG_Pool import *
+from .RNG_Monitor import *
+from .OS_RNG import *
+from .Sensor_Backend import *
+from .Clock_Sync import *
+from .quality_operations import *
+from .Signal_Filter import *
+from .Pulse_Detector import *
+from .sequential_operations import *
+from .chunk_operations import *
+from .trial_operations import *
+from .power_operations import *
+from .bootstrap_operations import *
+from .pooled_operations import *
+from .Session_Index import *
+from .legacy_operations import *
+from .Session_Container import *
\ No newline at end of file
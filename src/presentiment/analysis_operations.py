@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+#? Includes from built in Python
+import time
+
+#? Includes from external modules in Pipfile
+import numpy
+
+#? Includes from this project
+from .quality_operations import quality_flags, quality_counts, bad_samples, excluded_trials, quality_report, POLICY_EXCLUDE
+from .Signal_Filter import create_filter_pipeline
+from .Pulse_Detector import Pulse_Detector
+from .bootstrap_operations import bootstrap_D_Z, closed_form_Z
+from .trial_operations import analysed_trials
+
+#? Session-end analysis pipeline (validation, resampling to a common grid, filters, trial IDs, media/sd/Z/f/Fn and D/ZD).
+#? Every function works on NumPy arrays and has no Qt dependency, so it can run on a worker thread.
+
+# Number of permutations evaluated per batch when building the D' distribution
+SHUFFLE_BATCH = 500
+# Number of times analyse_sensor calls on_stage
+ANALYSIS_STAGES = 4
+# Milliseconds in a day
+DAY_MS = 86400000
+#? Baselines of the presentiment timeframe used to normalize each trial (media and sd)
+#?  BASELINE_MEAN    -> mean and sd
+#?  BASELINE_MEDIAN  -> median and MAD (scaled by MAD_SCALE)
+#?  BASELINE_TRIMMED -> mean without the TRIM_FRACTION lowest and highest values and the winsorized sd
+BASELINE_MEAN = 'mean'
+BASELINE_MEDIAN = 'median'
+BASELINE_TRIMMED = 'trimmed'
+TRIM_FRACTION = 0.1
+# The MAD of a normal distribution times MAD_SCALE is its sd
+MAD_SCALE = 1.4826
+# Samples per second of the grid of the heart rate obtained from the beats of a pulse waveform (about one beat per
+# second, so the rate of the waveform would only oversample it)
+BEAT_GRID_RATE = 10
+
+def local_offset_ms(timestamps):
+    # Offset of the local time zone (ms) at int64 epoch ms timestamps; it only changes with daylight saving time,
+    # so it is looked up for every timestamp only when the first and the last one have different offsets
+    seconds = numpy.asarray(timestamps, dtype=numpy.int64) // 1000
+    if len(seconds) == 0:
+        return numpy.int64(0)
+    first = time.localtime(int(seconds.min())).tm_gmtoff
+    if first == time.localtime(int(seconds.max())).tm_gmtoff:
+        return numpy.int64(first * 1000)
+    return numpy.array([time.localtime(int(second)).tm_gmtoff for second in seconds], dtype=numpy.int64) * 1000
+
+def parse_timestamps(list_timestamps, day=None):
+    #? Convert local '%H:%M:%S.%f' strings to int64 epoch milliseconds
+    # day: epoch ms of any moment of the day of the first timestamp (today by default); a time earlier than the
+    # one before it is taken from the next day, so a session that crosses midnight keeps its order
+    if len(list_timestamps) == 0:
+        return numpy.zeros(0, dtype=numpy.int64)
+    iso = numpy.array(['1970-01-01T' + str(t) for t in list_timestamps], dtype='datetime64[ms]')
+    return timestamps_of_day(iso.astype(numpy.int64), day)
+
+def timestamps_of_day(since_midnight, day=None):
+    # Local milliseconds since midnight to int64 epoch milliseconds, with the same rules as parse_timestamps
+    since_midnight = numpy.array(since_midnight, dtype=numpy.int64)
+    if len(since_midnight) == 0:
+        return since_midnight
+    since_midnight[1:] += numpy.cumsum(numpy.diff(since_midnight) < 0) * DAY_MS
+    day = now_timestamp() if day is None else numpy.int64(day)
+    local_day = day + local_offset_ms([day])
+    local = local_day - local_day % DAY_MS + since_midnight
+    return local - local_offset_ms(local - local_offset_ms([day]))
+
+def now_timestamp():
+    # Current time as int64 epoch milliseconds
+    return numpy.int64(time.time_ns() // 1000000)
+
+def format_timestamps(timestamps):
+    # Convert int64 epoch milliseconds to local '%H:%M:%S.%f'[:-3] strings
+    timestamps = numpy.asarray(timestamps, dtype=numpy.int64)
+    iso = numpy.datetime_as_string((timestamps + local_offset_ms(timestamps)).astype('datetime64[ms]'))
+    return [t[11:] for t in iso]
+
+def analysis_grid(t_first, t_last, samples_per_second):
+    # Timestamps (int64 ms) of a uniform grid of `samples_per_second` from the first trial to the end of the session
+    period_ms = 1000 / samples_per_second
+    count = int((t_last - t_first) // period_ms) + 1 if t_last >= t_first else 0
+    return numpy.int64(t_first) + numpy.round(numpy.arange(count) * period_ms).astype(numpy.int64)
+
+def sensor_session(session, samples_per_second):
+    #? The session on a grid of `samples_per_second` when the sensor is slower than the grid of the session, so a slow
+    #? sensor isn't interpolated up to the rate of the fastest one; the presentiment timeframe keeps its seconds
+    rate = session['samples_per_second']
+    if samples_per_second >= rate or len(session['grid']) == 0:
+        return session
+    own = dict(session)
+    own['grid'] = analysis_grid(session['grid'][0], session['grid'][-1], samples_per_second)
+    own['samples_per_second'] = samples_per_second
+    own['presentiment_instances'] = max(int(round(session['presentiment_instances'] * samples_per_second / rate)), 1)
+    return own
+
+def moving_average(values, width):
+    # Centered mean of `width` samples computed from cumulative sums, so it costs the same for any width
+    width = int(width)
+    if width <= 1 or len(values) == 0:
+        return values
+    sums = numpy.concatenate([[0.0], numpy.cumsum(values)])
+    positions = numpy.arange(len(values))
+    low = numpy.clip(positions - width // 2, 0, len(values))
+    high = numpy.clip(positions - width // 2 + width, 0, len(values))
+    return (sums[high] - sums[low]) / (high - low)
+
+def resample_to_grid(timestamps, values, grid, samples_per_second):
+    #? Map the samples of one sensor to the analysis grid
+    #? Samples recorded faster than `samples_per_second` are averaged over one period of that rate first (anti-aliasing),
+    #? then they are linearly interpolated at the grid timestamps; gaps between segments are interpolated too
+    # @returns the values at the grid timestamps (NaN if the sensor has no samples)
+    if len(timestamps) == 0:
+        return numpy.full(len(grid), numpy.nan)
+    if len(timestamps) > 1:
+        recorded_ms = numpy.median(numpy.diff(timestamps))
+        if recorded_ms > 0:
+            values = moving_average(values, round(1000 / samples_per_second / recorded_ms))
+    return numpy.interp(grid, timestamps, values)
+
+def create_phys_ids(trial_start, trial_end, timestamps):
+    #? Assign each sample to the trial whose end comes right after it
+    # @returns trial index (0-based, -1 if the sample is outside every trial) and instance ID (1-based, 0 if outside)
+    trial_index = numpy.searchsorted(trial_end, timestamps, side='right')
+    valid = trial_index < len(trial_end)
+    if len(trial_start) > 0:
+        valid &= timestamps >= trial_start[0]
+    trial_index[~valid] = -1
+    instance_ids = numpy.zeros(len(timestamps), dtype=numpy.int64)
+    if valid.any():
+        positions = numpy.flatnonzero(valid)
+        # First position of each trial, the samples are ordered so each trial is a contiguous block
+        trials, first = numpy.unique(trial_index[positions], return_index=True)
+        first_position = numpy.zeros(len(trial_end), dtype=numpy.int64)
+        first_position[trials] = positions[first]
+        instance_ids[positions] = positions - first_position[trial_index[positions]] + 1
+    return trial_index, instance_ids
+
+def window_matrix(presentiment_instances, num_trials, tid, instances, vals):
+    #? Trials x presentiment timeframe matrix; missing (or not finite) samples are +inf, so they go last in a partition
+    # @returns the matrix and the number of samples of each trial
+    matrix = numpy.full((num_trials, presentiment_instances), numpy.inf)
+    finite = numpy.isfinite(vals)
+    matrix[tid[finite], instances[finite] - 1] = vals[finite]
+    return matrix, numpy.bincount(tid[finite], minlength=num_trials)
+
+def partition_rows(matrix, ranks):
+    # Partition every row around the ranks in `ranks` (one rank per row, or several arrays of them) in one call
+    ranks = numpy.clip(numpy.concatenate([numpy.ravel(rank) for rank in ranks]), 0, max(matrix.shape[1] - 1, 0))
+    return numpy.partition(matrix, numpy.unique(ranks), axis=1) if matrix.size > 0 else matrix
+
+def median_rows(matrix, counts):
+    # Median of the first `counts` values (the finite ones) of every row, with numpy.partition instead of sorting
+    rows = numpy.arange(len(counts))
+    low, high = numpy.maximum((counts - 1) // 2, 0), numpy.maximum(counts // 2, 0)
+    partitioned = partition_rows(matrix, [low, high])
+    high = numpy.minimum(high, max(matrix.shape[1] - 1, 0))
+    with numpy.errstate(invalid='ignore'):
+        return numpy.where(counts > 0, (partitioned[rows, low] + partitioned[rows, high]) / 2, numpy.nan)
+
+def robust_media_sd(matrix, counts, baseline):
+    #? Media and sd of every trial for the robust baselines, computed for all the trials at once
+    rows = numpy.arange(len(counts))
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        if baseline == BASELINE_MEDIAN:
+            media = median_rows(matrix, counts)
+            sd = MAD_SCALE * median_rows(numpy.abs(matrix - media[:, None]), counts)
+        elif baseline == BASELINE_TRIMMED:
+            cut = numpy.floor(TRIM_FRACTION * counts).astype(numpy.int64)
+            low, high = cut, numpy.maximum(counts - cut - 1, 0)
+            # After partitioning around low, high and the last finite value, the ranks low..high are in between
+            partitioned = partition_rows(matrix, [low, high, numpy.maximum(counts - 1, 0)])
+            columns = numpy.arange(matrix.shape[1])[None, :]
+            inside = (columns >= low[:, None]) & (columns <= high[:, None])
+            media = numpy.where(inside, partitioned, 0).sum(axis=1) / (counts - 2 * cut)
+            # Winsorized sd: the cut values take the value of the lowest and highest values kept
+            finite = numpy.isfinite(partitioned)
+            winsorized = numpy.clip(partitioned, partitioned[rows, low][:, None], partitioned[rows, high][:, None])
+            winsorized_mean = numpy.where(finite, winsorized, 0).sum(axis=1) / counts
+            sd = numpy.sqrt(numpy.where(finite, (winsorized - winsorized_mean[:, None]) ** 2, 0).sum(axis=1) / (counts - 1))
+        else:
+            raise ValueError("Unknown baseline: " + str(baseline))
+    media[counts == 0] = numpy.nan
+    return media, sd
+
+def calculate_media_sd_Z_f_Fn(presentiment_instances, num_trials, values, trial_index, instance_ids, baseline=BASELINE_MEAN):
+    #? Media and sd come from the presentiment timeframe (first instances of each trial), Z and f are given for every instance
+    # baseline: one of the BASELINE_* modes
+    # @returns per-sample media, sd, Z and f (NaN outside trials) and Fn per trial
+    valid = trial_index >= 0
+    tid = trial_index[valid]
+    vals = values[valid]
+    pre = instance_ids[valid] <= presentiment_instances
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        if baseline == BASELINE_MEAN:
+            n_pre = numpy.bincount(tid[pre], minlength=num_trials)
+            media = numpy.bincount(tid[pre], weights=vals[pre], minlength=num_trials) / n_pre
+            deviation = vals[pre] - media[tid[pre]]
+            sd = numpy.sqrt(numpy.bincount(tid[pre], weights=deviation ** 2, minlength=num_trials) / (n_pre - 1))
+        else:
+            matrix, counts = window_matrix(presentiment_instances, num_trials, tid[pre], instance_ids[valid][pre], vals[pre])
+            media, sd = robust_media_sd(matrix, counts, baseline)
+        Z = (vals - media[tid]) / sd[tid]
+    # Z0 is the Z of the first instance of each trial
+    first = instance_ids[valid] == 1
+    Z0 = numpy.full(num_trials, numpy.nan)
+    Z0[tid[first]] = Z[first]
+    f = Z - Z0[tid]
+    Fn = numpy.bincount(tid[pre], weights=f[pre], minlength=num_trials)
+    # Expand back to one row per sample
+    per_sample = []
+    for trial_values in (media[tid], sd[tid], Z, f):
+        column = numpy.full(len(values), numpy.nan)
+        column[valid] = trial_values
+        per_sample.append(column)
+    return per_sample[0], per_sample[1], per_sample[2], per_sample[3], Fn
+
+def calculate_D_Z(stimulus_ids, trial_Fn, shuffles=5000, cancel_event=None):
+    #? D = Σ FnE - Σ FnN; ZD compares D against the D' obtained by shuffling the Fn values
+    #? Trials without a finite Fn (excluded by the validation) are left out
+    # @returns D and ZD, or None if cancel_event was set in between batches
+    trial_Fn, is_neutral = analysed_trials(stimulus_ids, trial_Fn)
+    E_stimuli = int((~is_neutral).sum())
+    calc_D = trial_Fn[~is_neutral].sum() - trial_Fn[is_neutral].sum()
+    total = trial_Fn.sum()
+    # Shuffle the Fn values in batches of permutations to generate D' to make a normal distribution
+    list_D_prime = []
+    remaining = shuffles
+    while remaining > 0:
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        batch = min(SHUFFLE_BATCH, remaining)
+        permutations = numpy.argsort(numpy.random.random((batch, len(trial_Fn))), axis=1)
+        sum_E_prime = trial_Fn[permutations[:, :E_stimuli]].sum(axis=1)
+        list_D_prime.append(2 * sum_E_prime - total)
+        remaining -= batch
+    list_D_prime = numpy.concatenate(list_D_prime) if list_D_prime else numpy.zeros(0)
+    calc_D_prime_media = numpy.mean(list_D_prime)
+    calc_D_prime_sd = numpy.std(list_D_prime)
+    calc_z = (calc_D - calc_D_prime_media) / calc_D_prime_sd
+    return float(calc_D), float(calc_z)
+
+def closed_form_D_Z(stimulus_ids, trial_Fn):
+    #? D and ZD with the exact mean and sd of D' over all the permutations, instead of shuffling
+    #? D' = 2 Σ FnE' - Σ Fn, where Σ FnE' is the sum of E_stimuli Fn values drawn without replacement
+    # @returns D and ZD, the ZD that calculate_D_Z approaches as the number of shuffles grows
+    trial_Fn, is_neutral = analysed_trials(stimulus_ids, trial_Fn)
+    n, E_stimuli = len(trial_Fn), int((~is_neutral).sum())
+    calc_D = trial_Fn[~is_neutral].sum() - trial_Fn[is_neutral].sum()
+    total = trial_Fn.sum()
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        sum_squares = ((trial_Fn - total / n) ** 2).sum()
+    return float(calc_D), float(closed_form_Z(calc_D, total, sum_squares, n, E_stimuli))
+
+def analyse_sensor(values, timestamps, samples_per_second, session, cancel_event=None, on_stage=None, value_range=None,
+                   filters=None, pulse_wave=False):
+    #? Run the whole session-end pipeline for one sensor
+    # samples_per_second: sample rate selected for the sensor, it may have been recorded faster (see resample_to_grid);
+    #  the sensor is analysed on a grid at this rate (see sensor_session)
+    # session: dict with grid, samples_per_second (rate of the grid, the fastest sensor), trial_start, trial_end (int64 ms), stimulus_ids,
+    #  presentiment_instances, shuffles (0 for the closed-form null), quality_policy (see quality_operations), baseline
+    #  (BASELINE_*) and optionally bootstrap (resamples of the intervals of D and ZD) and bootstrap_seed
+    # value_range: (low, high) valid values of the sensor for the validation
+    # filters: list of (stage, parameter) applied to the grid before the statistics (see Signal_Filter.PHYS_FILTERS)
+    # pulse_wave: True if the values are the pulse waveform, the heart rate at every beat is analysed instead
+    # on_stage: called after each of the ANALYSIS_STAGES stages (from the thread running the analysis)
+    # @returns dict with the results, or None if cancel_event was set
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+    def stage_done():
+        if on_stage is not None:
+            on_stage()
+    values = numpy.asarray(values, dtype=numpy.float64)
+    timestamps = numpy.asarray(timestamps, dtype=numpy.int64)
+    policy = session.get('quality_policy', POLICY_EXCLUDE)
+    # Every sensor is analysed on a grid at its own rate
+    session = sensor_session(session, min(samples_per_second, BEAT_GRID_RATE) if pulse_wave else samples_per_second)
+    if pulse_wave:
+        # Beats and inter-beat intervals in one pass; the heart rate of each beat goes on like any other sensor
+        timestamps, values = Pulse_Detector().process(timestamps, values)
+    # & VALIDATE AND RESAMPLE TO THE ANALYSIS GRID (FROM THE FIRST TRIAL TO THE END OF THE SESSION)
+    # Bad samples are dropped and interpolated over; the grid samples next to them or inside a gap are marked as bad
+    flags, _ = quality_flags(timestamps, values, value_range)
+    keep = ~bad_samples(flags)
+    grid = session['grid']
+    grid_bad = numpy.interp(grid, timestamps, (flags != 0).astype(numpy.float64)) > 0 if len(timestamps) > 0 \
+        else numpy.ones(len(grid), dtype=bool)
+    values = resample_to_grid(timestamps[keep], values[keep], grid, session['samples_per_second'])
+    num_samples = len(timestamps)
+    timestamps = grid
+    # Filters in one pass over the grid; the same pipeline can filter chunks during the acquisition
+    pipeline = create_filter_pipeline(filters, session['samples_per_second'])
+    values = pipeline.process(values)
+    stage_done()
+    if cancelled():
+        return None
+    # & ADD TRIAL ID
+    trial_index, instance_ids = create_phys_ids(session['trial_start'], session['trial_end'], timestamps)
+    stage_done()
+    if cancelled():
+        return None
+    # & CALCULATE MEDIA, SD, Z, f and Fn
+    num_trials = len(session['trial_end'])
+    media, sd, Z, f, Fn = calculate_media_sd_Z_f_Fn(
+        session['presentiment_instances'], num_trials, values, trial_index, instance_ids,
+        session.get('baseline', BASELINE_MEAN))
+    # Excluded trials have no Fn, Z nor f
+    excluded = excluded_trials(grid_bad, Fn, trial_index, instance_ids, session['presentiment_instances'], policy)
+    if excluded.any():
+        Fn[excluded] = numpy.nan
+        in_excluded = (trial_index >= 0) & excluded[trial_index]
+        Z[in_excluded] = numpy.nan
+        f[in_excluded] = numpy.nan
+    stage_done()
+    if cancelled():
+        return None
+    # & CALCULATE D AND ZD
+    # Without shuffles (e.g. the interim analyses of a sequential session) the null comes in closed form
+    if session['shuffles'] > 0:
+        D_Z = calculate_D_Z(session['stimulus_ids'], Fn, session['shuffles'], cancel_event)
+    else:
+        D_Z = closed_form_D_Z(session['stimulus_ids'], Fn)
+    # Bootstrap intervals of D and ZD, when the session asks for resamples
+    intervals = None
+    if session.get('bootstrap', 0) > 0:
+        intervals = bootstrap_D_Z(session['stimulus_ids'], Fn, session['bootstrap'], seed=session.get('bootstrap_seed'),
+                                  cancel_event=cancel_event)
+        if intervals is None:
+            return None
+    if D_Z is None:
+        return None
+    stage_done()
+    return {
+        'values': values,
+        'timestamps': timestamps,
+        'trial_index': trial_index,
+        'instance_ids': instance_ids,
+        'media': media,
+        'sd': sd,
+        'Z': Z,
+        'f': f,
+        'Fn': Fn,
+        'D': D_Z[0],
+        'ZD': D_Z[1],
+        'excluded': excluded,
+        'quality': quality_report(quality_counts(flags), num_samples, excluded, policy),
+        'filters': pipeline.parameters,
+        'baseline': session.get('baseline', BASELINE_MEAN),
+        'intervals': intervals,
+        'samples_per_second': session['samples_per_second'],
+    }
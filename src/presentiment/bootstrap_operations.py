@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from external modules in Pipfile
+import numpy
+
+#? Includes from this project
+from .sequential_operations import normal_cdf, normal_quantile
+from .chunk_operations import chunk_seeds, run_chunks
+from .trial_operations import analysed_trials
+
+#? Bootstrap confidence intervals of D and ZD
+#? Trials are resampled with replacement within each kind of stimulus (the numbers of E and N trials are kept);
+#? each batch of resamples is a resamples x trials index matrix, and D and ZD (with the closed-form null) of all of
+#? them come from vectorized sums. Resamples are drawn in seeded chunks (see chunk_operations)
+
+BOOTSTRAP_RESAMPLES = 2000
+BOOTSTRAP_CONFIDENCE = 0.95
+# Resamples drawn at once
+BOOTSTRAP_BATCH = 1000
+# Resamples of each chunk (the unit of the seeds and of the work sent to the process pool)
+BOOTSTRAP_CHUNK = 10000
+# From this number of resamples the chunks are spread over a process pool
+PARALLEL_RESAMPLES = 50000
+
+def closed_form_Z(calc_D, total, sum_squares, n, E_stimuli):
+    # ZD from D, Σ Fn and Σ (Fn - mean)² of n trials with E_stimuli excitatory ones (also for arrays of resamples)
+    # The null is the exact mean and sd of D' over all the permutations (see analysis_operations.closed_form_D_Z)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        calc_D_prime_media = (2 * E_stimuli / n - 1) * total
+        # Variance of a sum drawn without replacement from a finite population
+        calc_D_prime_sd = 2 * numpy.sqrt(E_stimuli * (n - E_stimuli) / (n * (n - 1)) * sum_squares)
+        return (calc_D - calc_D_prime_media) / calc_D_prime_sd
+
+def split_trials(stimulus_ids, trial_Fn):
+    # Fn of the E and N trials with a finite Fn
+    trial_Fn, is_neutral = analysed_trials(stimulus_ids, trial_Fn)
+    return trial_Fn[~is_neutral], trial_Fn[is_neutral]
+
+def bootstrap_chunk(Fn_E, Fn_N, resamples, seed):
+    #? D and ZD of `resamples` resamples (runs in this process or in a worker process)
+    generator = numpy.random.default_rng(seed)
+    n, E_stimuli = len(Fn_E) + len(Fn_N), len(Fn_E)
+    D, ZD = [], []
+    for first in range(0, resamples, BOOTSTRAP_BATCH):
+        size = min(BOOTSTRAP_BATCH, resamples - first)
+        E = Fn_E[generator.integers(0, len(Fn_E), (size, len(Fn_E)))]
+        N = Fn_N[generator.integers(0, len(Fn_N), (size, len(Fn_N)))]
+        sum_E, sum_N = E.sum(axis=1), N.sum(axis=1)
+        total = sum_E + sum_N
+        sum_squares = (E ** 2).sum(axis=1) + (N ** 2).sum(axis=1) - total ** 2 / n
+        D.append(sum_E - sum_N)
+        ZD.append(closed_form_Z(sum_E - sum_N, total, numpy.maximum(sum_squares, 0), n, E_stimuli))
+    return numpy.concatenate(D), numpy.concatenate(ZD)
+
+def jackknife_D_Z(Fn_E, Fn_N):
+    # D and ZD leaving out each trial in turn (for the acceleration of BCa), E trials first
+    values = numpy.concatenate([Fn_E, Fn_N])
+    sign = numpy.concatenate([numpy.ones(len(Fn_E)), -numpy.ones(len(Fn_N))])
+    n, E_stimuli = len(values), len(Fn_E)
+    D = (sign * values).sum() - sign * values
+    total = values.sum() - values
+    sum_squares = (values ** 2).sum() - values ** 2 - total ** 2 / (n - 1)
+    return D, closed_form_Z(D, total, numpy.maximum(sum_squares, 0), n - 1, E_stimuli - (sign > 0))
+
+def percentile_interval(replicates, confidence=BOOTSTRAP_CONFIDENCE):
+    replicates = replicates[numpy.isfinite(replicates)]
+    if len(replicates) == 0:
+        return float('nan'), float('nan')
+    low, high = numpy.quantile(replicates, [(1 - confidence) / 2, (1 + confidence) / 2])
+    return float(low), float(high)
+
+def bca_interval(replicates, estimate, jackknife, strata, confidence=BOOTSTRAP_CONFIDENCE):
+    #? Bias-corrected and accelerated interval: the percentiles are moved by the bias of the replicates against the
+    #? estimate and by the skewness of the jackknife values
+    # strata: stratum of each jackknife value; trials are resampled within their stratum, so the deviations of the
+    #  jackknife values are taken from the mean of their stratum
+    finite = numpy.isfinite(jackknife)
+    replicates = replicates[numpy.isfinite(replicates)]
+    jackknife, strata = jackknife[finite], strata[finite]
+    if len(replicates) == 0 or len(jackknife) == 0 or not numpy.isfinite(estimate):
+        return float('nan'), float('nan')
+    below = min(max((replicates < estimate).mean(), 1 / len(replicates)), 1 - 1 / len(replicates))
+    bias = normal_quantile(below)
+    stratum_means = numpy.bincount(strata, weights=jackknife) / numpy.maximum(numpy.bincount(strata), 1)
+    deviation = stratum_means[strata] - jackknife
+    spread = (deviation ** 2).sum()
+    acceleration = (deviation ** 3).sum() / (6 * spread ** 1.5) if spread > 0 else 0.0
+    levels = []
+    for tail in ((1 - confidence) / 2, (1 + confidence) / 2):
+        z = normal_quantile(tail)
+        levels.append(float(normal_cdf(bias + (bias + z) / (1 - acceleration * (bias + z)))))
+    low, high = numpy.quantile(replicates, levels)
+    return float(low), float(high)
+
+def bootstrap_D_Z(stimulus_ids, trial_Fn, resamples=BOOTSTRAP_RESAMPLES, confidence=BOOTSTRAP_CONFIDENCE, seed=None,
+                  workers=None, cancel_event=None):
+    #? Percentile and BCa intervals of D and ZD (ZD with the closed-form null)
+    # seed: int for reproducible intervals, None for a random one
+    # @returns dict {'D': {'percentile': (low, high), 'bca': (low, high)}, 'ZD': {...}}, or None if cancel_event was set
+    Fn_E, Fn_N = split_trials(stimulus_ids, trial_Fn)
+    empty = {'percentile': (float('nan'), float('nan')), 'bca': (float('nan'), float('nan'))}
+    if len(Fn_E) < 2 or len(Fn_N) < 2 or resamples <= 0:
+        return {'D': dict(empty), 'ZD': dict(empty)}
+    calls = [(Fn_E, Fn_N, size, chunk_seed)
+             for size, chunk_seed in chunk_seeds(resamples, BOOTSTRAP_CHUNK, numpy.random.SeedSequence(seed))]
+    chunks = run_chunks(bootstrap_chunk, calls, resamples >= PARALLEL_RESAMPLES, workers, cancel_event)
+    if chunks is None:
+        return None
+    D = numpy.concatenate([chunk[0] for chunk in chunks])
+    ZD = numpy.concatenate([chunk[1] for chunk in chunks])
+    jackknife_D, jackknife_ZD = jackknife_D_Z(Fn_E, Fn_N)
+    values = numpy.concatenate([Fn_E, Fn_N])
+    estimate_D = Fn_E.sum() - Fn_N.sum()
+    estimate_ZD = closed_form_Z(estimate_D, values.sum(), ((values - values.mean()) ** 2).sum(), len(values), len(Fn_E))
+    strata = numpy.concatenate([numpy.zeros(len(Fn_E), dtype=numpy.int64), numpy.ones(len(Fn_N), dtype=numpy.int64)])
+    return {'D': {'percentile': percentile_interval(D, confidence),
+                  'bca': bca_interval(D, estimate_D, jackknife_D, strata, confidence)},
+            'ZD': {'percentile': percentile_interval(ZD, confidence),
+                   'bca': bca_interval(ZD, estimate_ZD, jackknife_ZD, strata, confidence)}}
+
+def bootstrap_report(intervals, resamples, confidence=BOOTSTRAP_CONFIDENCE, seed=None):
+    # Lines of the report of the intervals
+    lines = ["bootstrap: " + str(resamples) + " resamples within E and N trials"
+             + (" (seed " + str(seed) + ")" if seed is not None else "")]
+    for statistic in ('D', 'ZD'):
+        for method in ('percentile', 'bca'):
+            low, high = intervals[statistic][method]
+            lines.append(statistic + " " + str(round(confidence * 100, 1)) + "% " + ('BCa' if method == 'bca' else method)
+                         + " interval: [" + str(round(low, 4)) + ", " + str(round(high, 4)) + "]")
+    return lines
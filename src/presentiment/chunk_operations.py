@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from built in Python
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+#? Includes from external modules in Pipfile
+import numpy
+
+#? Work split in chunks with their own seed, for the resampling analyses (power, bootstrap, pooled permutations)
+#? The seeds of the chunks are spawned from one SeedSequence, so a given seed gives the same results whether the
+#? chunks run in this process or in a process pool. The pool spawns its workers instead of forking them, as the GUI
+#? process may have threads running
+
+def chunk_seeds(total, chunk, seed_sequence):
+    # Size and seed of each chunk of `total` items in chunks of `chunk`
+    sizes = [min(chunk, total - first) for first in range(0, total, chunk)]
+    return list(zip(sizes, seed_sequence.spawn(len(sizes))))
+
+def run_chunks(function, calls, parallel=False, workers=None, cancel_event=None):
+    #? Run `function(*arguments)` for the arguments of every call, in a process pool if parallel
+    # @returns list of the results in the order of the calls, or None if cancel_event was set in between chunks
+    if not parallel:
+        results = []
+        for arguments in calls:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            results.append(function(*arguments))
+        return results
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(function, *arguments) for arguments in calls]
+        results = []
+        for future in futures:
+            if cancel_event is not None and cancel_event.is_set():
+                for pending in futures:
+                    pending.cancel()
+                return None
+            results.append(future.result())
+        return results
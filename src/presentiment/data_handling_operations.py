@@ -20,75 +20,31 @@ limitations under the License.
 
 import pandas
 
-# ? Both functions take plain text and transform it to lists, maybe is better to just take lists directly
+# ? Both functions take the columns directly as lists or NumPy arrays; empty cells can be given as NaN or empty strings
 
 def export_CSV_phys(
-        str_session_id,
-        str_phys_trial_id,
-        str_phys_instance_id,
-        str_skin_conductance_values,
-        str_skin_conductance_timestamp,
-        str_skin_conductance_media,
-        str_skin_conductance_sd,
-        str_skin_conductance_Z,
-        str_skin_conductance_f,
-        str_heart_rate_values,
-        str_heart_rate_timestamp,
-        str_heart_rate_media,
-        str_heart_rate_sd,
-        str_heart_rate_Z,
-        str_heart_rate_f,
-        str_brainwaves_values,
-        str_brainwaves_timestamp,
-        str_brainwaves_media,
-        str_brainwaves_sd,
-        str_brainwaves_Z,
-        str_brainwaves_f,
+        list_session_id,
+        list_phys_trial_id,
+        list_phys_instance_id,
+        list_skin_conductance_values,
+        list_skin_conductance_timestamp,
+        list_skin_conductance_media,
+        list_skin_conductance_sd,
+        list_skin_conductance_Z,
+        list_skin_conductance_f,
+        list_heart_rate_values,
+        list_heart_rate_timestamp,
+        list_heart_rate_media,
+        list_heart_rate_sd,
+        list_heart_rate_Z,
+        list_heart_rate_f,
+        list_brainwaves_values,
+        list_brainwaves_timestamp,
+        list_brainwaves_media,
+        list_brainwaves_sd,
+        list_brainwaves_Z,
+        list_brainwaves_f,
         save_path_name):
-    # & Convert string to list
-    list_session_id = str_session_id.split("\n")
-    list_phys_trial_id = str_phys_trial_id.split("\n")
-    list_phys_instance_id = str_phys_instance_id.split("\n")
-    list_skin_conductance_values = str_skin_conductance_values.split("\n")
-    list_skin_conductance_timestamp = str_skin_conductance_timestamp.split(
-        "\n")
-    list_skin_conductance_media = str_skin_conductance_media.split("\n")
-    list_skin_conductance_sd = str_skin_conductance_sd.split("\n")
-    list_skin_conductance_Z = str_skin_conductance_Z.split("\n")
-    list_skin_conductance_f = str_skin_conductance_f.split("\n")
-    list_heart_rate_values = str_heart_rate_values.split("\n")
-    list_heart_rate_timestamp = str_heart_rate_timestamp.split("\n")
-    list_heart_rate_media = str_heart_rate_media.split("\n")
-    list_heart_rate_sd = str_heart_rate_sd.split("\n")
-    list_heart_rate_Z = str_heart_rate_Z.split("\n")
-    list_heart_rate_f = str_heart_rate_f.split("\n")
-    list_brainwaves_values = str_brainwaves_values.split("\n")
-    list_brainwaves_timestamp = str_brainwaves_timestamp.split("\n")
-    list_brainwaves_media = str_brainwaves_media.split("\n")
-    list_brainwaves_sd = str_brainwaves_sd.split("\n")
-    list_brainwaves_Z = str_brainwaves_Z.split("\n")
-    list_brainwaves_f = str_brainwaves_f.split("\n")
-    # & Remove first line in each of the session data lists
-    del list_phys_trial_id[0]
-    del list_phys_instance_id[0]
-    del list_skin_conductance_values[0]
-    del list_skin_conductance_timestamp[0]
-    del list_skin_conductance_media[0]
-    del list_skin_conductance_sd[0]
-    del list_skin_conductance_Z[0]
-    del list_skin_conductance_f[0]
-    del list_heart_rate_values[0]
-    del list_heart_rate_timestamp[0]
-    del list_heart_rate_media[0]
-    del list_heart_rate_sd[0]
-    del list_heart_rate_Z[0]
-    del list_heart_rate_f[0]
-    del list_brainwaves_values[0]
-    del list_brainwaves_timestamp[0]
-    del list_brainwaves_media[0]
-    del list_brainwaves_sd[0]
-    del list_brainwaves_Z[0]
-    del list_brainwaves_f[0]
     # & Convert list to series
     ser_session_id = pandas.Series(list_session_id, name='Session ID [S]:')
     ser_phys_trial_id = pandas.Series(list_phys_trial_id, name='Trial ID [n]:')
@@ -158,58 +114,32 @@ def export_CSV_phys(
 
 
 def export_CSV(
-        str_start_at,
-        str_finish_at,
-        str_onset_at,
-        str_skin_conductance_D,
-        str_heart_rate_D,
-        str_brainwaves_D,
-        str_trial_id,
-        str_stimulus_id,
-        str_time_start_trial,
-        str_onset_to_trial,
-        str_seconds_end_trial,
-        str_dur_after_interval,
-        str_dur_before_interval,
-        str_time_end_trial,
-        str_skin_conductance_Fn,
-        str_heart_rate_Fn,
-        str_brainwaves_Fn,
+        list_start_at,
+        list_finish_at,
+        list_onset_at,
+        list_participant_sex,
+        list_skin_conductance_D,
+        list_heart_rate_D,
+        list_brainwaves_D,
+        list_trial_id,
+        list_stimulus_id,
+        list_time_start_trial,
+        list_onset_to_trial,
+        list_seconds_end_trial,
+        list_dur_after_interval,
+        list_dur_before_interval,
+        list_time_end_trial,
+        list_skin_conductance_Fn,
+        list_heart_rate_Fn,
+        list_brainwaves_Fn,
+        list_rng_report,
+        list_phys_report,
         save_path_name):
-    # & Convert string to list
-    list_start_at = str_start_at.split("\n")
-    list_finish_at = str_finish_at.split("\n")
-    list_onset_at = str_onset_at.split("\n")
-    list_skin_conductance_D = str_skin_conductance_D.split("\n")
-    list_heart_rate_D = str_heart_rate_D.split("\n")
-    list_brainwaves_D = str_brainwaves_D.split("\n")
-    list_trial_id = str_trial_id.split("\n")
-    list_stimulus_id = str_stimulus_id.split("\n")
-    list_time_start_trial = str_time_start_trial.split("\n")
-    list_onset_to_trial = str_onset_to_trial.split("\n")
-    list_seconds_end_trial = str_seconds_end_trial.split("\n")
-    list_dur_after_interval = str_dur_after_interval.split("\n")
-    list_dur_before_interval = str_dur_before_interval.split("\n")
-    list_time_end_trial = str_time_end_trial.split("\n")
-    list_skin_conductance_Fn = str_skin_conductance_Fn.split("\n")
-    list_heart_rate_Fn = str_heart_rate_Fn.split("\n")
-    list_brainwaves_Fn = str_brainwaves_Fn.split("\n")
-    # & Remove first line in each of the session data lists
-    del list_trial_id[0]
-    del list_stimulus_id[0]
-    del list_time_start_trial[0]
-    del list_onset_to_trial[0]
-    del list_seconds_end_trial[0]
-    del list_dur_after_interval[0]
-    del list_dur_before_interval[0]
-    del list_time_end_trial[0]
-    del list_skin_conductance_Fn[0]
-    del list_heart_rate_Fn[0]
-    del list_brainwaves_Fn[0]
     # & Convert list to series
     ser_start_at = pandas.Series(list_start_at, name='Session started at:')
     ser_finish_at = pandas.Series(list_finish_at, name='Session finished at:')
     ser_onset_at = pandas.Series(list_onset_at, name='First trial started at:')
+    ser_participant_sex = pandas.Series(list_participant_sex, name='Participant sex:')
     ser_skin_conductance_D = pandas.Series(
         list_skin_conductance_D, name='Skin conductance D [SUM(FnE)-SUM(FnN)]:')
     ser_heart_rate_D = pandas.Series(
@@ -236,10 +166,13 @@ def export_CSV(
         list_heart_rate_Fn, name='Heart rate Fn [SUM_fy_paa]:')
     ser_brainwaves_Fn = pandas.Series(
         list_brainwaves_Fn, name='Brainwaves Fn [SUM_fz_paa]:')
+    ser_rng_report = pandas.Series(list_rng_report, name='RNG quality report:')
+    ser_phys_report = pandas.Series(list_phys_report, name='Physiological analysis report:')
     # & Generate dataframe by concatenating the series
     df = pandas.concat([ser_start_at,
                         ser_finish_at,
                         ser_onset_at,
+                        ser_participant_sex,
                         ser_skin_conductance_D,
                         ser_heart_rate_D,
                         ser_brainwaves_D,
@@ -253,7 +186,9 @@ def export_CSV(
                         ser_onset_to_trial,
                         ser_skin_conductance_Fn,
                         ser_heart_rate_Fn,
-                        ser_brainwaves_Fn], axis=1)
+                        ser_brainwaves_Fn,
+                        ser_rng_report,
+                        ser_phys_report], axis=1)
 
     # ? "header=False" if want to remove headers
     df.to_csv(save_path_name, index=False, encoding='ANSI')
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from built in Python
+import codecs
+import os
+import re
+
+#? Includes from external modules in Pipfile
+import numpy
+import pandas
+
+#? Includes from this project
+from .analysis_operations import analysis_grid, timestamps_of_day, local_offset_ms, DAY_MS
+
+#? Importer of the physiological exports of older sessions (see data_handling_operations.export_CSV_phys)
+#? Those files have columns of different lengths (the shorter ones end in empty cells), text in every column, the
+#? ANSI code page of Windows and headers that changed between versions ('Skin Conductance Values[xi]:',
+#? 'Skin conductance values [xi]:', ...). They are read in chunks of IMPORT_CHUNK_ROWS rows with explicit dtypes and
+#? only the columns that are needed, so an archive of any size is imported in bounded memory; the result is kept
+#? as typed NumPy arrays that go straight to analysis_operations.analyse_sensor
+
+# Rows of each chunk
+IMPORT_CHUNK_ROWS = 100000
+# Bytes read to guess the encoding
+ENCODING_SAMPLE = 65536
+# The exports are written with the ANSI code page of Windows
+LEGACY_ENCODING = 'cp1252'
+# Positions and characters of the separators of 'HH:MM:SS.fff'
+TIME_SEPARATORS = [2, 5, 8]
+SEPARATOR_CODES = [ord(':'), ord(':'), ord('.')]
+SENSORS = ('skin_conductance', 'heart_rate', 'brainwaves')
+# Headers of export_CSV_phys; the ones of other versions only differ in case, spaces and 'timestamps'
+LEGACY_COLUMNS = {
+    'session_id': 'Session ID [S]:',
+    'trial_id': 'Trial ID [n]:',
+    'instance_id': 'Instance ID [i]:',
+    'skin_conductance_values': 'Skin Conductance Values[xi]:',
+    'skin_conductance_timestamp': 'Skin Conductance Timestamp[t_xi]:',
+    'heart_rate_values': 'Heart Rate Values [yi]:',
+    'heart_rate_timestamp': 'Heart Rate Timestamp [t_yi]:',
+    'brainwaves_values': 'Brainwaves Values [zi]:',
+    'brainwaves_timestamp': 'Brainwaves Timestamp [t_zi]:',
+}
+
+def normalize_label(label):
+    # 'Skin conductance timestamps [t_xi]:' -> 'skinconductancetimestamp[t_xi]:', 'Instance [i]:' -> 'instanceid[i]:'
+    label = re.sub(r'\s+', '', str(label)).lower()
+    return label.replace('timestamps[', 'timestamp[').replace('instance[', 'instanceid[')
+
+def detect_encoding(path):
+    #? Encoding of a legacy export: UTF-8 or UTF-16 with a BOM, UTF-8 if the beginning of the file is valid UTF-8,
+    #? otherwise the ANSI code page
+    with open(path, 'rb') as file:
+        sample = file.read(ENCODING_SAMPLE)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith(codecs.BOM_UTF16_LE) or sample.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16'
+    try:
+        # The sample may end in the middle of a character
+        codecs.getincrementaldecoder('utf-8')().decode(sample)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return LEGACY_ENCODING
+
+def legacy_columns(path, encoding):
+    # Key of LEGACY_COLUMNS -> header of that column in the file
+    header = pandas.read_csv(path, nrows=0, encoding=encoding, encoding_errors='replace').columns
+    labels = {normalize_label(label): key for key, label in LEGACY_COLUMNS.items()}
+    return {labels[normalize_label(column)]: column for column in header if normalize_label(column) in labels}
+
+def milliseconds_since_midnight(texts):
+    # '%H:%M:%S.%f' strings -> ms since midnight (int64) and a mask of the ones that could be parsed
+    texts = pandas.Series(texts)
+    present = texts.notna().to_numpy(copy=True)
+    cells = texts[present].astype(str)
+    # Only ASCII cells can be read as bytes (a byte that couldn't be decoded is U+FFFD)
+    if cells.str.isascii().all() and (cells.str.len() == 12).all():
+        fixed = cells.to_numpy(dtype='S12')
+        characters = fixed.view(numpy.uint8).reshape(len(fixed), 12) if len(fixed) > 0 else numpy.zeros((0, 12), numpy.uint8)
+    else:
+        characters = None
+    if characters is not None and (characters[:, TIME_SEPARATORS] == SEPARATOR_CODES).all():
+        # 'HH:MM:SS.fff', the format of every export: the digits are read straight from the bytes
+        digits = characters.astype(numpy.int64) - ord('0')
+        elapsed = numpy.zeros(len(texts), dtype=numpy.int64)
+        elapsed[present] = (((digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 3] * 10 + digits[:, 4]) * 60
+                            + digits[:, 6] * 10 + digits[:, 7]) * 1000 \
+            + digits[:, 9] * 100 + digits[:, 10] * 10 + digits[:, 11]
+        return elapsed, present
+    elapsed = pandas.to_timedelta(texts, errors='coerce').to_numpy(dtype='timedelta64[ms]')
+    valid = ~numpy.isnat(elapsed)
+    return elapsed.astype(numpy.int64), valid
+
+def iterate_phys_export(path, sensors=SENSORS, day=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    #? Typed chunks of a legacy physiological export
+    # day: epoch ms of any moment of the day of the first timestamp (the day of the last change of the file by
+    #  default); times earlier than the one before them are taken from the next day, across chunks too
+    # @yields dict with the session_id (None if not in the chunk), the trial_ids ('' outside every trial), the
+    #  instance_ids (0 outside) and the time of each row (the timestamp of the first sensor that has one, -1 if
+    #  none) and for each sensor found in the file, its timestamps (int64 ms) and values (float64)
+    encoding = detect_encoding(path)
+    columns = legacy_columns(path, encoding)
+    sensors = [sensor for sensor in sensors
+               if sensor + '_values' in columns and sensor + '_timestamp' in columns]
+    text_keys = ['session_id', 'trial_id'] + [sensor + '_timestamp' for sensor in sensors]
+    dtypes = {columns[key]: str for key in text_keys if key in columns}
+    dtypes.update({columns[sensor + '_values']: numpy.float64 for sensor in sensors})
+    if 'instance_id' in columns:
+        dtypes[columns['instance_id']] = numpy.float64
+    last = {}
+    reader = pandas.read_csv(path, usecols=list(dtypes), dtype=dtypes, encoding=encoding, encoding_errors='replace',
+                             keep_default_na=False, na_values=[''], chunksize=chunk_rows)
+    with reader:
+        for df in reader:
+            rows = len(df)
+            chunk = {'session_id': None, 'sensors': {}}
+            if 'session_id' in columns:
+                session_ids = df[columns['session_id']].dropna()
+                chunk['session_id'] = str(session_ids.iloc[0]) if len(session_ids) > 0 else None
+            chunk['trial_ids'] = df[columns['trial_id']].fillna('').to_numpy(dtype=object) \
+                if 'trial_id' in columns else numpy.full(rows, '', dtype=object)
+            chunk['instance_ids'] = numpy.nan_to_num(df[columns['instance_id']].to_numpy(), nan=0).astype(numpy.int64) \
+                if 'instance_id' in columns else numpy.zeros(rows, dtype=numpy.int64)
+            row_time = numpy.full(rows, -1, dtype=numpy.int64)
+            for sensor in sensors:
+                since_midnight, valid = milliseconds_since_midnight(df[columns[sensor + '_timestamp']])
+                values = df[columns[sensor + '_values']].to_numpy(dtype=numpy.float64)
+                # Ragged columns: a sample needs both its value and its timestamp
+                valid = valid & ~numpy.isnan(values)
+                if sensor not in last and valid.any():
+                    first_day = first_session_day(path, since_midnight[valid][0]) if day is None else day
+                    last[sensor] = (numpy.int64(first_day), since_midnight[valid][0])
+                if not valid.any():
+                    chunk['sensors'][sensor] = (numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.float64))
+                    continue
+                # The last timestamp of the previous chunk goes first, so a midnight between chunks is seen
+                previous_timestamp, previous_since_midnight = last[sensor]
+                timestamps = timestamps_of_day(numpy.concatenate([[previous_since_midnight], since_midnight[valid]]),
+                                               previous_timestamp)[1:]
+                last[sensor] = (timestamps[-1], since_midnight[valid][-1])
+                chunk['sensors'][sensor] = (timestamps, values[valid])
+                missing = valid & (row_time < 0)
+                row_time[missing] = timestamps[numpy.cumsum(valid)[missing] - 1]
+            chunk['row_time'] = row_time
+            yield chunk
+
+def first_session_day(path, first_since_midnight):
+    # Epoch ms on the day of the first sample, from the last change of the file (written at the end of the session):
+    # a first sample later in the day than that change was recorded the day before
+    modified = numpy.int64(os.path.getmtime(path) * 1000)
+    modified_since_midnight = (modified + local_offset_ms([modified])) % DAY_MS
+    return modified - DAY_MS if first_since_midnight > modified_since_midnight else modified
+
+def read_phys_export(path, sensors=SENSORS, day=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    #? Typed session arrays of a legacy physiological export
+    # @returns dict with name, session_id, trial_ids (in order of appearance), trial_start and trial_end (int64 ms,
+    #  the end is 1 ms after the last sample of the trial, see analysis_operations.create_phys_ids), rows and for
+    #  each sensor found, a dict with its timestamps (int64 ms) and values (float64)
+    session_id = None
+    parts = {}
+    trial_numbers = {}
+    trial_start, trial_end = [], []
+    rows = 0
+    for chunk in iterate_phys_export(path, sensors, day, chunk_rows):
+        rows += len(chunk['row_time'])
+        session_id = session_id or chunk['session_id']
+        for sensor, arrays in chunk['sensors'].items():
+            parts.setdefault(sensor, []).append(arrays)
+        # First and last time of each trial (the labels are few, the rows are not)
+        in_trial = (chunk['trial_ids'] != '') & (chunk['row_time'] >= 0)
+        labels, inverse = numpy.unique(chunk['trial_ids'][in_trial].astype(str), return_inverse=True)
+        first = numpy.full(len(labels), numpy.iinfo(numpy.int64).max)
+        last_time = numpy.full(len(labels), -1, dtype=numpy.int64)
+        numpy.minimum.at(first, inverse, chunk['row_time'][in_trial])
+        numpy.maximum.at(last_time, inverse, chunk['row_time'][in_trial])
+        for label, start, end in zip(labels.tolist(), first.tolist(), (last_time + 1).tolist()):
+            if label not in trial_numbers:
+                trial_numbers[label] = len(trial_numbers)
+                trial_start.append(start)
+                trial_end.append(end)
+            else:
+                trial = trial_numbers[label]
+                trial_start[trial] = min(trial_start[trial], start)
+                trial_end[trial] = max(trial_end[trial], end)
+    # Trials in the order of time, like in the session
+    trial_start = numpy.array(trial_start, dtype=numpy.int64)
+    trial_end = numpy.array(trial_end, dtype=numpy.int64)
+    order = numpy.argsort(trial_start, kind='stable')
+    labels = list(trial_numbers)
+    trial_ids = [labels[trial] for trial in order]
+    return {
+        'name': os.path.basename(path),
+        'session_id': session_id,
+        'trial_ids': trial_ids,
+        'trial_start': trial_start[order],
+        'trial_end': trial_end[order],
+        'rows': rows,
+        'sensors': {sensor: {'timestamps': numpy.concatenate([timestamps for timestamps, _ in arrays]),
+                             'values': numpy.concatenate([values for _, values in arrays])}
+                    for sensor, arrays in parts.items() if sum([len(values) for _, values in arrays]) > 0},
+    }
+
+def legacy_session(phys, stimulus_ids, presentiment_seconds, samples_per_second=None, shuffles=0, **options):
+    #? Session dict of analysis_operations.analyse_sensor for an imported export
+    # stimulus_ids: one per trial, in order (e.g. from the session export, see pooled_operations.read_session_export)
+    # samples_per_second: rate of the analysis grid, the rate of the export by default
+    # options: other keys of the session (quality_policy, baseline, bootstrap, ...)
+    if samples_per_second is None:
+        samples_per_second = recorded_rate(phys)
+    trial_start, trial_end = phys['trial_start'], phys['trial_end']
+    t_first = trial_start[0] if len(trial_start) > 0 else 0
+    t_last = max([int(trial_end[-1]) if len(trial_end) > 0 else 0] +
+                 [int(sensor['timestamps'][-1]) for sensor in phys['sensors'].values() if len(sensor['timestamps']) > 0])
+    session = {
+        'grid': analysis_grid(t_first, t_last, samples_per_second),
+        'samples_per_second': samples_per_second,
+        'trial_start': trial_start,
+        'trial_end': trial_end,
+        'stimulus_ids': list(stimulus_ids)[:len(trial_end)],
+        'presentiment_instances': int(round(samples_per_second * presentiment_seconds)),
+        'shuffles': shuffles,
+    }
+    session.update(options)
+    return session
+
+def recorded_rate(phys):
+    # Samples per second of the export, from the median interval between the samples of the first sensor
+    for sensor in phys['sensors'].values():
+        if len(sensor['timestamps']) > 1:
+            interval = numpy.median(numpy.diff(sensor['timestamps']))
+            if interval > 0:
+                return 1000 / interval
+    return 1
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from built in Python
+import os
+
+#? Includes from external modules in Pipfile
+import numpy
+import pandas
+
+#? Includes from this project
+from .chunk_operations import chunk_seeds, run_chunks
+from .trial_operations import analysed_trials
+
+#? Pooled analysis of many sessions, split in groups by a covariate of the participant (e.g. sex)
+#? Each session is a stratum: the permutations shuffle the E/N labels only among the trials of the same session, so
+#? the number of E trials of every session is kept. The Fn of each session are centered and divided by their sd first
+#? (neither changes with the permutations, so the test stays exact, no session dominates by its scale and the D of a
+#? session is its distance to the mean of its D')
+#? The difference between groups is tested by exchanging the covariate among the sessions
+
+# Columns of the session exports (see data_handling_operations.export_CSV)
+STIMULUS_COLUMN = 'Stimulus ID:'
+FN_COLUMNS = {
+    'skin_conductance': 'Skin conductance Fn [SUM_fx_paa]:',
+    'heart_rate': 'Heart rate Fn [SUM_fy_paa]:',
+    'brainwaves': 'Brainwaves Fn [SUM_fz_paa]:',
+}
+COVARIATE_COLUMNS = {'sex': 'Participant sex:'}
+# The exports are written with the ANSI code page of Windows
+EXPORT_ENCODING = 'cp1252'
+POOLED_PERMUTATIONS = 5000
+# Permutations drawn at once (a permutations x sessions x trials matrix)
+POOLED_BATCH = 100
+# Permutations of each chunk (the unit of the seeds and of the work sent to the process pool)
+POOLED_CHUNK = 1000
+# From this number of permutations the chunks are spread over a process pool
+PARALLEL_PERMUTATIONS = 20000
+
+def read_session_export(path, sensor='skin_conductance'):
+    #? Stimulus IDs, Fn of a sensor and covariates of an exported session
+    # @returns dict with name, stimulus_ids, Fn (NaN for the trials without Fn) and covariates
+    df = pandas.read_csv(path, encoding=EXPORT_ENCODING, encoding_errors='replace')
+    stimulus_ids = df[STIMULUS_COLUMN].dropna().astype(str).tolist()
+    Fn = pandas.to_numeric(df[FN_COLUMNS[sensor]], errors='coerce').to_numpy(dtype=numpy.float64)[:len(stimulus_ids)]
+    covariates = {}
+    for covariate, column in COVARIATE_COLUMNS.items():
+        values = df[column].dropna().astype(str).tolist() if column in df else []
+        covariates[covariate] = values[0] if values else ''
+    return {'name': os.path.basename(path), 'stimulus_ids': stimulus_ids, 'Fn': Fn, 'covariates': covariates}
+
+def pooled_matrix(sessions):
+    #? Sessions x trials matrix of the standardized Fn (0 for padding and excluded trials), sorted with the E trials
+    #? first in each row, and the number of trials and of E trials of each session
+    width = max([len(session['Fn']) for session in sessions] + [1])
+    Fn = numpy.zeros((len(sessions), width))
+    counts = numpy.zeros(len(sessions), dtype=numpy.int64)
+    excitatory = numpy.zeros(len(sessions), dtype=numpy.int64)
+    for row, session in enumerate(sessions):
+        values, is_neutral = analysed_trials(session['stimulus_ids'], session['Fn'])
+        sd = values.std() if len(values) > 1 else 0.0
+        values = (values - values.mean()) / sd if sd > 0 else numpy.zeros(len(values))
+        Fn[row, :len(values)] = numpy.concatenate([values[~is_neutral], values[is_neutral]])
+        counts[row], excitatory[row] = len(values), int((~is_neutral).sum())
+    return Fn, counts, excitatory
+
+def session_D(Fn, excitatory):
+    # D of every session of the matrix (E trials first in each row)
+    columns = numpy.arange(Fn.shape[1])[None, :]
+    return 2 * numpy.where(columns < excitatory[:, None], Fn, 0).sum(axis=1) - Fn.sum(axis=1)
+
+def stratified_permutations(Fn, counts, excitatory, permutations, seed):
+    #? D' of every session in `permutations` permutations of the labels within each session (runs in any process)
+    # @returns permutations x sessions matrix
+    generator = numpy.random.default_rng(seed)
+    columns = numpy.arange(Fn.shape[1])
+    padding = columns[None, :] >= counts[:, None]
+    total = Fn.sum(axis=1)
+    rows = numpy.arange(Fn.shape[0])[:, None]
+    D_prime = []
+    for first in range(0, permutations, POOLED_BATCH):
+        size = min(POOLED_BATCH, permutations - first)
+        # Random keys, the padding always last: the first `excitatory` trials of each order take the E labels
+        keys = generator.random((size,) + Fn.shape)
+        keys[:, padding] = 2
+        order = numpy.argsort(keys, axis=2)
+        chosen = Fn[rows, order] * (columns < excitatory[:, None])
+        D_prime.append(2 * chosen.sum(axis=2) - total)
+    return numpy.concatenate(D_prime) if D_prime else numpy.zeros((0, Fn.shape[0]))
+
+def exchanged_differences(values, in_first, permutations, seed):
+    #? Difference of the mean D of two groups in `permutations` exchanges of the covariate among the sessions
+    generator = numpy.random.default_rng(seed)
+    differences = []
+    for first in range(0, permutations, POOLED_BATCH):
+        size = min(POOLED_BATCH, permutations - first)
+        permuted = in_first[numpy.argsort(generator.random((size, len(values))), axis=1)]
+        differences.append((values * permuted).sum(axis=1) / in_first.sum()
+                           - (values * ~permuted).sum(axis=1) / (~in_first).sum())
+    return numpy.concatenate(differences) if differences else numpy.zeros(0)
+
+def permutation_chunks(function, arguments, permutations, seed_sequence, workers):
+    # `function(*arguments, size, seed)` over the permutations in seeded chunks, in a process pool for many of them
+    calls = [arguments + (size, chunk_seed) for size, chunk_seed in chunk_seeds(permutations, POOLED_CHUNK, seed_sequence)]
+    return numpy.concatenate(run_chunks(function, calls, permutations >= PARALLEL_PERMUTATIONS, workers))
+
+def pooled_analysis(sessions, covariate='sex', permutations=POOLED_PERMUTATIONS, seed=None, workers=None):
+    #? Pooled D and ZD of all the sessions and of each group of the covariate, and the difference between groups
+    # sessions: list of dicts from read_session_export
+    # @returns dict with 'groups' (group -> sessions, D, ZD, p) and 'between' (list of group pairs with the difference
+    #  of the mean D per session and its p)
+    Fn, counts, excitatory = pooled_matrix(sessions)
+    usable = (excitatory > 0) & (excitatory < counts)
+    Fn, counts, excitatory = Fn[usable], counts[usable], excitatory[usable]
+    labels = numpy.array([session['covariates'].get(covariate, '') for session, keep in zip(sessions, usable) if keep])
+    D = session_D(Fn, excitatory)
+    within_seed, between_seed = numpy.random.SeedSequence(seed).spawn(2)
+    D_prime = permutation_chunks(stratified_permutations, (Fn, counts, excitatory), permutations, within_seed, workers)
+    # Sessions without the covariate only count for all the sessions
+    groups = {'all': numpy.ones(len(D), dtype=bool)}
+    for group in sorted(set(labels.tolist()) - {''}):
+        groups[group] = labels == group
+    result = {'groups': {}, 'between': []}
+    for group, members in groups.items():
+        pooled, null = D[members].sum(), D_prime[:, members].sum(axis=1)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            ZD = (pooled - null.mean()) / null.std()
+        result['groups'][group] = {'sessions': int(members.sum()), 'D': float(pooled), 'ZD': float(ZD),
+                                   'p': float((1 + (null >= pooled).sum()) / (1 + len(null)))}
+    # Between groups: the covariate is exchanged among the sessions of both groups
+    names = [group for group in groups if group != 'all']
+    pairs = [(first, second) for number, first in enumerate(names) for second in names[number + 1:]]
+    for (first, second), pair_seed in zip(pairs, between_seed.spawn(len(pairs))):
+        both = groups[first] | groups[second]
+        values, in_first = D[both], groups[first][both]
+        difference = values[in_first].mean() - values[~in_first].mean()
+        differences = permutation_chunks(exchanged_differences, (values, in_first), permutations, pair_seed, workers)
+        result['between'].append({'groups': (first, second), 'difference': float(difference),
+                                  'p': float((1 + (numpy.abs(differences) >= abs(difference)).sum()) / (1 + permutations))})
+    return result
+
+def pooled_report(result, covariate='sex'):
+    # Lines of the report of a pooled analysis
+    lines = []
+    for group, values in result['groups'].items():
+        lines.append(("all sessions" if group == 'all' else covariate + " " + group) + ": " + str(values['sessions'])
+                     + " sessions, D " + str(round(values['D'], 4)) + ", ZD " + str(round(values['ZD'], 4))
+                     + ", p " + str(round(values['p'], 4)))
+    for values in result['between']:
+        lines.append(covariate + " " + values['groups'][0] + " - " + values['groups'][1] + ": difference of the mean D "
+                     + str(round(values['difference'], 4)) + ", p " + str(round(values['p'], 4)) + " (two-sided)")
+    return lines
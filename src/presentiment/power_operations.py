@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from built in Python
+import os
+
+#? Includes from external modules in Pipfile
+import numpy
+
+#? Includes from this project
+from .analysis_operations import analyse_sensor
+from .quality_operations import POLICY_EXCLUDE
+from .sequential_operations import normal_quantile
+from .Signal_Filter import PHYS_FILTERS
+from .chunk_operations import chunk_seeds, run_chunks
+
+#? Monte Carlo power analysis of a session design
+#? Sessions are simulated in batches (sessions x samples arrays) with a noise model of a skin conductance like
+#? signal, and every session goes through the same analysis as a real one (analysis_operations.analyse_sensor)
+#? The model, in the units of the white noise (noise_sd = 1):
+#?  drift    -> random walk with steps of drift_sd per second (slow tonic changes)
+#?  response -> response of that amplitude after every stimulus (twice as large after the excitatory ones)
+#?  effect   -> presentiment: a ramp over the presentiment timeframe of the excitatory trials, up to `effect`
+
+# Default design and noise model of a simulated session
+DEFAULT_SIMULATION = {
+    'trials': 45,
+    'samples_per_second': 20,
+    'pre_screen': 3,
+    'stim_duration': 3,
+    'post_screen': 9,
+    'max_interval': 5,
+    'excitatory_fraction': 1 / 3,
+    'effect': 0.0,
+    'drift_sd': 0.3,
+    'response': 3.0,
+    'sensor': 'skin_conductance',
+    # The analysis of the app is raw by default; True filters the signal with PHYS_FILTERS of the sensor
+    'filters': False,
+    'shuffles': 0,
+}
+# Sessions simulated together by a worker
+BATCH_SESSIONS = 100
+# Seconds of the rise and of the decay of a simulated response
+RESPONSE_RISE_SECONDS = 1.5
+
+def simulate_sessions(generator, sessions, simulation):
+    #? Batch of simulated sessions on a common timeline (epoch ms from 0)
+    # simulation: dict with the keys of DEFAULT_SIMULATION
+    # @returns timestamps (samples), values (sessions x samples), trial_start and trial_end (sessions x trials) and
+    #  stimulus_ids (sessions x trials)
+    trials, sps = simulation['trials'], simulation['samples_per_second']
+    trial_seconds = simulation['pre_screen'] + simulation['stim_duration'] + simulation['post_screen']
+    # Trials are followed by a random whole-second interval, like in a free-running session
+    intervals = generator.integers(0, simulation['max_interval'] + 1, size=(sessions, trials))
+    trial_end = numpy.cumsum(trial_seconds + intervals, axis=1) * 1000
+    trial_start = trial_end - (trial_seconds + intervals) * 1000
+    num_samples = int((trials * (trial_seconds + simulation['max_interval']) + 1) * sps)
+    timestamps = (numpy.arange(num_samples) * 1000 // sps).astype(numpy.int64)
+    excitatory = generator.random((sessions, trials)) < simulation['excitatory_fraction']
+    stimulus_ids = numpy.where(excitatory, 'E-1', 'N-1')
+    # White noise plus the random walk of the tonic level
+    values = generator.standard_normal((sessions, num_samples))
+    values += numpy.cumsum(generator.standard_normal((sessions, num_samples)) * (simulation['drift_sd'] / numpy.sqrt(sps)), axis=1)
+    # Sample of each stimulus onset, and the response to it, added with one FFT convolution per batch
+    onsets = (trial_start + simulation['pre_screen'] * 1000) * sps // 1000
+    impulses = numpy.zeros((sessions, num_samples))
+    rows = numpy.repeat(numpy.arange(sessions), trials)
+    numpy.add.at(impulses, (rows, onsets.ravel()), numpy.where(excitatory, 2.0, 1.0).ravel())
+    since = numpy.arange(num_samples) / (sps * RESPONSE_RISE_SECONDS)
+    kernel = simulation['response'] * since * numpy.exp(1 - since)
+    size = 2 * num_samples
+    values += numpy.fft.irfft(numpy.fft.rfft(impulses, size) * numpy.fft.rfft(kernel, size), size)[:, :num_samples]
+    # Presentiment ramp over the pre-stimulus screen of the excitatory trials
+    pre_samples = simulation['pre_screen'] * sps
+    if simulation['effect'] != 0:
+        ramp = numpy.zeros((sessions, num_samples + 1))
+        starts = onsets - pre_samples
+        slope = numpy.where(excitatory, simulation['effect'] / pre_samples, 0.0).ravel()
+        # Slopes go in as steps of the derivative: +slope at the start of the ramp, -slope at the onset
+        numpy.add.at(ramp, (rows, starts.ravel()), slope)
+        numpy.add.at(ramp, (rows, onsets.ravel()), -slope)
+        ramp = numpy.cumsum(numpy.cumsum(ramp, axis=1), axis=1)
+        # The ramp falls back to 0 at the onset
+        drop = numpy.zeros((sessions, num_samples + 1))
+        numpy.add.at(drop, (rows, onsets.ravel()), numpy.where(excitatory, simulation['effect'], 0.0).ravel())
+        values += (ramp - numpy.cumsum(drop, axis=1))[:, :num_samples]
+    return timestamps, values, trial_start.astype(numpy.int64), trial_end.astype(numpy.int64), stimulus_ids
+
+def simulate_D_Z(simulation, sessions, seed):
+    #? Simulate `sessions` sessions and analyse each one like a real session (runs in a worker process)
+    # @returns D and ZD of every session
+    generator = numpy.random.default_rng(seed)
+    simulation = dict(DEFAULT_SIMULATION, **simulation)
+    sps = simulation['samples_per_second']
+    D, ZD = numpy.full(sessions, numpy.nan), numpy.full(sessions, numpy.nan)
+    for first in range(0, sessions, BATCH_SESSIONS):
+        batch = min(BATCH_SESSIONS, sessions - first)
+        timestamps, values, trial_start, trial_end, stimulus_ids = simulate_sessions(generator, batch, simulation)
+        for session_number in range(batch):
+            session = {
+                'grid': timestamps,
+                'samples_per_second': sps,
+                'trial_start': trial_start[session_number],
+                'trial_end': trial_end[session_number],
+                'stimulus_ids': list(stimulus_ids[session_number]),
+                'presentiment_instances': sps * simulation['pre_screen'],
+                'shuffles': simulation['shuffles'],
+                'quality_policy': POLICY_EXCLUDE,
+            }
+            result = analyse_sensor(values[session_number], timestamps, sps, session,
+                                    filters=PHYS_FILTERS.get(simulation['sensor']) if simulation['filters'] else None)
+            D[first + session_number], ZD[first + session_number] = result['D'], result['ZD']
+    return D, ZD
+
+def power_analysis(simulations, sessions=1000, alpha=0.05, workers=None, seed=None):
+    #? Power of each simulated design: fraction of its sessions with a ZD above the one-sided critical value
+    # simulations: list of dicts with the keys of DEFAULT_SIMULATION to change
+    # @returns list of dicts: the simulation, power, mean and sd of ZD
+    critical = normal_quantile(1 - alpha)
+    # One seed per design, in the order of the list, and one per chunk of its sessions
+    chunks = [(number, size, chunk_seed)
+              for number, simulation_seed in enumerate(numpy.random.SeedSequence(seed).spawn(len(simulations)))
+              for size, chunk_seed in chunk_seeds(sessions, BATCH_SESSIONS, simulation_seed)]
+    chunk_results = run_chunks(simulate_D_Z, [(simulations[number], size, chunk_seed) for number, size, chunk_seed in chunks],
+                               True, workers or os.cpu_count())
+    ZD = [[] for _ in simulations]
+    for (number, _, _), (_, chunk_ZD) in zip(chunks, chunk_results):
+        ZD[number].append(chunk_ZD)
+    results = []
+    for simulation, simulation_ZD in zip(simulations, ZD):
+        simulation_ZD = numpy.concatenate(simulation_ZD)
+        finite = simulation_ZD[numpy.isfinite(simulation_ZD)]
+        results.append({'simulation': dict(DEFAULT_SIMULATION, **simulation),
+                        'power': float((finite >= critical).mean()) if len(finite) else float('nan'),
+                        'mean_ZD': float(finite.mean()) if len(finite) else float('nan'),
+                        'sd_ZD': float(finite.std()) if len(finite) else float('nan'),
+                        'sessions': len(finite)})
+    return results
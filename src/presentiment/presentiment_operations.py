@@ -18,9 +18,10 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from . import Neulog
-from . import PsyREG
-from . import Pseudo_RNG
+from .Neulog import Neulog
+from .PsyREG import PsyREG
+from .Pseudo_RNG import Pseudo_RNG
+from .OS_RNG import OS_RNG
 
 def refresh_neulog(port, onNeulogReady,onNeulogExperiment, onNeulogFailed):
     # Create neulog class
@@ -61,18 +62,27 @@ def heart_rate_test(port, name, onGetNeulogValue):
         pass
 
 # @returns True if Psyleron matches the name, False otherwise
-def maybe_generate_psyleron_bits(name, onSuccess,onFailure):
-    psyleron = PsyREG()
+def maybe_generate_psyleron_bits(name, onSuccess,onFailure, psyleron=None):
+    # psyleron: PsyREG or PsyREG_Pool, the first Psyleron if not given
+    psyleron = psyleron or PsyREG()
     if str(psyleron.get_name()) == name:
         if psyleron.count_PsyREGs() >= 1:
+            # The source stays open, it's released at the end of the session or when the window closes
             onSuccess(psyleron.get_bits(6))
-            psyleron.clear_RNG()
-            psyleron.release_RNG()
         else:
             onFailure()
         return True
     return False
 
+# @returns True if OS-RNG matches the name, False otherwise
+def maybe_generate_OS_RNG_bits(name, onSuccess, os_rng=None):
+    # os_rng: OS_RNG to reuse its buffer, a new one if not given
+    os_rng = os_rng or OS_RNG()
+    if os_rng.name == name:
+        onSuccess(os_rng.get_bits(6))
+        return True
+    return False
+
 #? Function behaves different than the one above, in this case failure is when it is not selected
 def maybe_generate_pseudo_RNG_bits(name, onSuccess, onFailure):
     pseudo = Pseudo_RNG()
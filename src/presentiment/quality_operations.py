@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from external modules in Pipfile
+import numpy
+
+#? Signal-quality validation of the physiological channels
+#? One vectorized pass gives a bit mask per sample (a sample can fail several checks); it can be given the whole
+#? session or one acquisition chunk after another (passing the state returned by the previous chunk)
+
+# Bits of the flags of a sample
+FLAG_DROPOUT = 1  # NaN or infinite value
+FLAG_RANGE = 2  # Outside the valid range of the sensor
+FLAG_SATURATED = 4  # At a limit of the valid range
+FLAG_FLAT = 8  # Part of a run of identical values lasting FLAT_SECONDS (e.g. a disconnected sensor)
+FLAG_GAP = 16  # First sample after a timestamp gap, or a timestamp that doesn't increase
+FLAG_NAMES = {FLAG_DROPOUT: 'dropouts', FLAG_RANGE: 'out of range', FLAG_SATURATED: 'saturated',
+              FLAG_FLAT: 'flat-lines', FLAG_GAP: 'timestamp gaps'}
+# Seconds of identical values that make a flat-line
+FLAT_SECONDS = 5
+# A timestamp step longer than this number of sample periods is a gap
+GAP_PERIODS = 3
+# With POLICY_EXCLUDE, trials with a larger fraction of bad samples in their presentiment timeframe are excluded
+MAX_BAD_FRACTION = 0.2
+#? Policies for the bad samples
+#?  POLICY_EXCLUDE     -> trials with too many bad samples are left out of Fn and D
+#?  POLICY_INTERPOLATE -> bad samples are interpolated from their neighbours; only trials that can't be analysed
+#?                        (sd 0 or not finite) are left out
+POLICY_EXCLUDE = 'exclude'
+POLICY_INTERPOLATE = 'interpolate'
+
+def quality_flags(timestamps, values, value_range=None, previous=None):
+    #? Flags of every sample of a channel
+    # value_range: (low, high) valid values of the sensor, None to skip the range checks
+    # previous: state returned for the chunk before, so runs and gaps are followed across chunks
+    # @returns uint8 flags per sample and the state for the next chunk: (last timestamp, last value, run length, period ms)
+    timestamps = numpy.asarray(timestamps, dtype=numpy.int64)
+    values = numpy.asarray(values, dtype=numpy.float64)
+    flags = numpy.zeros(len(values), dtype=numpy.uint8)
+    if len(values) == 0:
+        return flags, previous
+    flags[~numpy.isfinite(values)] |= FLAG_DROPOUT
+    if value_range is not None:
+        low, high = value_range
+        with numpy.errstate(invalid='ignore'):
+            flags[(values < low) | (values > high)] |= FLAG_RANGE
+            flags[(values == low) | (values == high)] |= FLAG_SATURATED
+    # The last sample of the previous chunk goes first, so the steps and runs continue from it
+    if previous is not None:
+        last_timestamp, last_value, last_run, period_ms = previous
+        steps = numpy.diff(timestamps, prepend=last_timestamp)
+        joined = numpy.concatenate([[last_value], values])
+    else:
+        last_run, period_ms = 1, None
+        steps = numpy.concatenate([[1], numpy.diff(timestamps)])
+        joined = values
+    if period_ms is None and len(timestamps) > 1:
+        period_ms = float(numpy.median(numpy.diff(timestamps)))
+    # Length of the run of identical values each sample belongs to
+    starts = numpy.flatnonzero(numpy.concatenate([[True], joined[1:] != joined[:-1]]))
+    counts = numpy.diff(numpy.append(starts, len(joined)))
+    lengths = counts.copy()
+    lengths[0] += last_run - 1
+    run_lengths = numpy.repeat(lengths, counts)[len(joined) - len(values):]
+    last_run = int(lengths[-1])
+    if period_ms:
+        flags[(steps > GAP_PERIODS * period_ms) | (steps <= 0)] |= FLAG_GAP
+        flat = run_lengths >= max(FLAT_SECONDS * 1000 / period_ms, 3)
+        flags[flat & numpy.isfinite(values)] |= FLAG_FLAT
+    return flags, (int(timestamps[-1]), float(values[-1]), last_run, period_ms)
+
+def quality_counts(flags):
+    # Samples with each flag, and samples with any flag but FLAG_GAP ('bad')
+    flags = numpy.asarray(flags, dtype=numpy.uint8)
+    counts = {name: int(numpy.count_nonzero(flags & flag)) for flag, name in FLAG_NAMES.items()}
+    counts['bad'] = int(numpy.count_nonzero(flags & ~numpy.uint8(FLAG_GAP)))
+    return counts
+
+def bad_samples(flags):
+    # Samples that are not used: any flag but FLAG_GAP (the sample after a gap is fine, the gap is what's missing)
+    return (numpy.asarray(flags, dtype=numpy.uint8) & ~numpy.uint8(FLAG_GAP)) != 0
+
+def excluded_trials(bad, Fn, trial_index, instance_ids, presentiment_instances, policy=POLICY_EXCLUDE):
+    #? Trials left out of D: the ones whose Fn is not finite (e.g. sd 0 in a constant window) and, with POLICY_EXCLUDE,
+    #? the ones with more than MAX_BAD_FRACTION of bad samples in their presentiment timeframe
+    # bad: per sample of the analysis grid, True if it was interpolated over a bad sample or a gap
+    # @returns boolean mask per trial
+    excluded = ~numpy.isfinite(Fn)
+    if policy == POLICY_EXCLUDE:
+        pre = (trial_index >= 0) & (instance_ids <= presentiment_instances)
+        n_pre = numpy.bincount(trial_index[pre], minlength=len(Fn))
+        n_bad = numpy.bincount(trial_index[pre & bad], minlength=len(Fn))
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            excluded |= (n_pre == 0) | (n_bad / n_pre > MAX_BAD_FRACTION)
+    return excluded
+
+def quality_report(counts, total, excluded, policy):
+    # Lines of text with the quality of a channel
+    lines = [str(counts[name]) + " " + name for name in FLAG_NAMES.values() if counts[name] > 0]
+    lines.insert(0, str(counts['bad']) + " bad samples of " + str(total) + " (" + policy + ")")
+    lines.append(str(int(numpy.count_nonzero(excluded))) + " of " + str(len(excluded)) + " trials excluded")
+    return lines
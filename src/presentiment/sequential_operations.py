@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from built in Python
+import math
+
+#? Includes from external modules in Pipfile
+import numpy
+
+#? Sequential analysis of a session: D and ZD after every trial, with early stopping
+#? ZD is compared after each trial (look) against an efficacy boundary fixed before the session starts, from a
+#? Lan-DeMets alpha-spending function of O'Brien-Fleming type (one-sided, E > N), so the false positive rate of the
+#? whole session stays at SPENDING_ALPHA however many looks there are. Stopping for futility is non-binding: it is
+#? offered when the conditional power under the current trend falls below FUTILITY_POWER
+
+# One-sided false positive rate of the whole session
+SPENDING_ALPHA = 0.05
+# Futility is offered when the chance of crossing the final boundary, if the trend goes on, falls below this
+FUTILITY_POWER = 0.1
+# ... and only after this fraction of the planned trials
+FUTILITY_MIN_FRACTION = 0.5
+# Grid of the numerical integration of the boundaries (in units of the Brownian motion Z * sqrt(fraction))
+GRID_STEP = 0.02
+GRID_LOWER = -8.0
+# Boundaries that would spend less alpha than this (the first looks) are left at this ZD, which is never crossed
+MAX_BOUNDARY = 8.0
+#? Decisions after a look
+STOP_NONE = ''
+STOP_EFFICACY = 'efficacy'
+STOP_FUTILITY = 'futility'
+
+def normal_cdf(x):
+    # Standard normal CDF of an array, erfc with fractional error below 1.2e-7 (Numerical Recipes)
+    x = numpy.asarray(x, dtype=numpy.float64)
+    z = numpy.abs(x) / math.sqrt(2)
+    t = 1 / (1 + z / 2)
+    polynomial = (-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (-0.18628806 + t * (
+        0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (-0.82215223 + t * 0.17087277)))))))))
+    erfc = t * numpy.exp(polynomial)
+    return numpy.where(x >= 0, 1 - erfc / 2, erfc / 2)
+
+def normal_quantile(p):
+    # Inverse of normal_cdf by bisection (p between 0 and 1)
+    low, high = -40.0, 40.0
+    for _ in range(100):
+        middle = (low + high) / 2
+        if normal_cdf(middle) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+def obrien_fleming_spending(fractions, alpha=SPENDING_ALPHA):
+    # Alpha spent once a fraction of the trials is done: 2 - 2 Φ(z_(1-alpha/2) / sqrt(fraction))
+    fractions = numpy.asarray(fractions, dtype=numpy.float64)
+    return 2 - 2 * normal_cdf(normal_quantile(1 - alpha / 2) / numpy.sqrt(fractions))
+
+def efficacy_boundaries(looks, alpha=SPENDING_ALPHA):
+    #? ZD boundary of each of `looks` equally spaced looks (one per trial)
+    #? The density of the Brownian motion among the sessions still running is carried from look to look on a grid,
+    #? and each boundary is the one whose crossing probability is the alpha spent at that look
+    # @returns numpy array with one boundary per look
+    fractions = numpy.arange(1, looks + 1) / looks
+    spent = numpy.diff(obrien_fleming_spending(fractions, alpha), prepend=0.0)
+    boundaries = numpy.full(looks, MAX_BOUNDARY)
+    grid, density, previous = None, None, 0.0
+    for look, fraction in enumerate(fractions):
+        step_sd = math.sqrt(fraction - previous)
+        def crossing(boundary):
+            # Probability of crossing at this look without having crossed before
+            tail = 1 - normal_cdf(boundary * math.sqrt(fraction) / step_sd) if grid is None else \
+                (density * (1 - normal_cdf((boundary * math.sqrt(fraction) - grid) / step_sd))).sum() * GRID_STEP
+            return float(tail)
+        if crossing(MAX_BOUNDARY) < spent[look]:
+            # The probability decreases with the boundary
+            low, high = 0.0, MAX_BOUNDARY
+            for _ in range(60):
+                middle = (low + high) / 2
+                if crossing(middle) > spent[look]:
+                    low = middle
+                else:
+                    high = middle
+            boundaries[look] = high
+        # Density of the sessions that didn't cross, on the grid below the boundary
+        new_grid = numpy.arange(GRID_LOWER, boundaries[look] * math.sqrt(fraction), GRID_STEP)
+        if grid is None:
+            density = numpy.exp(-new_grid ** 2 / (2 * fraction)) / math.sqrt(2 * math.pi * fraction)
+        else:
+            kernel = numpy.exp(-((new_grid[:, None] - grid[None, :]) / step_sd) ** 2 / 2) / (math.sqrt(2 * math.pi) * step_sd)
+            density = kernel @ density * GRID_STEP
+        grid, previous = new_grid, fraction
+    return boundaries
+
+def conditional_power(ZD, fraction, final_boundary):
+    # Chance of ending above the final boundary if the trend seen so far goes on (drift ZD / sqrt(fraction))
+    if fraction >= 1:
+        return float(ZD >= final_boundary)
+    brownian = ZD * math.sqrt(fraction)
+    drift = ZD / math.sqrt(fraction)
+    return float(1 - normal_cdf((final_boundary - brownian - drift * (1 - fraction)) / math.sqrt(1 - fraction)))
+
+def sequential_decision(ZD, look, boundaries):
+    #? Decision after `look` trials (1 to len(boundaries)) of a session with the given ZD
+    # @returns STOP_EFFICACY, STOP_FUTILITY or STOP_NONE, and the conditional power
+    fraction = look / len(boundaries)
+    if not math.isfinite(ZD):
+        return STOP_NONE, float('nan')
+    power = conditional_power(ZD, fraction, boundaries[-1])
+    if ZD >= boundaries[look - 1]:
+        return STOP_EFFICACY, power
+    if fraction >= FUTILITY_MIN_FRACTION and look < len(boundaries) and power < FUTILITY_POWER:
+        return STOP_FUTILITY, power
+    return STOP_NONE, power
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+#? Includes from external modules in Pipfile
+import numpy
+
+#? Trials of a session by kind of stimulus: excitatory (stimulus IDs starting with E) and neutral (starting with N)
+
+def neutral_trials(stimulus_ids):
+    # True for the neutral stimuli, False for the excitatory ones
+    return numpy.array([str(stim_id)[:1] == 'N' for stim_id in stimulus_ids], dtype=bool)
+
+def analysed_trials(stimulus_ids, trial_Fn):
+    # Fn of the trials with a finite Fn (the ones excluded by the validation are left out) and which of them are neutral
+    trial_Fn = numpy.asarray(trial_Fn, dtype=numpy.float64)[:len(stimulus_ids)]
+    is_neutral = neutral_trials(stimulus_ids)[:len(trial_Fn)]
+    analysed = numpy.isfinite(trial_Fn)
+    return trial_Fn[analysed], is_neutral[analysed]
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+#? Includes from built in Python
+import sys
+import os
+import time
+#? Includes from external modules in Pipfile
+import numpy
+#! This file is supposed to be run from the Presentiment folder
+sys.path.append(os.path.join(os.getcwd(),'src'))
+
+from presentiment import Neulog, Neulog_Acquisition, presentiment_operations
+from presentiment.Neulog import Neulog_Segmented_Experiment
+from presentiment.Neulog_Emulator import start_emulator, pulse_value
+from presentiment.Pulse_Detector import Pulse_Detector
+
+if __name__ == '__main__':
+    # Emulated device that only holds 200 samples per experiment
+    server, emulator = start_emulator(max_samples=200, seed=1)
+    port = str(server.server_address[1])
+    print('Emulator on port ' + port)
+
+    # Server commands
+    presentiment_operations.refresh_neulog(port, print, lambda: print('Experiment'), lambda: print('Failed'))
+    neu = Neulog(port, 'GSR', 'Pulse')
+    print(neu.get_version())
+    print('Sensor values: ' + str(neu.get_values()))
+
+    # Segmented experiment: 500 samples at 100 per second in segments of 200 samples
+    experiment = Neulog_Segmented_Experiment(neu, '5', 500, 10, max_segment_samples=200)
+    experiment.start()
+    timestamps = []
+    while not experiment.finished():
+        time.sleep(max(min(0.5, experiment.seconds_to_segment_end()), 0.05))
+        timestamps += experiment.poll()[0].tolist()
+    experiment.stop()
+    print('Segmented experiment: ' + str(len(timestamps)) + ' samples, gaps ' + str(experiment.gaps))
+
+    # Acquisition process: 2 seconds at 100 per second
+    acquisition = Neulog_Acquisition(port, ['GSR', 'Pulse'], '5', '200', 100)
+    print('Acquisition started: ' + str(acquisition.start()))
+    time.sleep(2.5)
+    print('Acquisition finished: ' + str(acquisition.stop()))
+    timestamps, values = acquisition.channel(1)
+    print('Pulse channel: ' + str(len(values)) + ' samples, ' + str(values[:5]))
+    acquisition.release()
+    print('Requests served: ' + str(emulator.requests))
+    server.shutdown()
+
+    # Pulse detector: 2 minutes at 70 BPM with a 50 ms artifact, the same beats in chunks of 10 samples and at once
+    pulse_timestamps = numpy.arange(0, 120000, 10.0)
+    pulse = numpy.array([pulse_value(t / 1000, '2') for t in pulse_timestamps])
+    pulse[100:105] += 3 * 300
+    beats, rates = Pulse_Detector().process(pulse_timestamps, pulse)
+    detector = Pulse_Detector()
+    chunked = [detector.process(pulse_timestamps[i:i + 10], pulse[i:i + 10]) for i in range(0, len(pulse), 10)]
+    same = numpy.array_equal(beats, numpy.concatenate([chunk[0] for chunk in chunked]))
+    print('Pulse: ' + str(len(beats)) + ' beats, ' + str(round(float(numpy.mean(rates)), 1)) + ' BPM, same in chunks: ' + str(same))
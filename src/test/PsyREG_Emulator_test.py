@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2022-2023 Alejandro Ramsés D'León.
+
+This file is part of Presentiment Project.
+See https://github.com/Ramses-Dleon/Presentimiento for further info.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+#? Includes from built in Python
+import sys
+import os
+import time
+#! This file is supposed to be run from the Presentiment folder
+sys.path.append(os.path.join(os.getcwd(),'src'))
+# Emulated PsyREG.dll: 2 devices of 1 Mbit/s that stall 1% of the reads for 20 ms
+os.environ["PSYREG_EMULATOR"] = os.environ.get("PSYREG_EMULATOR") or "devices=2,bits_per_second=1000000,stall_rate=0.01,stall_ms=20,seed=1"
+
+from presentiment import PsyREG, PsyREG_Pool, COMBINE_XOR, COMBINE_INTERLEAVE
+
+psyleron = PsyREG()
+print(psyleron.get_name())
+print('Sources: ' + str(psyleron.count_PsyREGs()))
+print('Bits: ' + psyleron.get_bits(32))
+print('Bytes: ' + psyleron.get_bytes(4))
+print('Status: ' + str(psyleron.get_status()))
+
+# Single-bit reads: one FFI call per bit
+t_start = time.perf_counter()
+psyleron.get_bits(10000)
+t_bit = time.perf_counter() - t_start
+print('GetBit: %.0f bits/s' % (10000 / t_bit))
+
+# Bulk reads: 4096 bits per FFI call
+driver = psyleron.driver
+source = psyleron.get_source()
+# Drop the bits buffered during the previous reads
+driver.reset_source(source)
+bits = 0
+t_start = time.perf_counter()
+while time.perf_counter() - t_start < 1:
+    bits += len(driver.read_bits(source, 4096))
+print('GetBits: %.0f bits/s, status %d' % (bits / (time.perf_counter() - t_start), driver.get_status(source)))
+# PsyREGGetBits writes one bit per byte (psyreg.h): only 0 and 1, about half of each
+bits = driver.read_bits(source, 100000)
+print('GetBits values: %s, mean %.4f' % (sorted(set(bits.tolist())), bits.mean()))
+
+# The dll is loaded and bound once; creating PsyREG and asking for its name is cached
+t_start = time.perf_counter()
+for _ in range(1000):
+    PsyREG().get_name()
+print('PsyREG().get_name(): %.1f us' % ((time.perf_counter() - t_start) * 1000))
+psyleron.clear_RNG()
+psyleron.release_RNG()
+
+# Pool of all the devices read in parallel
+for combine in (COMBINE_XOR, COMBINE_INTERLEAVE):
+    pool = PsyREG_Pool(combine)
+    t_start = time.perf_counter()
+    bits = pool.read_bits(500000)
+    print('%s: %.0f bits/s, values %s, mean %.4f' % (pool.get_name(), len(bits) / (time.perf_counter() - t_start),
+                                                   sorted(set(bits.tolist())), bits.mean()))
+    print(pool.status_text())
+    pool.close()